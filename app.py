@@ -24,39 +24,95 @@
 
 from __future__ import annotations
 
+import asyncio
+import hashlib
+import multiprocessing
 import os
+from contextlib import asynccontextmanager
 from decimal import Decimal
+from collections import deque
 from pathlib import Path
-from typing import Any, Optional
+from typing import Any, AsyncIterator, Optional
 
 import uvicorn
 from fastapi import FastAPI, Form, Request
-from fastapi.responses import HTMLResponse, RedirectResponse
+from fastapi.responses import (
+    HTMLResponse,
+    JSONResponse,
+    PlainTextResponse,
+    RedirectResponse,
+    Response,
+)
 from fastapi.templating import Jinja2Templates
 from starlette.status import HTTP_200_OK, HTTP_303_SEE_OTHER
 import re
-import tempfile
-from fastapi.responses import FileResponse
-
-from common import D, get_scenario, set_questionaire_answers, set_scenario_parameters
+from fastapi.responses import StreamingResponse
+
+from common import (
+    D,
+    get_scenario_values,
+    read_answers,
+    set_questionaire_answers,
+    set_scenario_parameters,
+)
 from filesystem.actors_repo import JsonActorsRepository
-from filesystem.paths import ensure_user_data_initialized, packaged_root
+from filesystem.aio import aio, run_io, shutdown_io
+from filesystem.codec import get_codec
+from filesystem.filecache import shared_cache
+from filesystem.paths import (
+    ensure_user_data_initialized,
+    packaged_root,
+    user_data_paths,
+)
 from filesystem.questionaires_repo import JsonQuestionairesRepository
+from filesystem.report import REPORT_VERSION, build_pdf_report
+from filesystem.reportcache import ReportCache, digest as report_digest
 from filesystem.repo import (
     DiscreteThresholdsRepository,
     DraftRepository,
     JsonAnalysisRepository,
     JsonCategoryRepository,
 )
+from filesystem.sqlite_repo import (
+    SqliteAnalysisRepository,
+    SqliteDatabase,
+    SqliteDraftRepository,
+    migrate_json,
+)
 from filesystem.threats_repo import JsonThreatsRepository
 from filesystem.vulnerabilities_repo import JsonVulnerabilitiesRepository
-from otyg_risk_base.hybrid import HybridRisk
-from riskcalculator.questionaire import Questionaires
+from riskcalculator import sensitivity
+from riskcalculator.cache import RiskCache
+from riskcalculator.compute import (
+    DEFAULT_TIMEOUT,
+    ComputeBusy,
+    ComputeCancelled,
+    ComputeExecutor,
+    ComputeTimeout,
+)
+from riskcalculator.scenario import RiskScenario
+from riskcalculator.simulation import PREVIEW_TOLERANCE, REPORT_TOLERANCE, evaluate_risk
+from riskcalculator.template import UNANSWERED
 from riskregister.assessment import RiskAssessment
 
 
-app = FastAPI()
-p = ensure_user_data_initialized()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Reference data is rebuilt by the watcher instead of stat-checked on
+    # every request
+    await run_io(open_storage)
+    shared_cache.watch([DATA_DIR, DATA_DIR / "questionaires"])
+    await run_io(_warm_reference_data)
+    yield
+    shared_cache.unwatch()
+    compute_executor.shutdown()
+    shutdown_io()
+
+
+app = FastAPI(lifespan=lifespan)
+# Only the paths: spawned compute workers import this module too, the data
+# folder is set up by open_storage() when the app starts
+p = user_data_paths()
 os.environ["TEMPLATES_DIR"] = str(packaged_root() / "templates")
 os.environ["DATA_DIR"] = str(p["data"])
 
@@ -64,11 +120,53 @@ BASE_DIR = Path(__file__).parent
 TEMPLATES_DIR = Path(os.environ.get("TEMPLATES_DIR", str(BASE_DIR / "templates")))
 DATA_DIR = Path(os.environ.get("DATA_DIR", str(BASE_DIR / "data")))
 DEFAULT_QUESTIONAIRES_SET = "default"
+PRECISIONS = [
+    (PREVIEW_TOLERANCE, "Snabb (±2 %)"),
+    (REPORT_TOLERANCE, "Rapport (±0,5 %)"),
+]
 
 templates = Jinja2Templates(directory=str(TEMPLATES_DIR))
 
-analyses_repo = JsonAnalysisRepository(DATA_DIR / "analyses")
-draft_repo = DraftRepository(DATA_DIR / "drafts")
+
+def _templates_signature() -> str:
+    parts = []
+    for path in sorted(TEMPLATES_DIR.rglob("*")):
+        if path.is_file():
+            st = path.stat()
+            parts.append(f"{path.name}:{st.st_mtime_ns}:{st.st_size}")
+    return ";".join(parts)
+
+
+# Part of every ETag, rendered pages change with the templates
+TEMPLATES_SIGNATURE = _templates_signature()
+
+# "json" (en fil per objekt) eller "sqlite" (data/riskanalysis.db)
+STORAGE_BACKEND = os.environ.get("STORAGE_BACKEND", "json")
+# Opened by open_storage()
+analyses_repo: Any = None
+draft_repo: Any = None
+
+
+def open_storage() -> None:
+    """
+    Create the data folders, copy the seed data and open the analysis
+    storage, migrating JSON files into a new SQLite database. Repositories
+    that are already set are kept.
+    """
+    global analyses_repo, draft_repo
+    ensure_user_data_initialized()
+    if analyses_repo is not None and draft_repo is not None:
+        return
+    if STORAGE_BACKEND == "sqlite":
+        database = SqliteDatabase(DATA_DIR / "riskanalysis.db")
+        migrate_json(database, DATA_DIR / "analyses", DATA_DIR / "drafts")
+        analyses_repo = SqliteAnalysisRepository(database)
+        draft_repo = SqliteDraftRepository(database)
+    else:
+        analyses_repo = JsonAnalysisRepository(DATA_DIR / "analyses")
+        draft_repo = DraftRepository(DATA_DIR / "drafts")
+
+
 questionaires_repo = JsonQuestionairesRepository(DATA_DIR / "questionaires")
 
 actors_repo = JsonActorsRepository(DATA_DIR / "actors.json")
@@ -78,6 +176,75 @@ categories_repo = JsonCategoryRepository(DATA_DIR / "categories.json")
 discrete_thresholds_repo = DiscreteThresholdsRepository(
     DATA_DIR / "discrete_thresholds.json"
 )
+risk_cache = RiskCache(folder=p["cache"] / "risk")
+report_cache = ReportCache(p["cache"] / "reports")
+# Simulations run in worker processes, COMPUTE_WORKERS=0 runs them in a
+# background thread
+compute_executor = ComputeExecutor(
+    workers=(
+        int(os.environ["COMPUTE_WORKERS"])
+        if os.environ.get("COMPUTE_WORKERS")
+        else None
+    ),
+    timeout=float(os.environ.get("COMPUTE_TIMEOUT", DEFAULT_TIMEOUT)),
+)
+
+
+@app.exception_handler(ComputeBusy)
+async def compute_busy(request: Request, exc: ComputeBusy):
+    return PlainTextResponse(
+        "Servern är upptagen med andra beräkningar, försök igen om en stund.",
+        status_code=503,
+        headers={"Retry-After": "5"},
+    )
+
+
+@app.exception_handler(ComputeTimeout)
+async def compute_timeout(request: Request, exc: ComputeTimeout):
+    return PlainTextResponse("Beräkningen tog för lång tid.", status_code=504)
+
+
+@app.exception_handler(ComputeCancelled)
+async def compute_cancelled(request: Request, exc: ComputeCancelled):
+    # Klienten har gått, svaret läses inte
+    return Response(status_code=499)
+
+
+async def _evaluate_risk(
+    request: Request, values: dict[str, Any], tolerance: Optional[float]
+) -> Any:
+    """risk_cache.evaluate with a cache miss simulated in the compute pool."""
+    key, risk = await run_io(risk_cache.lookup, values, tolerance=tolerance)
+    if risk is None:
+        risk = await _simulate(
+            key, values, tolerance, cancelled=request.is_disconnected
+        )
+    return risk
+
+
+async def _simulate(
+    key: str, values: dict[str, Any], tolerance: Optional[float], **kwargs: Any
+) -> Any:
+    risk = await compute_executor.run(
+        evaluate_risk, values, tolerance=tolerance, **kwargs
+    )
+    await run_io(risk_cache.put, key, risk)
+    return risk
+
+
+def _warm_reference_data() -> None:
+    """Build the reference data up front so no request has to."""
+    _scenario_suggestions()
+    for set_id in questionaires_repo.list_sets():
+        try:
+            questionaires_repo.load_template(set_id)
+        except (OSError, ValueError):
+            pass
+    try:
+        for name in discrete_thresholds_repo.get_set_names():
+            discrete_thresholds_repo.load(name)
+    except (OSError, ValueError):
+        pass
 
 
 def _default_scenario_form() -> dict[str, str]:
@@ -96,10 +263,18 @@ def _default_scenario_form() -> dict[str, str]:
     }
 
 
-def _load_questionaires_objects(qset: str) -> dict[str, Any]:
-    """Load a questionaires-set for rendering. Returns {tef,vuln,lm} dict with None values on failure."""
+async def _load_questionaires_objects(qset: str) -> dict[str, Any]:
+    """Load a questionaires-set as mutable objects. Returns {tef,vuln,lm} dict with None values on failure."""
     try:
-        return questionaires_repo.load_objects(qset)
+        return (await aio(questionaires_repo).load_template(qset)).instantiate()
+    except FileNotFoundError:
+        return {"tef": None, "vuln": None, "lm": None}
+
+
+async def _load_questionaires_template(qset: str) -> Any:
+    """Load a compiled questionaires-set for rendering. Returns {tef,vuln,lm} dict with None values on failure."""
+    try:
+        return await aio(questionaires_repo).load_template(qset)
     except FileNotFoundError:
         return {"tef": None, "vuln": None, "lm": None}
 
@@ -114,6 +289,14 @@ def _scenario_suggestions() -> dict[str, Any]:
     }
 
 
+async def _scenario_form_context() -> dict[str, Any]:
+    """Questionaire sets and suggestions for the scenario forms."""
+    available_qsets, suggestions = await asyncio.gather(
+        aio(questionaires_repo).list_sets(), run_io(_scenario_suggestions)
+    )
+    return {"available_qsets": available_qsets, **suggestions}
+
+
 def _build_risk_dict(form: Any) -> dict[str, Any]:
     return {
         "budget": str(D(str(form.get("budget", "1000000")))),
@@ -121,7 +304,7 @@ def _build_risk_dict(form: Any) -> dict[str, Any]:
     }
 
 
-def _render_create_scenario(
+async def _render_create_scenario(
     *,
     request: Request,
     draft_id: str,
@@ -138,53 +321,166 @@ def _render_create_scenario(
         "errors": errors,
         "qs": qs,
         "qset": qset,
-        "available_qsets": questionaires_repo.list_sets(),
-        **_scenario_suggestions(),
+        **await _scenario_form_context(),
     }
     return templates.TemplateResponse(
         "create_scenario_v4.html", context, status_code=status_code
     )
 
 
+def _read_tolerance(form: Any) -> float:
+    try:
+        tolerance = float(form.get("tolerance") or PREVIEW_TOLERANCE)
+    except ValueError:
+        tolerance = PREVIEW_TOLERANCE
+    return min(max(tolerance, 0.001), 0.2)
+
+
 def _safe_filename(s: str) -> str:
     s = (s or "").strip()
     s = re.sub(r"[^A-Za-z0-9._-]+", "_", s)
     return s or "riskrapport"
 
 
-@app.get("/analysis/{analysis_id}/export/pdf")
-def export_analysis_pdf(analysis_id: str):
-    analysis = analyses_repo.get_dict(
-        analysis_id
-    )  # du använder redan get_dict för att läsa analys :contentReference[oaicite:3]{index=3}
+def _etag(*validators: Any) -> str:
+    """Strong ETag from the validators of everything a response is built from."""
+    text = "\x1f".join(str(v) for v in (TEMPLATES_SIGNATURE, *validators))
+    return '"%s"' % hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
 
-    # Din renderer (lägg report.py i projektet)
-    from filesystem.report import build_pdf_report  # <-- se till att denna finns
 
-    analysis_object = str(analysis.get("analysis_object", "") or "analysis")
-    filename = f"{_safe_filename(analysis_object)}__{analysis_id}.pdf"
+def _cache_headers(etag: str) -> dict[str, str]:
+    # Cached, but revalidated with If-None-Match on every use
+    return {"ETag": etag, "Cache-Control": "no-cache"}
+
+
+def _not_modified(request: Request, etag: str) -> Optional[Response]:
+    """304 response if the client already has etag, else None."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return None
+    # If-None-Match uses the weak comparison
+    tags = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    if etag in tags or "*" in tags:
+        return Response(status_code=304, headers=_cache_headers(etag))
+    return None
+
+
+async def _analysis_signature(analysis_id: Optional[str]) -> str:
+    if not analysis_id:
+        return ""
+    try:
+        return await aio(analyses_repo).signature(analysis_id)
+    except FileNotFoundError:
+        return "missing"
+
 
-    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as tmp:
-        tmp_path = tmp.name
+# Report builds in progress, concurrent exports of the same analysis share one
+_report_builds: dict[str, asyncio.Future] = {}
+REPORT_CHUNK = 64 * 1024
 
-    # build_pdf_report ska skriva PDF till tmp_path
-    build_pdf_report(analysis, tmp_path, source_name=analysis_id)
 
-    return FileResponse(
-        tmp_path,
+async def _build_report(key: str, analysis: dict, source_name: str) -> None:
+    tmp = await run_io(report_cache.reserve, key)
+    try:
+        await compute_executor.run(
+            build_pdf_report, analysis, str(tmp), source_name=source_name, wait=True
+        )
+        await run_io(report_cache.commit, key, tmp)
+    except BaseException:
+        await asyncio.shield(run_io(report_cache.discard, tmp))
+        raise
+
+
+async def _open_report(analysis: dict, source_name: str):
+    """Open file with the PDF report, built in the compute pool on a miss."""
+    key = await run_io(report_digest, analysis, source_name)
+    f = await run_io(report_cache.open, key)
+    if f is not None:
+        return f
+    build = _report_builds.get(key)
+    if build is None:
+        build = asyncio.ensure_future(_build_report(key, analysis, source_name))
+        _report_builds[key] = build
+        build.add_done_callback(lambda _: _report_builds.pop(key, None))
+    await asyncio.shield(build)
+    f = await run_io(report_cache.open, key)
+    if f is None:
+        raise RuntimeError(f"report {key} was evicted before it was sent")
+    return f
+
+
+async def _stream_file(f) -> AsyncIterator[bytes]:
+    try:
+        while chunk := await run_io(f.read, REPORT_CHUNK):
+            yield chunk
+    finally:
+        f.close()
+
+
+@app.get("/analysis/{analysis_id}/export/pdf")
+async def export_analysis_pdf(request: Request, analysis_id: str):
+    etag = _etag("pdf", REPORT_VERSION, await aio(analyses_repo).signature(analysis_id))
+    if (response := _not_modified(request, etag)) is not None:
+        return response
+    analysis = await aio(analyses_repo).get_dict(analysis_id)
+    analysis_object = str(analysis.get("analysis_object", "") or "analysis")
+    filename = f"{_safe_filename(analysis_object)}__{analysis_id}.pdf"
+
+    f = await _open_report(analysis, analysis_id)
+    return StreamingResponse(
+        _stream_file(f),
         media_type="application/pdf",
-        filename=filename,
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}"',
+            "Content-Length": str(os.fstat(f.fileno()).st_size),
+            **_cache_headers(etag),
+        },
     )
 
 
 @app.get("/", response_class=HTMLResponse)
-def index(request: Request, selected: str | None = None):
-    analyses = analyses_repo.list()
+async def index(
+    request: Request,
+    selected: str | None = None,
+    page: int = 1,
+    per_page: int = 50,
+    sort: str = "date",
+    order: str = "desc",
+    owner: str | None = None,
+    date_from: str | None = None,
+    date_to: str | None = None,
+):
+    # The query parameters are part of the URL, only the data goes in the ETag
+    etag = _etag(
+        "list.html",
+        *await asyncio.gather(
+            aio(analyses_repo).listing_signature(), _analysis_signature(selected)
+        ),
+    )
+    if (response := _not_modified(request, etag)) is not None:
+        return response
+    listing = await aio(analyses_repo).query(
+        page=page,
+        per_page=min(max(per_page, 1), 500),
+        sort=sort,
+        descending=order != "asc",
+        owner=owner,
+        date_from=date_from,
+        date_to=date_to,
+    )
+    filters = {
+        "per_page": listing.per_page,
+        "sort": sort,
+        "order": order,
+        "owner": owner or "",
+        "date_from": date_from or "",
+        "date_to": date_to or "",
+    }
     analysis = None
 
     if selected:
         try:
-            analysis = analyses_repo.get_dict(selected)
+            analysis = await aio(analyses_repo).get_dict(selected)
         except FileNotFoundError:
             analysis = None
 
@@ -192,22 +488,25 @@ def index(request: Request, selected: str | None = None):
         "list.html",
         {
             "request": request,
-            "analyses": analyses,
+            "analyses": listing.items,
+            "listing": listing,
+            "filters": filters,
             "selected": selected,
             "analysis": analysis,
         },
+        headers=_cache_headers(etag),
     )
 
 
 @app.get("/create", response_class=HTMLResponse)
-def create_analysis_start(request: Request):
-    draft_id = draft_repo.create()
+async def create_analysis_start(request: Request):
+    draft_id = await aio(draft_repo).create()
     return RedirectResponse(url=f"/create/{draft_id}", status_code=HTTP_303_SEE_OTHER)
 
 
 @app.get("/create/{draft_id}", response_class=HTMLResponse)
-def create_analysis_page(request: Request, draft_id: str):
-    draft = draft_repo.load(draft_id)
+async def create_analysis_page(request: Request, draft_id: str):
+    draft = await aio(draft_repo).load(draft_id)
     return templates.TemplateResponse(
         "create_analysis.html",
         {"request": request, "draft_id": draft_id, "draft": draft},
@@ -215,7 +514,7 @@ def create_analysis_page(request: Request, draft_id: str):
 
 
 @app.post("/create/{draft_id}/update")
-def create_analysis_update(
+async def create_analysis_update(
     draft_id: str,
     analysis_object: str = Form(""),
     version: str = Form(""),
@@ -223,24 +522,26 @@ def create_analysis_update(
     scope: str = Form(""),
     owner: str = Form(""),
 ):
-    draft = draft_repo.load(draft_id)
-    draft["analysis_object"] = analysis_object
-    draft["version"] = version
-    draft["date"] = date
-    draft["scope"] = scope
-    draft["owner"] = owner
-    draft.setdefault("scenarios", [])
-    draft_repo.save(draft_id, draft)
+    await aio(draft_repo).set_metadata(
+        draft_id,
+        {
+            "analysis_object": analysis_object,
+            "version": version,
+            "date": date,
+            "scope": scope,
+            "owner": owner,
+        },
+    )
     return RedirectResponse(url=f"/create/{draft_id}", status_code=HTTP_303_SEE_OTHER)
 
 
 @app.post("/create/{draft_id}/finalize")
-def create_analysis_finalize(draft_id: str):
-    draft = draft_repo.load(draft_id)
+async def create_analysis_finalize(draft_id: str):
+    draft = await aio(draft_repo).load(draft_id)
     draft.setdefault("scenarios", [])
 
-    analysis_id = analyses_repo.save_new(draft)
-    draft_repo.delete(draft_id)
+    analysis_id = await aio(analyses_repo).save_new(draft)
+    await aio(draft_repo).delete(draft_id)
 
     return RedirectResponse(
         url=f"/?selected={analysis_id}", status_code=HTTP_303_SEE_OTHER
@@ -248,13 +549,13 @@ def create_analysis_finalize(draft_id: str):
 
 
 @app.get("/create/{draft_id}/scenario/new", response_class=HTMLResponse)
-def create_scenario_page(
+async def create_scenario_page(
     request: Request, draft_id: str, qset: str = DEFAULT_QUESTIONAIRES_SET
 ):
     # validate draft exists
-    draft_repo.load(draft_id)
+    await aio(draft_repo).load(draft_id)
 
-    qs = _load_questionaires_objects(qset)
+    qs = await _load_questionaires_template(qset)
     errors = [] if qs.get("tef") else [f"Kunde inte ladda questionaires-set: {qset}"]
 
     return templates.TemplateResponse(
@@ -266,8 +567,7 @@ def create_scenario_page(
             "errors": errors,
             "qs": qs,
             "qset": qset,
-            "available_qsets": questionaires_repo.list_sets(),
-            **_scenario_suggestions(),
+            **await _scenario_form_context(),
         },
     )
 
@@ -275,10 +575,10 @@ def create_scenario_page(
 @app.get(
     "/create/{draft_id}/scenario/{scenario_index}/edit", response_class=HTMLResponse
 )
-def edit_scenario_page(
+async def edit_scenario_page(
     request: Request, draft_id: str, scenario_index: int, qset: str | None = None
 ):
-    draft = draft_repo.load(draft_id)
+    draft = await aio(draft_repo).load(draft_id)
     scenarios = draft.get("scenarios", [])
 
     if scenario_index < 0 or scenario_index >= len(scenarios):
@@ -289,7 +589,9 @@ def edit_scenario_page(
     scenario = scenarios[scenario_index]
     scenario_qset = (scenario.get("questionaires") or {}).get("qset")
     effective_qset = qset or scenario_qset or DEFAULT_QUESTIONAIRES_SET
-    qs = scenario.get("questionaires") or _load_questionaires_objects(effective_qset)
+    qs = scenario.get("questionaires") or await _load_questionaires_template(
+        effective_qset
+    )
 
     return templates.TemplateResponse(
         "edit_scenario_v1.html",
@@ -300,8 +602,7 @@ def edit_scenario_page(
             "scenario": scenario,
             "qs": qs,
             "qset": effective_qset,
-            "available_qsets": questionaires_repo.list_sets(),
-            **_scenario_suggestions(),
+            **await _scenario_form_context(),
             "errors": [],
         },
     )
@@ -314,9 +615,10 @@ async def _upsert_scenario_from_form(
     scenario_index: Optional[int] = None,
 ) -> HTMLResponse:
     """Create or update a scenario in a draft from submitted form data."""
-    draft_dict = draft_repo.load(draft_id)
+    draft_dict, form = await asyncio.gather(
+        aio(draft_repo).load(draft_id), request.form()
+    )
     draft = RiskAssessment(draft_dict)
-    form = await request.form()
 
     risk_input_mode = str(form.get("risk_input_mode", "questionnaire"))
     qset = str(form.get("qset", DEFAULT_QUESTIONAIRES_SET))
@@ -339,19 +641,27 @@ async def _upsert_scenario_from_form(
             except Exception:
                 seed_qs = None
 
-        qs = set_questionaire_answers(
-            form=form,
-            questionaires_repo=questionaires_repo,
-            qset=qset,
-            errors=errors,
-            qs=seed_qs,
-        )
+        if seed_qs is not None:
+            qs = await run_io(
+                set_questionaire_answers,
+                form=form,
+                questionaires_repo=questionaires_repo,
+                qset=qset,
+                errors=errors,
+                qs=seed_qs,
+            )
+        else:
+            try:
+                template = await aio(questionaires_repo).load_template(qset)
+                qs = template.instantiate(read_answers(form=form, template=template))
+            except FileNotFoundError:
+                errors.append(f"Kunde inte ladda questionaires-set: {qset}")
     else:
-        qs = _load_questionaires_objects(qset)
+        qs = await _load_questionaires_objects(qset)
 
     if errors:
-        qs_for_render = _load_questionaires_objects(qset)
-        return _render_create_scenario(
+        qs_for_render = await _load_questionaires_template(qset)
+        return await _render_create_scenario(
             request=request,
             draft_id=draft_id,
             qset=qset,
@@ -361,19 +671,23 @@ async def _upsert_scenario_from_form(
             status_code=400,
         )
 
-    scenario_obj = get_scenario(
+    questionaires, values = await run_io(
+        get_scenario_values,
         qs=qs,
         risk_dict=risk_dict,
         discrete_thresholds_repo=discrete_thresholds_repo,
-        parameters=set_scenario_parameters(form),
     )
+    risk = await _evaluate_risk(request, values, REPORT_TOLERANCE)
+    parameters = set_scenario_parameters(form)
+    parameters.update({"risk": risk, "questionaires": questionaires})
+    scenario_obj = RiskScenario(parameters=parameters)
 
     if scenario_index is None:
-        draft.add_scenario(scenario=scenario_obj)
+        await aio(draft_repo).add_scenario(draft_id, scenario_obj.to_dict())
     else:
-        draft.update_scenario(index=scenario_index, scenario=scenario_obj)
-
-    draft_repo.save(draft_id, draft.to_dict())
+        await aio(draft_repo).update_scenario(
+            draft_id, scenario_index, scenario_obj.to_dict()
+        )
     return RedirectResponse(url=f"/create/{draft_id}", status_code=HTTP_303_SEE_OTHER)
 
 
@@ -392,36 +706,36 @@ async def edit_scenario_save(request: Request, draft_id: str, scenario_index: in
 
 
 @app.post("/analysis/{analysis_id}/new-version")
-def new_version_from_analysis(analysis_id: str):
-    original = analyses_repo.get_dict(analysis_id)
+async def new_version_from_analysis(analysis_id: str):
+    original = await aio(analyses_repo).get_dict(analysis_id)
 
     draft = dict(original)
     draft["version"] = ""
     draft["date"] = ""
     draft.setdefault("scenarios", [])
     draft["previous_analysis_id"] = analysis_id
-    draft_id = draft_repo.create_from(draft)
+    draft_id = await aio(draft_repo).create_from(draft)
 
     return RedirectResponse(url=f"/create/{draft_id}", status_code=HTTP_303_SEE_OTHER)
 
 
 @app.post("/create/{draft_id}/scenario/{scenario_index}/delete")
-def delete_scenario(draft_id: str, scenario_index: int):
-    draft = draft_repo.load(draft_id)
-    scenarios = draft.get("scenarios", [])
-    if 0 <= scenario_index < len(scenarios):
-        scenarios.pop(scenario_index)
-        draft["scenarios"] = scenarios
-        draft_repo.save(draft_id, draft)
+async def delete_scenario(draft_id: str, scenario_index: int):
+    try:
+        await aio(draft_repo).delete_scenario(draft_id, scenario_index)
+    except IndexError:
+        pass
     return RedirectResponse(url=f"/create/{draft_id}", status_code=HTTP_303_SEE_OTHER)
 
 
 @app.get("/risk-calc", response_class=HTMLResponse)
-def risk_calc_page(request: Request, qset: str | None = None):
-    available_qsets = questionaires_repo.list_sets()
+async def risk_calc_page(request: Request, qset: str | None = None):
+    available_qsets, available_thresholds_names = await asyncio.gather(
+        aio(questionaires_repo).list_sets(),
+        aio(discrete_thresholds_repo).get_set_names(),
+    )
     effective_qset = qset or (available_qsets[0] if available_qsets else "default")
-    available_thresholds_names = discrete_thresholds_repo.get_set_names()
-    qs = _load_questionaires_objects(effective_qset)
+    qs = await _load_questionaires_template(effective_qset)
 
     return templates.TemplateResponse(
         "risk_calc.html",
@@ -430,7 +744,10 @@ def risk_calc_page(request: Request, qset: str | None = None):
             "available_qsets": available_qsets,
             "qset": effective_qset,
             "qs": qs,
+            "selected": qs.selected_answers(),
             "available_thresholds": available_thresholds_names,
+            "precisions": PRECISIONS,
+            "tolerance": PREVIEW_TOLERANCE,
             "result": None,
             "errors": [],
             "mode": "questionnaire",  # default
@@ -446,6 +763,14 @@ def risk_calc_page(request: Request, qset: str | None = None):
     )
 
 
+def _risk_result(risk: Any) -> dict[str, Any]:
+    result = risk.to_dict() if hasattr(risk, "to_dict") else {"risk": str(risk)}
+    convergence = getattr(risk, "convergence", None)
+    if convergence is not None:
+        result["convergence"] = convergence.to_dict()
+    return result
+
+
 @app.post("/risk-calc", response_class=HTMLResponse)
 async def risk_calc_submit(request: Request):
     form = await request.form()
@@ -453,13 +778,19 @@ async def risk_calc_submit(request: Request):
     mode = str(form.get("risk_input_mode", "questionnaire"))
     qset = str(form.get("qset", "")) or None
 
-    available_qsets = questionaires_repo.list_sets()
+    available_qsets, available_thresholds_names = await asyncio.gather(
+        aio(questionaires_repo).list_sets(),
+        aio(discrete_thresholds_repo).get_set_names(),
+    )
     effective_qset = qset or (available_qsets[0] if available_qsets else "default")
-    available_thresholds_names = discrete_thresholds_repo.get_set_names()
 
-    qs = _load_questionaires_objects(effective_qset)
+    qs = await _load_questionaires_template(effective_qset)
+    answers: dict[str, Any] = {}
 
-    threshold_set = discrete_thresholds_repo.load(form.get("threshold_set", ""))
+    threshold_set = await aio(discrete_thresholds_repo).load(
+        form.get("threshold_set", "")
+    )
+    tolerance = _read_tolerance(form)
 
     errors: list[str] = []
     result = None
@@ -487,8 +818,10 @@ async def risk_calc_submit(request: Request):
         }
 
         try:
-            risk = HybridRisk(values=values)
-            result = risk.to_dict() if hasattr(risk, "to_dict") else {"risk": str(risk)}
+            risk = await _evaluate_risk(request, values, tolerance)
+            result = _risk_result(risk)
+        except (ComputeBusy, ComputeTimeout, ComputeCancelled):
+            raise
         except Exception as e:
             errors.append(f"Kunde inte skapa Risk från manuella intervall: {e}")
 
@@ -502,24 +835,14 @@ async def risk_calc_submit(request: Request):
                 "Valt formulär saknar en eller flera dimensioner (tef/vuln/lm)."
             )
 
-        qs = set_questionaire_answers(
-            form=form,
-            questionaires_repo=questionaires_repo,
-            errors=errors,
-            qset=qset,
-            qs=qs,
-        )
-
         if not errors:
-            questionaires = Questionaires(
-                tef=qs.get("tef"), vuln=qs.get("vuln"), lm=qs.get("lm")
-            )
-            values = questionaires.calculate_questionairy_values()
+            answers = read_answers(form=form, template=qs)
+            values = qs.calculate_values(answers)
             values.update({"budget": Decimal("1000000")})
             values.update({"currency": "SEK"})
             values.update({"mappings": threshold_set.to_dict()})
-            risk = HybridRisk(values=values)
-            result = risk.to_dict() if hasattr(risk, "to_dict") else {"risk": str(risk)}
+            risk = await _evaluate_risk(request, values, tolerance)
+            result = _risk_result(risk)
 
     return templates.TemplateResponse(
         "risk_calc.html",
@@ -528,10 +851,13 @@ async def risk_calc_submit(request: Request):
             "available_qsets": available_qsets,
             "qset": effective_qset,
             "qs": qs,
+            "selected": qs.selected_answers(answers),
             "result": result,
             "errors": errors,
             "mode": mode,
             "available_thresholds": available_thresholds_names,
+            "precisions": PRECISIONS,
+            "tolerance": tolerance,
             "threshold_set": threshold_set,
             "manual": {
                 "tef": {
@@ -556,8 +882,196 @@ async def risk_calc_submit(request: Request):
     )
 
 
+def _sensitivity_input(scenario: dict[str, Any]) -> dict[str, Any]:
+    """What sensitivity.analyze reads from a stored scenario, without the samples."""
+    risk = scenario.get("risk") or {}
+    quantitative = risk.get("quantitative") or {}
+    qualitative = risk.get("qualitative") or {}
+    return {
+        "questionaires": scenario["questionaires"],
+        "risk": {
+            "quantitative": {
+                k: quantitative[k] for k in ("budget", "currency") if k in quantitative
+            },
+            "qualitative": {"mappings": qualitative.get("mappings")},
+        },
+    }
+
+
+@app.get("/risk-calc/sensitivity")
+async def risk_calc_sensitivity(
+    request: Request,
+    scenario_index: int,
+    analysis_id: str | None = None,
+    draft_id: str | None = None,
+    samples: int = sensitivity.DEFAULT_SAMPLES,
+):
+    """Tornado data for one scenario in a stored analysis or draft."""
+    try:
+        if analysis_id:
+            analysis = await aio(analyses_repo).get_dict(analysis_id)
+        elif draft_id:
+            analysis = await aio(draft_repo).load(draft_id)
+        else:
+            return JSONResponse(
+                {"error": "analysis_id eller draft_id saknas"}, status_code=400
+            )
+    except FileNotFoundError:
+        return JSONResponse({"error": "Analysen hittades inte"}, status_code=404)
+    scenarios = analysis.get("scenarios", [])
+
+    if scenario_index < 0 or scenario_index >= len(scenarios):
+        return JSONResponse({"error": "Scenariot hittades inte"}, status_code=404)
+    scenario = scenarios[scenario_index]
+    if not scenario.get("questionaires"):
+        return JSONResponse(
+            {"error": "Scenariot saknar frågeformulär"}, status_code=400
+        )
+
+    result = await compute_executor.run(
+        sensitivity.analyze,
+        _sensitivity_input(scenario),
+        samples=max(1000, min(samples, 200000)),
+        cancelled=request.is_disconnected,
+    )
+    return JSONResponse(result.to_dict())
+
+
+BATCH_MAX_ITEMS = 10000
+# Items evaluated ahead of the one being streamed, per worker
+BATCH_WINDOW = 4
+_RANGE_NAMES = {
+    "tef": "threat_event_frequency",
+    "vuln": "vulnerability",
+    "lm": "loss_magnitude",
+}
+
+
+def _api_result(value: Any) -> Any:
+    """A risk result without the samples and the threshold mappings."""
+    if isinstance(value, dict):
+        return {
+            k: _api_result(v)
+            for k, v in value.items()
+            if k not in ("__samples", "mappings")
+        }
+    return value
+
+
+async def _batch_values(item: dict[str, Any]) -> dict[str, Any]:
+    """Simulation values for one batch item, manual ranges or questionaire answers."""
+    if not isinstance(item, dict):
+        raise ValueError("item must be an object")
+    if item.get("qset"):
+        template = await aio(questionaires_repo).load_template(str(item["qset"]))
+        answers = template.blank_answers()
+        for dim, given in (item.get("answers") or {}).items():
+            if dim not in answers:
+                raise ValueError(f"unknown dimension {dim}")
+            # Missing and null answers are left unanswered
+            given = [UNANSWERED if a is None else int(a) for a in given]
+            if len(given) > len(answers[dim]):
+                raise ValueError(f"at most {len(answers[dim])} answers for {dim}")
+            answers[dim][: len(given)] = given
+        values = template.calculate_values(answers)
+    else:
+        values = {
+            name: {
+                k: str(Decimal(str(item[dim][k]))) for k in ("min", "probable", "max")
+            }
+            for dim, name in _RANGE_NAMES.items()
+        }
+    thresholds = await aio(discrete_thresholds_repo).load(
+        str(item.get("threshold_set", ""))
+    )
+    values.update(
+        {
+            "budget": Decimal(str(item.get("budget", 1000000))),
+            "currency": str(item.get("currency") or "SEK"),
+            "mappings": thresholds.to_dict(),
+        }
+    )
+    return values
+
+
+async def _batch_results(items: list[Any]) -> AsyncIterator[bytes]:
+    """
+    NDJSON lines in input order. A window of items is evaluated ahead of
+    the one being streamed; identical inputs in a batch are simulated once.
+    """
+    codec = get_codec()
+    if not codec.compact:
+        codec = get_codec("json")
+    workers = max(1, compute_executor.workers)
+    limit = asyncio.Semaphore(workers)
+    simulations: dict[str, asyncio.Future] = {}
+
+    async def evaluate(index: int, item: Any) -> dict[str, Any]:
+        line: dict[str, Any] = {"index": index}
+        if isinstance(item, dict) and "id" in item:
+            line["id"] = item["id"]
+        try:
+            async with limit:
+                values = await _batch_values(item)
+                tolerance = _read_tolerance(item)
+                key, risk = await run_io(risk_cache.lookup, values, tolerance=tolerance)
+                if risk is None:
+                    if key not in simulations:
+                        simulations[key] = asyncio.ensure_future(
+                            _simulate(key, values, tolerance, wait=True)
+                        )
+                    risk = await asyncio.shield(simulations[key])
+            line["result"] = _api_result(_risk_result(risk))
+        except Exception as e:
+            # One bad input does not stop the rest of the batch
+            line["error"] = f"{type(e).__name__}: {e}"
+        return line
+
+    pending: deque[asyncio.Future] = deque()
+    queue = iter(enumerate(items))
+
+    def fill() -> None:
+        for index, item in queue:
+            pending.append(asyncio.ensure_future(evaluate(index, item)))
+            if len(pending) >= workers * BATCH_WINDOW:
+                return
+
+    fill()
+    try:
+        while pending:
+            line = await pending.popleft()
+            fill()
+            yield codec.dumps(line) + b"\n"
+    finally:
+        # The client went away, drop the rest
+        for future in [*pending, *simulations.values()]:
+            future.cancel()
+
+
+@app.post("/api/risk-calc/batch")
+async def risk_calc_batch(request: Request):
+    """
+    Evaluate a JSON array of inputs, or {"items": [...]}, and stream one
+    NDJSON line per input in input order.
+    """
+    try:
+        body = get_codec().loads(await request.body())
+    except ValueError:
+        return JSONResponse({"error": "Ogiltig JSON"}, status_code=400)
+    items = body.get("items") if isinstance(body, dict) else body
+    if not isinstance(items, list):
+        return JSONResponse(
+            {"error": "En lista med indata förväntades"}, status_code=400
+        )
+    if len(items) > BATCH_MAX_ITEMS:
+        return JSONResponse(
+            {"error": f"Högst {BATCH_MAX_ITEMS} indata per anrop"}, status_code=413
+        )
+    return StreamingResponse(_batch_results(items), media_type="application/x-ndjson")
+
+
 @app.get("/license", response_class=HTMLResponse)
-def license_page(request: Request):
+async def license_page(request: Request):
     return templates.TemplateResponse(
         "license.html",
         {
@@ -567,5 +1081,12 @@ def license_page(request: Request):
     )
 
 
-if __name__ == "__main__":
+def main() -> None:
     uvicorn.run(app, host="127.0.0.1", port=8000)
+
+
+if __name__ == "__main__":
+    # In a frozen binary the spawned compute workers start here and must
+    # not run the server
+    multiprocessing.freeze_support()
+    main()
@@ -0,0 +1,177 @@
+#
+# MIT License
+#
+# Copyright (c) 2025 Martin Vesterlund
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+
+"""
+Jämför hur snabbt utkast sparas och läses med de olika codecs.
+
+    PYTHONPATH=. python benchmarks/codec_benchmark.py [utkast.json ...]
+
+Utan filer byggs ett syntetiskt utkast med --scenarios scenarier från
+det inbyggda questionaires-setet. "legacy" är det tidigare formatet,
+json med indent=2 och ComplexEncoder.
+"""
+
+from __future__ import annotations
+
+import argparse
+import copy
+import json
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable
+
+from filesystem.codec import CODECS, get_codec, orjson
+from filesystem.paths import packaged_root
+from filesystem.questionaires_repo import JsonQuestionairesRepository
+from filesystem.samples import SampleStore
+from riskcalculator.questionaire import Questionaires
+from riskcalculator.scenario import RiskScenario
+from riskcalculator.util import ComplexEncoder
+
+
+def synthetic_draft(scenarios: int, inline_samples: bool) -> dict[str, Any]:
+    repo = JsonQuestionairesRepository(packaged_root() / "data" / "questionaires")
+    qs = repo.load_objects("default")
+    scenario = RiskScenario(
+        {
+            "name": "Scenario",
+            "threat_event_frequency": {"min": 1, "probable": 4, "max": 12},
+            "vulnerability": {"min": 0.1, "probable": 0.3, "max": 0.6},
+            "loss_magnitude": {"min": 0.01, "probable": 0.05, "max": 0.2},
+            "budget": 1000000,
+            "currency": "SEK",
+            "questionaires": Questionaires(tef=qs["tef"], vuln=qs["vuln"], lm=qs["lm"]),
+        }
+    ).to_dict()
+    if not inline_samples:
+        with tempfile.TemporaryDirectory() as tmp:
+            scenario = SampleStore(Path(tmp)).externalize(scenario)
+    else:
+        scenario = json.loads(json.dumps(scenario, cls=ComplexEncoder))
+    draft = {
+        "analysis_object": "Benchmark",
+        "version": "1",
+        "date": "2026-01-01",
+        "scope": "",
+        "owner": "",
+        "scenarios": [],
+    }
+    for i in range(scenarios):
+        s = copy.deepcopy(scenario)
+        s["name"] = f"Scenario {i}"
+        draft["scenarios"].append(s)
+    return draft
+
+
+def _codecs() -> dict[str, tuple[Callable[[Any], bytes], Callable[[bytes], Any]]]:
+    codecs = {
+        "legacy": (
+            lambda d: json.dumps(
+                d, ensure_ascii=False, indent=2, cls=ComplexEncoder
+            ).encode("utf-8"),
+            json.loads,
+        )
+    }
+    for name in CODECS:
+        if name == "orjson" and orjson is None:
+            continue
+        codec = get_codec(name)
+        codecs[name] = (codec.dumps, codec.loads)
+    return codecs
+
+
+def _best(fn: Callable[[], Any], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run(document: dict[str, Any], repeat: int, folder: Path) -> list[dict[str, Any]]:
+    rows = []
+    for name, (dumps, loads) in _codecs().items():
+        path = folder / f"{name}.json"
+
+        def save():
+            path.write_bytes(dumps(document))
+
+        def load():
+            loads(path.read_bytes())
+
+        save_s = _best(save, repeat)
+        load_s = _best(load, repeat)
+        size = path.stat().st_size
+        rows.append(
+            {
+                "codec": name,
+                "bytes": size,
+                "save_ms": save_s * 1000,
+                "load_ms": load_s * 1000,
+                "save_mb_s": size / save_s / 1e6,
+                "load_mb_s": size / load_s / 1e6,
+            }
+        )
+    return rows
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    ap.add_argument("inputs", nargs="*", help="Utkast eller analyser (JSON).")
+    ap.add_argument("--scenarios", type=int, default=100)
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument(
+        "--inline-samples",
+        action="store_true",
+        help="Syntetiskt utkast med dragningarna i JSON, som före sidecar-filerna.",
+    )
+    args = ap.parse_args()
+
+    if args.inputs:
+        documents = {p: json.loads(Path(p).read_bytes()) for p in args.inputs}
+    else:
+        documents = {
+            f"syntetiskt, {args.scenarios} scenarier": synthetic_draft(
+                args.scenarios, args.inline_samples
+            )
+        }
+    with tempfile.TemporaryDirectory() as tmp:
+        for title, document in documents.items():
+            print(title)
+            print(
+                f"  {'codec':<8} {'storlek':>12} {'spara ms':>10} {'läsa ms':>10}"
+                f" {'spara MB/s':>11} {'läsa MB/s':>10}"
+            )
+            for row in run(document, args.repeat, Path(tmp)):
+                print(
+                    f"  {row['codec']:<8} {row['bytes']:>12} {row['save_ms']:>10.1f}"
+                    f" {row['load_ms']:>10.1f} {row['save_mb_s']:>11.1f}"
+                    f" {row['load_mb_s']:>10.1f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -28,21 +28,40 @@ from typing import Any
 from fastapi.datastructures import FormData
 from riskcalculator.questionaire import Questionaires
 from riskcalculator.scenario import RiskScenario
+from riskcalculator.simulation import REPORT_TOLERANCE
 from otyg_risk_base.hybrid import HybridRisk
 
 
+def get_scenario_values(qs=None, risk_dict=None, discrete_thresholds_repo=None):
+    """The questionaires of a scenario and the values its risk is simulated from."""
+    questionaires = Questionaires(
+        tef=qs.get("tef"), vuln=qs.get("vuln"), lm=qs.get("lm")
+    )
+    values = questionaires.calculate_questionairy_values()
+    values.update({"budget": Decimal(risk_dict.get("budget"))})
+    values.update({"currency": risk_dict.get("currency")})
+    values.update({"mappings": discrete_thresholds_repo.load().to_dict()})
+    return questionaires, values
+
+
 def get_scenario(
-    qs=None, risk_dict=None, parameters: dict = None, discrete_thresholds_repo=None
+    qs=None,
+    risk_dict=None,
+    parameters: dict = None,
+    discrete_thresholds_repo=None,
+    risk_cache=None,
+    tolerance=REPORT_TOLERANCE,
 ) -> RiskScenario:
     try:
-        questionaires = Questionaires(
-            tef=qs.get("tef"), vuln=qs.get("vuln"), lm=qs.get("lm")
+        questionaires, values = get_scenario_values(
+            qs=qs,
+            risk_dict=risk_dict,
+            discrete_thresholds_repo=discrete_thresholds_repo,
         )
-        values = questionaires.calculate_questionairy_values()
-        values.update({"budget": Decimal(risk_dict.get("budget"))})
-        values.update({"currency": risk_dict.get("currency")})
-        values.update({"mappings": discrete_thresholds_repo.load().to_dict()})
-        risk = HybridRisk(values=values)
+        if risk_cache is not None:
+            risk = risk_cache.evaluate(values, tolerance=tolerance)
+        else:
+            risk = HybridRisk(values=values)
         parameters.update({"risk": risk, "questionaires": questionaires})
         return RiskScenario(parameters=parameters)
     except Exception as e:
@@ -77,6 +96,24 @@ def set_questionaire_answers(
     return qs
 
 
+def read_answers(form=None, template=None) -> dict:
+    """Answer index vectors per dimension from q_<dim>_<index> form fields."""
+    answers = template.blank_answers()
+    for dim_key, dim_answers in answers.items():
+        qtemplate = template.get(dim_key)
+        for qi in range(len(dim_answers)):
+            raw = form.get(f"q_{dim_key}_{qi}")
+            if raw is None or str(raw).strip() == "":
+                continue
+            try:
+                ans_idx = int(raw)
+            except ValueError:
+                continue
+            if 0 <= ans_idx < qtemplate.alternative_counts[qi]:
+                dim_answers[qi] = ans_idx
+    return answers
+
+
 def set_scenario_parameters(form: FormData = None) -> dict[str:str]:
     return {
         "name": str(form.get("name", "")).strip(),
@@ -24,19 +24,31 @@
 
 from __future__ import annotations
 
-import json
 from pathlib import Path
+from typing import Optional
+
+from filesystem.codec import JsonCodec, get_codec
+from filesystem.filecache import FileCache, shared_cache
 
 
 class JsonActorsRepository:
-    def __init__(self, path: Path):
+    def __init__(
+        self,
+        path: Path,
+        cache: FileCache = shared_cache,
+        codec: Optional[JsonCodec] = None,
+    ):
         self.path = path
+        self.cache = cache
+        self.codec = codec or get_codec()
 
     def load(self) -> list[str]:
-        if not self.path.exists():
+        return list(self.cache.get(self.path, self._read))
+
+    def _read(self, path: Path) -> list[str]:
+        if not path.exists():
             return []
-        with self.path.open("r", encoding="utf-8") as f:
-            data = json.load(f)
+        data = self.codec.read(path)
 
         actors = data.get("actors", [])
         cleaned = sorted({str(a).strip() for a in actors if str(a).strip()})
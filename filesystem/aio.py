@@ -0,0 +1,104 @@
+#
+# MIT License
+#
+# Copyright (c) 2025 Martin Vesterlund
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+
+"""
+Asynkront gränssnitt mot repona.
+
+Repona gör vanlig blockerande fil- och databas-I/O. aio(repo) ger samma
+metoder som korutiner som körs i en begränsad trådpool, så en långsam
+disk stoppar bara sin egen förfrågan och inte händelseloopen:
+
+    draft = await aio(draft_repo).load(draft_id)
+"""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional, TypeVar
+
+T = TypeVar("T")
+
+IO_WORKERS = int(os.environ.get("IO_WORKERS", "8"))
+
+_executor: Optional[ThreadPoolExecutor] = None
+_lock = threading.Lock()
+
+
+def io_executor() -> ThreadPoolExecutor:
+    """Den delade trådpoolen, skapas vid första användningen."""
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=IO_WORKERS, thread_name_prefix="repo-io"
+            )
+        return _executor
+
+
+def shutdown_io() -> None:
+    """Vänta in pågående anrop och stäng poolen. En ny skapas vid behov."""
+    global _executor
+    with _lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=True)
+
+
+async def run_io(func: Callable[..., T], /, *args: Any, **kwargs: Any) -> T:
+    """Kör ett blockerande anrop i I/O-poolen."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        io_executor(), functools.partial(func, *args, **kwargs)
+    )
+
+
+class AsyncRepository:
+    """Repots metoder som korutiner, övriga attribut som de är."""
+
+    __slots__ = ("repo",)
+
+    def __init__(self, repo: Any):
+        self.repo = repo
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self.repo, name)
+        if not callable(attr):
+            return attr
+
+        @functools.wraps(attr)
+        async def call(*args: Any, **kwargs: Any) -> Any:
+            return await run_io(attr, *args, **kwargs)
+
+        return call
+
+    def __repr__(self) -> str:
+        return f"AsyncRepository({self.repo!r})"
+
+
+def aio(repo: Any) -> AsyncRepository:
+    return AsyncRepository(repo)
@@ -0,0 +1,149 @@
+#
+# MIT License
+#
+# Copyright (c) 2025 Martin Vesterlund
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+
+"""
+Kodning av det som repona sparar.
+
+Alla codecs skriver JSON, så filerna kan läsas av vilken codec som helst.
+Decimal, numpy-värden och MonteCarloRange kodas direkt utan att gå via
+to_dict(). orjson används om paketet finns, annars json med kompakt
+utdata. PrettyCodec ger indenterad JSON för export och handredigering.
+
+Codec väljs med miljövariabeln STORAGE_CODEC (orjson, json eller pretty).
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from decimal import Decimal
+from pathlib import Path
+from typing import Any, Callable, Optional, Union
+
+import numpy
+from otyg_risk_base.montecarlo import MonteCarloRange
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - valfritt beroende
+    orjson = None
+
+
+def _range(value: MonteCarloRange) -> dict[str, float]:
+    return {
+        "min": float(value.min),
+        "probable": float(value.probable),
+        "max": float(value.max),
+    }
+
+
+_ENCODERS: dict[type, Callable[[Any], Any]] = {
+    Decimal: float,
+    MonteCarloRange: _range,
+}
+
+
+def encode(obj: Any) -> Any:
+    """default-funktion för värden som JSON inte känner till."""
+    encoder = _ENCODERS.get(type(obj))
+    if encoder is not None:
+        return encoder(obj)
+    if isinstance(obj, numpy.ndarray):
+        return obj.tolist()
+    if isinstance(obj, numpy.generic):
+        return obj.item()
+    if hasattr(obj, "to_dict"):
+        return obj.to_dict()
+    raise TypeError(f"Kan inte koda {type(obj).__name__}")
+
+
+class JsonCodec:
+    """Standardbibliotekets json, kompakt."""
+
+    name = "json"
+    # En rad per dokument, kan användas i journaler
+    compact = True
+
+    def dumps(self, obj: Any) -> bytes:
+        return json.dumps(
+            obj, ensure_ascii=False, separators=(",", ":"), default=encode
+        ).encode("utf-8")
+
+    def loads(self, data: Union[bytes, str]) -> Any:
+        return json.loads(data)
+
+    def read(self, path: Path) -> Any:
+        return self.loads(Path(path).read_bytes())
+
+
+class PrettyCodec(JsonCodec):
+    """Indenterad JSON för export."""
+
+    name = "pretty"
+    compact = False
+
+    def dumps(self, obj: Any) -> bytes:
+        return json.dumps(obj, ensure_ascii=False, indent=2, default=encode).encode(
+            "utf-8"
+        )
+
+
+class OrjsonCodec(JsonCodec):
+    """orjson, som kodar numpy-arrayer utan att gå via listor."""
+
+    name = "orjson"
+
+    def __init__(self):
+        if orjson is None:
+            raise ImportError("STORAGE_CODEC=orjson kräver paketet 'orjson'")
+        self.option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+    def dumps(self, obj: Any) -> bytes:
+        return orjson.dumps(obj, default=encode, option=self.option)
+
+    def loads(self, data: Union[bytes, str]) -> Any:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            # NaN och Infinity, som json skriver men orjson inte läser
+            return json.loads(data)
+
+
+CODECS = {"json": JsonCodec, "pretty": PrettyCodec, "orjson": OrjsonCodec}
+
+_default: Optional[JsonCodec] = None
+
+
+def get_codec(name: Optional[str] = None) -> JsonCodec:
+    """Codec med namnet name, som standard enligt STORAGE_CODEC."""
+    global _default
+    if name is None:
+        if _default is None:
+            fallback = "orjson" if orjson is not None else "json"
+            _default = get_codec(os.environ.get("STORAGE_CODEC", fallback))
+        return _default
+    try:
+        return CODECS[name]()
+    except KeyError:
+        raise ValueError(f"Okänd codec: {name}") from None
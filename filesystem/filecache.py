@@ -0,0 +1,161 @@
+#
+# MIT License
+#
+# Copyright (c) 2025 Martin Vesterlund
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+
+"""
+Delad cache för referensdata (aktörer, hot, sårbarheter, kategorier,
+tröskelvärden och questionaires).
+
+Ett värde byggs från en fil och gäller så länge filens mtime och storlek
+är oförändrade, vilket kontrolleras med ett stat()-anrop per läsning.
+Samtidiga läsare av samma inaktuella värde väntar på ett enda bygge.
+
+Med watch() bevakas katalogerna i stället: värden för filer i dem
+returneras utan stat() och byggs om i bevakarens tråd när filerna ändras,
+så att ingen förfrågan behöver vänta på ett bygge.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+from pathlib import Path
+from typing import Any, Callable, Hashable, Iterable, Optional, TypeVar
+
+from filesystem.paths import logger
+from filesystem.watcher import Watcher
+
+T = TypeVar("T")
+
+
+def signature(path: Path) -> Optional[tuple[int, int]]:
+    """(mtime_ns, size), None om filen saknas."""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+class FileCache:
+    def __init__(self):
+        # (path, key) -> (signatur, värde, build)
+        self._entries: dict[tuple[Path, Hashable], tuple[Any, Any, Callable]] = {}
+        self._locks: dict[tuple[Path, Hashable], threading.Lock] = {}
+        self._lock = threading.Lock()
+        self._watched: frozenset[Path] = frozenset()
+        self.watcher: Optional[Watcher] = None
+
+    def _key_lock(self, entry_key) -> threading.Lock:
+        with self._lock:
+            return self._locks.setdefault(entry_key, threading.Lock())
+
+    def _is_watched(self, path: Path) -> bool:
+        watched = self._watched
+        if not watched or not (path in watched or path.parent in watched):
+            return False
+        # Har bevakaren stannat gäller stat() igen
+        return self.watcher is not None and self.watcher.running
+
+    def get(self, path: Path, build: Callable[[Path], T], key: Hashable = None) -> T:
+        """
+        Värdet för (path, key), byggt med build(path) om filen har ändrats.
+        build anropas även när filen saknas och avgör själv vad det betyder.
+        key är som standard builds namn, så olika byggen av samma fil hålls
+        isär.
+        """
+        if key is None:
+            key = getattr(build, "__qualname__", build)
+        path = Path(os.path.abspath(path))
+        entry_key = (path, key)
+        entry = self._entries.get(entry_key)
+        if entry is not None and self._is_watched(path):
+            return entry[1]
+        sig = signature(path)
+        if entry is not None and entry[0] == sig:
+            return entry[1]
+        with self._key_lock(entry_key):
+            entry = self._entries.get(entry_key)
+            if entry is not None and entry[0] == sig:
+                return entry[1]
+            value = build(path)
+            # Ändrad under bygget, nästa läsning bygger om
+            if signature(path) == sig:
+                self._entries[entry_key] = (sig, value, build)
+            return value
+
+    def refresh(self, paths: Iterable[Path]) -> None:
+        """
+        Bygg om värdena för paths och byt ut dem. Läsarna får det gamla
+        värdet tills det nya är klart. Ett bygge som misslyckas tar bort
+        värdet, så att felet visas vid nästa läsning.
+        """
+        paths = {Path(os.path.abspath(p)) for p in paths}
+        for entry_key in [k for k in list(self._entries) if k[0] in paths]:
+            with self._key_lock(entry_key):
+                entry = self._entries.get(entry_key)
+                if entry is None:
+                    continue
+                path, build = entry_key[0], entry[2]
+                sig = signature(path)
+                if sig == entry[0]:
+                    continue
+                try:
+                    value = build(path)
+                except Exception:
+                    logger.exception("Kunde inte bygga om %s", path)
+                    self._entries.pop(entry_key, None)
+                    continue
+                self._entries[entry_key] = (sig, value, build)
+
+    def watch(self, folders: Iterable[Path], **kwargs) -> Watcher:
+        """
+        Bevaka folders och lita på bevakningen i stället för stat(). kwargs
+        skickas till Watcher.
+        """
+        self.unwatch()
+        folders = [Path(os.path.abspath(f)) for f in folders]
+        # Värden som byggts före bevakningen kan vara inaktuella
+        self.refresh(p for p, _ in list(self._entries))
+        self.watcher = Watcher(folders, self.refresh, **kwargs).start()
+        self._watched = frozenset(folders)
+        return self.watcher
+
+    def unwatch(self) -> None:
+        self._watched = frozenset()
+        if self.watcher is not None:
+            self.watcher.stop()
+            self.watcher = None
+
+    def invalidate(self, path: Optional[Path] = None) -> None:
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+            else:
+                path = Path(os.path.abspath(path))
+                for k in [k for k in self._entries if k[0] == path]:
+                    del self._entries[k]
+
+
+# Delas av repona om inget annat anges
+shared_cache = FileCache()
@@ -61,20 +61,42 @@ def user_app_root() -> Path:
     return Path.home() / ".local" / "share" / APP_NAME
 
 
+def user_data_paths() -> dict[str, Path]:
+    """
+    Samma sökvägar som ensure_user_data_initialized, utan att något skapas
+    eller kopieras.
+    """
+    root = user_app_root()
+    data_dir = root / "data"
+    return {
+        "root": root,
+        "data": data_dir,
+        "analyses": data_dir / "analyses",
+        "drafts": data_dir / "drafts",
+        "questionaires": data_dir / "questionaires",
+        "actors_json": data_dir / "actors.json",
+        "threats_json": data_dir / "threats.json",
+        "vulnerabilities_json": data_dir / "vulnerabilities.json",
+        "cache": root / "cache",
+    }
+
+
 def ensure_user_data_initialized() -> dict[str, Path]:
     """
     Skapar användarmappar och kopierar seed-data vid första start.
 
     Returnerar paths:
-      root, data, analyses, drafts, questionaires, actors_json, threats_json, vulnerabilities_json
+      root, data, analyses, drafts, questionaires, actors_json, threats_json, vulnerabilities_json,
+      cache (skapas först när den används)
     """
 
-    root = user_app_root()
+    paths = user_data_paths()
+    root = paths["root"]
     logger.info("Setting up datadirectories, base: " + str(root.absolute()))
-    data_dir = root / "data"
-    analyses_dir = data_dir / "analyses"
-    drafts_dir = data_dir / "drafts"
-    questionaires_dir = data_dir / "questionaires"
+    data_dir = paths["data"]
+    analyses_dir = paths["analyses"]
+    drafts_dir = paths["drafts"]
+    questionaires_dir = paths["questionaires"]
 
     analyses_dir.mkdir(parents=True, exist_ok=True)
     drafts_dir.mkdir(parents=True, exist_ok=True)
@@ -109,13 +131,4 @@ def ensure_user_data_initialized() -> dict[str, Path]:
                 )
                 shutil.copy2(src, dst)
 
-    return {
-        "root": root,
-        "data": data_dir,
-        "analyses": analyses_dir,
-        "drafts": drafts_dir,
-        "questionaires": questionaires_dir,
-        "actors_json": data_dir / "actors.json",
-        "threats_json": data_dir / "threats.json",
-        "vulnerabilities_json": data_dir / "vulnerabilities.json",
-    }
+    return paths
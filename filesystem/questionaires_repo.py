@@ -24,10 +24,11 @@
 
 from __future__ import annotations
 
-import json
 from pathlib import Path
-from typing import Any
-from riskcalculator.questionaire import Questionaire
+from typing import Any, Optional
+from filesystem.codec import JsonCodec, get_codec
+from filesystem.filecache import FileCache, shared_cache
+from riskcalculator.template import QuestionairesTemplate
 
 
 class JsonQuestionairesRepository:
@@ -43,31 +44,49 @@ class JsonQuestionairesRepository:
       }
     """
 
-    def __init__(self, folder: Path):
+    def __init__(
+        self,
+        folder: Path,
+        cache: FileCache = shared_cache,
+        codec: Optional[JsonCodec] = None,
+    ):
         self.folder = folder
         self.folder.mkdir(parents=True, exist_ok=True)
+        self.cache = cache
+        self.codec = codec or get_codec()
 
     def _path(self, set_id: str) -> Path:
         return self.folder / f"{set_id}.json"
 
     def list_sets(self) -> list[str]:
-        return sorted([p.stem for p in self.folder.glob("*.json")])
+        # Katalogens mtime ändras när filer läggs till eller tas bort
+        return list(self.cache.get(self.folder, self._list_sets))
+
+    def _list_sets(self, folder: Path) -> list[str]:
+        return sorted([p.stem for p in folder.glob("*.json")])
 
     def load_dict(self, set_id: str) -> dict[str, Any]:
         p = self._path(set_id)
         if not p.exists():
             raise FileNotFoundError(set_id)
-        with p.open("r", encoding="utf-8") as f:
-            return json.load(f)
+        return self.codec.read(p)
 
     def load_objects(self, set_id: str) -> dict[str, Any]:
         """
         Returnerar dict med nycklar: tef, vuln, lm
         och värden som är dina Questionaire-objekt.
         """
-        raw = self.load_dict(set_id)
+        return self.load_template(set_id).instantiate()
 
-        tef = Questionaire.from_dict(raw.get("tef", {}))
-        vuln = Questionaire.from_dict(raw.get("vuln", {}))
-        lm = Questionaire.from_dict(raw.get("lm", {}))
-        return {"qset": set_id, "tef": tef, "vuln": vuln, "lm": lm}
+    def load_template(self, set_id: str) -> QuestionairesTemplate:
+        """
+        Returnerar en kompilerad, delad och skrivskyddad mall för setet.
+        Mallen byggs om endast när filen har ändrats.
+        """
+        return self.cache.get(
+            self._path(set_id),
+            lambda path: QuestionairesTemplate.from_dict(
+                set_id, self.load_dict(set_id)
+            ),
+            key="template",
+        )
@@ -24,16 +24,27 @@
 
 from __future__ import annotations
 
-import json
+import copy
+import hashlib
+import math
+import os
 import re
-from dataclasses import dataclass
+import shutil
+import tempfile
+import threading
+from abc import ABC, abstractmethod
+from dataclasses import asdict, dataclass
 from datetime import datetime
 from pathlib import Path
-from typing import Any
+from typing import Any, Optional
 import uuid
 
 from otyg_risk_base.qualitative_scale import QualitativeScale
-from riskcalculator.util import ComplexEncoder
+from filesystem.codec import JsonCodec, get_codec
+from filesystem.filecache import FileCache, shared_cache
+from filesystem.samples import SampleStore, refs
+from filesystem.versions import VersionStore, is_delta
+from riskcalculator.definitions import DefinitionStore
 
 
 @dataclass(frozen=True)
@@ -44,6 +55,25 @@ class AnalysisListItem:
     owner: str
     version: str
     summary: str
+    scenario_count: int = 0
+    mtime_ns: int = 0
+    size: int = 0
+
+
+@dataclass(frozen=True)
+class AnalysisPage:
+    items: list[AnalysisListItem]
+    total: int
+    page: int
+    per_page: int
+
+    @property
+    def pages(self) -> int:
+        return max(1, math.ceil(self.total / self.per_page))
+
+
+SORT_KEYS = ("date", "title", "owner", "version", "scenario_count", "mtime_ns")
+INDEX_VERSION = 1
 
 
 def _safe_slug(text: str) -> str:
@@ -53,77 +83,351 @@ def _safe_slug(text: str) -> str:
     return text or "analysis"
 
 
+def _list_item(analysis_id: str, d: dict[str, Any], st: os.stat_result):
+    return AnalysisListItem(
+        analysis_id=analysis_id,
+        title=str(d.get("analysis_object", analysis_id)),
+        date=str(d.get("date", "")),
+        owner=str(d.get("owner", "")),
+        version=str(d.get("version", "")),
+        summary=str(d.get("summary", "")),
+        scenario_count=len(d.get("scenarios") or []),
+        mtime_ns=st.st_mtime_ns,
+        size=st.st_size,
+    )
+
+
 class JsonAnalysisRepository:
-    def __init__(self, analyses_folder: Path):
+    """
+    Sparar analyser under data/analyses/<analysis_id>.json, dragningarna
+    under data/analyses/samples/.
+
+    Listningen läser ett metadataindex (data/analyses/.index) i stället för
+    att öppna varje analys. Indexet kontrolleras mot filernas mtime och
+    storlek, så endast nya eller ändrade analyser läses om.
+
+    En ny version av en analys sparas som en delta mot den föregående, se
+    filesystem.versions.
+    """
+
+    INDEX_NAME = ".index"
+
+    def __init__(self, analyses_folder: Path, codec: Optional[JsonCodec] = None):
         self.folder = analyses_folder
+        self.codec = codec or get_codec()
         self.folder.mkdir(parents=True, exist_ok=True)
+        self._index: Optional[dict[str, AnalysisListItem]] = None
+        self._lock = threading.Lock()
+        self.samples = SampleStore(self.folder / "samples")
+        self.definitions = DefinitionStore(self.folder / "definitions")
+        self.versions = VersionStore(self._read_stored, self._normalize)
 
-    def list(self) -> list[AnalysisListItem]:
-        items: list[AnalysisListItem] = []
-        for p in sorted(self.folder.glob("*.json")):
-            try:
-                with p.open("r", encoding="utf-8") as f:
-                    d = json.load(f)
-            except Exception:
-                continue
-
-            items.append(
-                AnalysisListItem(
-                    analysis_id=p.stem,
-                    title=str(d.get("analysis_object", p.stem)),
-                    date=str(d.get("date", "")),
-                    owner=str(d.get("owner", "")),
-                    version=str(d.get("version", "")),
-                    summary=str(d.get("summary", "")),
-                )
-            )
+    @property
+    def index_path(self) -> Path:
+        return self.folder / self.INDEX_NAME
+
+    def _read_index(self) -> dict[str, AnalysisListItem]:
+        try:
+            raw = self.codec.read(self.index_path)
+            if raw.get("version") != INDEX_VERSION:
+                return {}
+            return {
+                analysis_id: AnalysisListItem(**values)
+                for analysis_id, values in raw.get("entries", {}).items()
+            }
+        except (OSError, ValueError, TypeError):
+            return {}
+
+    def _write_index(self, index: dict[str, AnalysisListItem]) -> None:
+        data = {
+            "version": INDEX_VERSION,
+            "entries": {k: asdict(v) for k, v in index.items()},
+        }
+        try:
+            fd, tmp = tempfile.mkstemp(dir=self.folder, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(self.codec.dumps(data))
+            os.replace(tmp, self.index_path)
+        except OSError:
+            # Indexet är en cache, listningen fungerar utan det
+            pass
+
+    def _read_item(self, path: Path, st: os.stat_result):
+        try:
+            d = self.codec.read(path)
+        except Exception:
+            return None
+        if not isinstance(d, dict):
+            return None
+        try:
+            d = self.versions.materialize(d)
+        except Exception:
+            return None
+        return _list_item(path.stem, d, st)
+
+    def _revalidate(self, rebuild: bool = False) -> dict[str, AnalysisListItem]:
+        with self._lock:
+            if self._index is None and not rebuild:
+                self._index = self._read_index()
+            old = {} if rebuild else self._index
+            index: dict[str, AnalysisListItem] = {}
+            changed = rebuild
+            with os.scandir(self.folder) as entries:
+                for entry in entries:
+                    if not entry.name.endswith(".json") or not entry.is_file():
+                        continue
+                    analysis_id = entry.name[: -len(".json")]
+                    st = entry.stat()
+                    item = old.get(analysis_id)
+                    if (
+                        item is None
+                        or item.mtime_ns != st.st_mtime_ns
+                        or item.size != st.st_size
+                    ):
+                        item = self._read_item(Path(entry.path), st)
+                        changed = True
+                        if item is None:
+                            continue
+                    index[analysis_id] = item
+            if changed or len(index) != len(old):
+                self._write_index(index)
+            self._index = index
+            return index
 
+    def rebuild_index(self) -> None:
+        """Läs om alla analyser och skriv ett nytt index."""
+        self._revalidate(rebuild=True)
+
+    def list(self) -> list[AnalysisListItem]:
+        items = list(self._revalidate().values())
         # Om date är ISO (YYYY-MM-DD) funkar str-sort ok
-        items.sort(key=lambda x: x.date, reverse=True)
+        items.sort(key=lambda x: (x.date, x.analysis_id), reverse=True)
         return items
 
-    def get_dict(self, analysis_id: str) -> dict[str, Any]:
+    def query(
+        self,
+        page: int = 1,
+        per_page: int = 50,
+        sort: str = "date",
+        descending: bool = True,
+        owner: Optional[str] = None,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+    ) -> AnalysisPage:
+        """
+        En sida av listningen, sorterad och filtrerad på ägare och datum
+        (ISO-datum, gränserna ingår).
+        """
+        if sort not in SORT_KEYS:
+            sort = "date"
+        items = self._revalidate().values()
+        if owner:
+            needle = owner.strip().lower()
+            items = [i for i in items if needle in i.owner.lower()]
+        if date_from:
+            items = [i for i in items if i.date[: len(date_from)] >= date_from]
+        if date_to:
+            items = [i for i in items if i.date[: len(date_to)] <= date_to]
+        items = sorted(
+            items,
+            key=lambda i: (getattr(i, sort), i.analysis_id),
+            reverse=descending,
+        )
+        per_page = max(1, per_page)
+        page = max(1, page)
+        start = (page - 1) * per_page
+        return AnalysisPage(
+            items=items[start : start + per_page],
+            total=len(items),
+            page=page,
+            per_page=per_page,
+        )
+
+    def signature(self, analysis_id: str) -> str:
+        """
+        Ändras när den sparade analysen ändras, utan att läsa den. Sparade
+        analyser skrivs aldrig om, så filens mtime och storlek räcker.
+        """
+        try:
+            st = (self.folder / f"{analysis_id}.json").stat()
+        except FileNotFoundError:
+            raise FileNotFoundError(analysis_id) from None
+        return f"{st.st_mtime_ns:x}-{st.st_size:x}"
+
+    def listing_signature(self) -> str:
+        """Ändras när någon analys läggs till, tas bort eller ändras."""
+        h = hashlib.blake2b(digest_size=16)
+        for analysis_id, item in sorted(self._revalidate().items()):
+            h.update(f"{analysis_id}:{item.mtime_ns}:{item.size};".encode("utf-8"))
+        return h.hexdigest()
+
+    def _read_stored(self, analysis_id: str) -> dict[str, Any]:
         p = self.folder / f"{analysis_id}.json"
         if not p.exists():
             raise FileNotFoundError(analysis_id)
-        with p.open("r", encoding="utf-8") as f:
-            return json.load(f)
+        return self.codec.read(p)
+
+    def _normalize(self, analysis: dict[str, Any]) -> dict[str, Any]:
+        return self.codec.loads(self.codec.dumps(analysis))
+
+    def get_dict(self, analysis_id: str) -> dict[str, Any]:
+        analysis = self._read_stored(analysis_id)
+        if is_delta(analysis):
+            # Basen delas med versionscachen
+            analysis = copy.deepcopy(self.versions.materialize(analysis))
+        return self.definitions.expand_document(self.samples.resolve(analysis))
 
     def save_new(self, analysis: dict[str, Any]) -> str:
-        slug = _safe_slug(str(analysis.get("analysis_object", "")))
-        ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-        analysis_id = f"{slug}_{ts}"
-        path = self.folder / f"{analysis_id}.json"
-        with path.open("w", encoding="utf-8") as f:
-            json.dump(analysis, f, ensure_ascii=False, indent=2)
+        analysis_id = new_analysis_id(analysis)
+        analysis = self.definitions.compress_document(
+            self.samples.externalize(analysis)
+        )
+        body = self.codec.dumps(self.versions.store(analysis))
+        # Två analyser med samma namn inom samma sekund får inte skriva över
+        # varandra, en senare version kan bygga på den första
+        candidate, n = analysis_id, 1
+        while True:
+            path = self.folder / f"{candidate}.json"
+            try:
+                with path.open("xb") as f:
+                    f.write(body)
+                break
+            except FileExistsError:
+                n += 1
+                candidate = f"{analysis_id}_{n}"
+        analysis_id = candidate
+        with self._lock:
+            if self._index is not None:
+                self._index[analysis_id] = _list_item(
+                    analysis_id, analysis, path.stat()
+                )
+                self._write_index(self._index)
         return analysis_id
 
 
-class DraftRepository:
+def new_draft_id() -> str:
+    return datetime.now().strftime("draft_%Y%m%d_%H%M%S_%f")
+
+
+def new_draft() -> dict[str, Any]:
+    return {
+        "analysis_object": "",
+        "version": "",
+        "date": "",
+        "scope": "",
+        "owner": "",
+        "scenarios": [],
+    }
+
+
+def new_analysis_id(analysis: dict[str, Any]) -> str:
+    slug = _safe_slug(str(analysis.get("analysis_object", "")))
+    ts = datetime.now().strftime("%Y%m%d_%H%M%S")
+    return f"{slug}_{ts}"
+
+
+DRAFT_METADATA = ("analysis_object", "version", "date", "scope", "owner")
+COMPACT_AFTER = 64
+
+
+def apply_draft_op(draft: dict[str, Any], op: dict[str, Any]) -> dict[str, Any]:
+    """
+    Applicera en journalpost på ett utkast. Posterna är set-metadata,
+    add-scenario, update-scenario och delete-scenario.
+    """
+    scenarios = draft.setdefault("scenarios", [])
+    kind = op["op"]
+    if kind == "set-metadata":
+        draft.update(op["fields"])
+    elif kind == "add-scenario":
+        scenarios.append(op["scenario"])
+    elif kind == "update-scenario":
+        scenarios[_scenario_index(scenarios, op["index"])] = op["scenario"]
+    elif kind == "delete-scenario":
+        scenarios.pop(_scenario_index(scenarios, op["index"]))
+    else:
+        raise ValueError(f"Okänd journalpost: {kind}")
+    return draft
+
+
+def _scenario_index(scenarios, index: int) -> int:
+    if not 0 <= index < len(scenarios):
+        raise IndexError(index)
+    return index
+
+
+def _digest_bytes(data: bytes) -> str:
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+class DraftOperations(ABC):
+    """Journalposterna som metoder, append skrivs av respektive repo."""
+
+    @abstractmethod
+    def append(self, draft_id: str, op: dict[str, Any]) -> None:
+        """Lägg op sist i utkastets journal."""
+
+    def set_metadata(self, draft_id: str, fields: dict[str, Any]) -> None:
+        fields = {k: v for k, v in fields.items() if k in DRAFT_METADATA}
+        self.append(draft_id, {"op": "set-metadata", "fields": fields})
+
+    def add_scenario(self, draft_id: str, scenario: dict[str, Any]) -> None:
+        self.append(draft_id, {"op": "add-scenario", "scenario": scenario})
+
+    def update_scenario(
+        self, draft_id: str, index: int, scenario: dict[str, Any]
+    ) -> None:
+        self.append(
+            draft_id, {"op": "update-scenario", "index": index, "scenario": scenario}
+        )
+
+    def delete_scenario(self, draft_id: str, index: int) -> None:
+        self.append(draft_id, {"op": "delete-scenario", "index": index})
+
+
+class DraftRepository(DraftOperations):
     """
-    Sparar utkast under data/drafts/<draft_id>.json
+    Sparar utkast under data/drafts/<draft_id>.json, dragningarna under
+    data/drafts/<draft_id>.samples/ och frågeformulären scenarierna refererar
+    till under data/drafts/definitions/.
+
+    Ändringar skrivs som rader i <draft_id>.journal och spelas upp ovanpå
+    ögonblicksbilden vid load. Journalens första rad pekar ut den
+    ögonblicksbild den bygger på, så en journal som blivit kvar efter ett
+    avbrutet save kastas i stället för att spelas upp två gånger. Efter
+    compact_after poster skrivs en ny ögonblicksbild.
     """
 
-    def __init__(self, drafts_folder: Path):
+    def __init__(
+        self,
+        drafts_folder: Path,
+        compact_after: int = COMPACT_AFTER,
+        codec: Optional[JsonCodec] = None,
+    ):
         self.folder = drafts_folder
         self.folder.mkdir(parents=True, exist_ok=True)
+        self.compact_after = compact_after
+        self.codec = codec or get_codec()
+        # Journalen har en post per rad
+        self._line_codec = self.codec if self.codec.compact else get_codec("json")
+        self._lock = threading.Lock()
+        # draft_id -> (antal poster, antal scenarier, journalens storlek)
+        self._journals: dict[str, tuple[int, int, int]] = {}
+        # Frågeformulären delas av alla utkast
+        self.definitions = DefinitionStore(self.folder / "definitions")
 
     def _path(self, draft_id: str) -> Path:
         return self.folder / f"{draft_id}.json"
 
+    def _journal_path(self, draft_id: str) -> Path:
+        return self.folder / f"{draft_id}.journal"
+
+    def samples(self, draft_id: str) -> SampleStore:
+        return SampleStore(self.folder / f"{draft_id}.samples")
+
     def create(self) -> str:
-        draft_id = datetime.now().strftime("draft_%Y%m%d_%H%M%S_%f")
-        self.save(
-            draft_id,
-            {
-                "analysis_object": "",
-                "version": "",
-                "date": "",
-                "scope": "",
-                "owner": "",
-                "scenarios": [],
-            },
-        )
+        draft_id = new_draft_id()
+        self.save(draft_id, new_draft())
         return draft_id
 
     def create_from(self, draft_dict: dict[str, Any]) -> str:
@@ -138,49 +442,163 @@ class DraftRepository:
         p = self._path(draft_id)
         if not p.exists():
             raise FileNotFoundError(draft_id)
-        with p.open("r", encoding="utf-8") as f:
-            return json.load(f)
+        data = p.read_bytes()
+        draft = self.codec.loads(data)
+        for op in self._read_journal(draft_id, _digest_bytes(data)):
+            apply_draft_op(draft, op)
+        return self.definitions.expand_document(self.samples(draft_id).resolve(draft))
 
     def save(self, draft_id: str, data: dict[str, Any]) -> None:
-        p = self._path(draft_id)
-        with p.open("w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2, cls=ComplexEncoder)
+        with self._lock:
+            self._save(draft_id, data)
+
+    def _save(self, draft_id: str, data: dict[str, Any]) -> None:
+        samples = self.samples(draft_id)
+        data = self.definitions.compress_document(samples.externalize(data))
+        body = self.codec.dumps(data)
+        self._write_atomic(self._path(draft_id), body)
+        # Ny journal som bygger på ögonblicksbilden ovan
+        header = self._line_codec.dumps({"snapshot": _digest_bytes(body)}) + b"\n"
+        self._write_atomic(self._journal_path(draft_id), header)
+        self._journals[draft_id] = (0, len(data.get("scenarios", [])), len(header))
+        try:
+            # Dragningar från ersatta eller borttagna scenarier
+            samples.prune(refs(data))
+        except OSError:
+            pass
+
+    def _write_atomic(self, path: Path, data: bytes) -> None:
+        fd, tmp = tempfile.mkstemp(dir=self.folder, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, path)
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+
+    def _read_journal(self, draft_id: str, snapshot: str) -> list[dict[str, Any]]:
+        p = self._journal_path(draft_id)
+        try:
+            lines = p.read_bytes().splitlines()
+        except FileNotFoundError:
+            return []
+        codec = self._line_codec
+        if not lines or codec.loads(lines[0]).get("snapshot") != snapshot:
+            return []
+        ops = []
+        for line in lines[1:]:
+            try:
+                ops.append(codec.loads(line))
+            except ValueError:
+                # En halvskriven sista rad från ett avbrott
+                break
+        return ops
+
+    def append(self, draft_id: str, op: dict[str, Any]) -> None:
+        """Lägg till en journalpost, utkastet skrivs inte om."""
+        with self._lock:
+            p = self._path(draft_id)
+            if not p.exists():
+                raise FileNotFoundError(draft_id)
+            journal = self._journal_path(draft_id)
+            entries, scenarios, size = self._journals.get(draft_id, (0, 0, -1))
+            try:
+                known = journal.stat().st_size == size
+            except FileNotFoundError:
+                known = False
+            if not known:
+                # Journalen har ändrats utanför repot eller saknas, börja om
+                # från en ny ögonblicksbild
+                draft = apply_draft_op(self.load(draft_id), op)
+                self._save(draft_id, draft)
+                return
+            if op["op"] in ("update-scenario", "delete-scenario"):
+                _scenario_index(range(scenarios), op["index"])
+            op = self.definitions.compress_document(
+                self.samples(draft_id).externalize(op)
+            )
+            line = self._line_codec.dumps(op) + b"\n"
+            with journal.open("ab") as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+            scenarios += {"add-scenario": 1, "delete-scenario": -1}.get(op["op"], 0)
+            self._journals[draft_id] = (entries + 1, scenarios, size + len(line))
+            if entries + 1 >= self.compact_after:
+                self._save(draft_id, self.load(draft_id))
+
+    def compact(self, draft_id: str) -> None:
+        """Skriv en ny ögonblicksbild och töm journalen."""
+        with self._lock:
+            self._save(draft_id, self.load(draft_id))
 
     def delete(self, draft_id: str) -> None:
-        p = self._path(draft_id)
-        if p.exists():
-            p.unlink()
+        with self._lock:
+            self._journals.pop(draft_id, None)
+            for p in (self._path(draft_id), self._journal_path(draft_id)):
+                p.unlink(missing_ok=True)
+            shutil.rmtree(self.samples(draft_id).folder, ignore_errors=True)
 
 
 class JsonCategoryRepository:
-    def __init__(self, path: Path):
+    def __init__(
+        self,
+        path: Path,
+        cache: FileCache = shared_cache,
+        codec: Optional[JsonCodec] = None,
+    ):
         self.path = path
+        self.cache = cache
+        self.codec = codec or get_codec()
 
     def load(self) -> list[str]:
-        if not self.path.exists():
+        return list(self.cache.get(self.path, self._read))
+
+    def _read(self, path: Path) -> list[str]:
+        if not path.exists():
             return []
-        with self.path.open("r", encoding="utf-8") as f:
-            data = json.load(f)
+        data = self.codec.read(path)
         categories = data.get("categories", [])
         cleaned = sorted({str(c).strip() for c in categories if str(c).strip()})
         return cleaned
 
 
 class DiscreteThresholdsRepository:
-    def __init__(self, path: Path):
+    """
+    Skalorna byggs en gång per fil och delas mellan anropen, de ska inte
+    ändras av den som hämtar dem.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        cache: FileCache = shared_cache,
+        codec: Optional[JsonCodec] = None,
+    ):
         self.path = path
+        self.cache = cache
+        self.codec = codec or get_codec()
 
     def __read_file(self):
-        if not self.path.exists():
-            raise FileNotFoundError(self.path)
-        with self.path.open("r", encoding="utf-8") as f:
-            data = json.load(f)
-        return data
+        return self.cache.get(self.path, self._read)
+
+    def _read(self, path: Path) -> dict[str, Any]:
+        if not path.exists():
+            raise FileNotFoundError(path)
+        return self.codec.read(path)
 
     def get_set_names(self):
         data = self.__read_file()
         return data.keys()
 
     def load(self, threshold_set: str = "default_thresholds") -> QualitativeScale:
-        data = self.__read_file()
-        return QualitativeScale(scales=data.get(threshold_set, {}))
+        return self.cache.get(
+            self.path,
+            lambda path: QualitativeScale(
+                scales=self.__read_file().get(threshold_set, {})
+            ),
+            key=("scale", threshold_set),
+        )
@@ -2,16 +2,24 @@
 # -*- coding: utf-8 -*-
 
 import argparse
+import copy
 import json
 import os
 from datetime import datetime
 from typing import Any, Dict, List, Tuple, Optional
 
+from filesystem.samples import SampleStore
+from filesystem.versions import VersionStore, is_delta
+from riskcalculator.definitions import DefinitionStore
+
 
 # ------------------------------------------------------------
 # Configuration
 # ------------------------------------------------------------
 
+# Bump when the report layout changes so cached reports are rebuilt
+REPORT_VERSION = 1
+
 EXCLUDE_KEYS = {
     "__samples",
     "alternatives",
@@ -661,11 +669,30 @@ def build_pdf_report(
 # ------------------------------------------------------------
 
 
-def load_json(path: str) -> Dict[str, Any]:
+def _read_json(path: str) -> Any:
     with open(path, "r", encoding="utf-8") as f:
         return json.load(f)
 
 
+def load_json(path: str) -> Dict[str, Any]:
+    """
+    En analys som sparats av JsonAnalysisRepository läses som get_dict:
+    versioner byggs upp från sina baser och dragningar och frågeformulär
+    hämtas från samples/ och definitions/ bredvid analysen.
+    """
+    folder = os.path.dirname(path) or "."
+    data = _read_json(path)
+    if is_delta(data):
+        versions = VersionStore(
+            lambda analysis_id: _read_json(os.path.join(folder, f"{analysis_id}.json")),
+            lambda doc: doc,
+        )
+        data = copy.deepcopy(versions.materialize(data))
+    data = SampleStore(os.path.join(folder, "samples")).resolve(data)
+    store = DefinitionStore(os.path.join(folder, "definitions"))
+    return store.expand_document(data)
+
+
 def default_out_name(in_path: str, ext: str) -> str:
     base = os.path.splitext(os.path.basename(in_path))[0]
     return f"{base}_rapport.{ext}"
@@ -0,0 +1,153 @@
+#
+# MIT License
+#
+# Copyright (c) 2025 Martin Vesterlund
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+
+"""
+Diskcache för genererade rapporter (PDF).
+
+En rapport nycklas på en digest av det som renderas (den sanerade
+analysen och källnamnet) och renderarens version, så en oförändrad analys
+byggs bara en gång. Katalogen hålls under max_bytes genom att de minst
+nyligen använda filerna tas bort först.
+
+Bygget görs av anroparen: reserve() ger en temporär fil i katalogen,
+commit() flyttar den på plats och discard() städar efter ett misslyckat
+bygge. Så kan bygget köras var som helst, t.ex. i en arbetsprocess.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Optional
+
+from filesystem.report import REPORT_VERSION, sanitize
+
+SUFFIX = ".pdf"
+TMP_SUFFIX = ".tmp"
+# Temporära filer äldre än så kommer från avbrutna byggen
+TMP_MAX_AGE = 3600
+
+
+def digest(data: dict[str, Any], source_name: str = "") -> str:
+    """Digest av rapportens innehåll och renderarens version."""
+    key = {
+        "version": REPORT_VERSION,
+        "source_name": source_name,
+        "data": sanitize(data),
+    }
+    text = json.dumps(
+        key, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str
+    )
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=20).hexdigest()
+
+
+class ReportCache:
+    def __init__(self, folder: Path, max_bytes: int = 256 * 1024 * 1024):
+        self.folder = Path(folder)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    def path(self, key: str) -> Path:
+        return self.folder / f"{key}{SUFFIX}"
+
+    def open(self, key: str):
+        """
+        Öppen binär fil för key, None om den saknas. Filen markeras som
+        nyligen använd. Den öppna filen går att läsa klart även om den
+        rensas bort under tiden.
+        """
+        path = self.path(key)
+        try:
+            f = path.open("rb")
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return f
+
+    def reserve(self, key: str) -> Path:
+        """Tom temporär fil i katalogen att bygga key till."""
+        self.folder.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.folder, prefix=f"{key}.", suffix=TMP_SUFFIX)
+        os.close(fd)
+        return Path(tmp)
+
+    def commit(self, key: str, tmp: Path) -> Path:
+        """Flytta ett färdigt bygge på plats och rensa katalogen."""
+        path = self.path(key)
+        os.replace(tmp, path)
+        self.prune(keep=path)
+        return path
+
+    def discard(self, tmp: Path) -> None:
+        Path(tmp).unlink(missing_ok=True)
+
+    def prune(self, keep: Optional[Path] = None) -> None:
+        """Ta bort de äldsta rapporterna tills katalogen ryms i max_bytes."""
+        files = []
+        now = time.time()
+        for path in self.folder.glob("*"):
+            try:
+                st = path.stat()
+            except FileNotFoundError:
+                continue
+            if path.name.endswith(TMP_SUFFIX):
+                if now - st.st_mtime > TMP_MAX_AGE:
+                    self._unlink(path)
+                continue
+            if path.suffix == SUFFIX and path != keep:
+                files.append((st.st_mtime_ns, st.st_size, path))
+        total = sum(size for _, size, _ in files)
+        if keep is not None:
+            try:
+                total += keep.stat().st_size
+            except FileNotFoundError:
+                pass
+        for _, size, path in sorted(files):
+            if total <= self.max_bytes:
+                break
+            if self._unlink(path):
+                total -= size
+
+    @staticmethod
+    def _unlink(path: Path) -> bool:
+        try:
+            path.unlink(missing_ok=True)
+        except OSError:
+            # Öppen för läsning på Windows, tas vid nästa rensning
+            return False
+        return True
+
+    def clear(self) -> None:
+        for path in self.folder.glob(f"*{SUFFIX}"):
+            self._unlink(path)
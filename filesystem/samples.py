@@ -0,0 +1,156 @@
+#
+# MIT License
+#
+# Copyright (c) 2025 Martin Vesterlund
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+
+"""
+Monte Carlo-dragningar som .npy-filer bredvid analyserna och utkasten.
+
+I JSON ersätts varje "__samples"-lista av en referens
+{"npy": <blake2b-digest>, "length": n} och filen heter <digest>.npy.
+Vid inläsning öppnas filerna med numpy.load(mmap_mode="r"), så inga
+dragningar läses förrän histogram, portfölj eller rapport använder dem.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import tempfile
+import weakref
+from pathlib import Path
+from typing import Any
+
+import numpy
+
+SAMPLES_KEY = "__samples"
+# Kortare arrayer än så här ligger kvar i JSON
+MIN_SIDECAR_LENGTH = 64
+
+# id -> array för arrayer som load har öppnat, så att put känner igen dem
+# utan att läsa dem
+_loaded: weakref.WeakValueDictionary = weakref.WeakValueDictionary()
+
+
+def is_ref(value: Any) -> bool:
+    return isinstance(value, dict) and isinstance(value.get("npy"), str)
+
+
+def refs(data: Any) -> set[str]:
+    """Alla digests som data refererar till."""
+    found = set()
+    if isinstance(data, dict):
+        for k, v in data.items():
+            if k == SAMPLES_KEY and is_ref(v):
+                found.add(v["npy"])
+            else:
+                found |= refs(v)
+    elif isinstance(data, list):
+        for v in data:
+            found |= refs(v)
+    return found
+
+
+class SampleStore:
+    def __init__(self, folder: Path):
+        self.folder = Path(folder)
+
+    def path(self, digest: str) -> Path:
+        return self.folder / f"{digest}.npy"
+
+    def put(self, samples) -> dict[str, Any]:
+        """Spara arrayen om den inte redan finns och returnera referensen."""
+        if _loaded.get(id(samples)) is samples:
+            # Redan en fil i den här katalogen, inget behöver läsas
+            source = Path(samples.filename)
+            if source.parent == Path(os.path.abspath(self.folder)):
+                return {"npy": source.stem, "length": len(samples)}
+        array = numpy.ascontiguousarray(samples, dtype=numpy.float64)
+        h = hashlib.blake2b(digest_size=16)
+        h.update(str(array.shape).encode("ascii"))
+        h.update(array.data)
+        digest = h.hexdigest()
+        path = self.path(digest)
+        if not path.exists():
+            self.folder.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=self.folder, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    numpy.save(f, array)
+                os.replace(tmp, path)
+            except BaseException:
+                Path(tmp).unlink(missing_ok=True)
+                raise
+        return {"npy": digest, "length": len(array)}
+
+    def load(self, ref: dict[str, Any]) -> numpy.ndarray:
+        """Minnesmappad och skrivskyddad. En saknad fil ger en tom array."""
+        try:
+            samples = numpy.load(self.path(ref["npy"]), mmap_mode="r")
+        except FileNotFoundError:
+            return numpy.empty(0)
+        _loaded[id(samples)] = samples
+        return samples
+
+    def externalize(self, data: Any) -> Any:
+        """Kopia av data där dragningarna är ersatta av referenser."""
+        if hasattr(data, "to_dict"):
+            data = data.to_dict()
+        if isinstance(data, dict):
+            out = {}
+            for k, v in data.items():
+                if (
+                    k == SAMPLES_KEY
+                    and isinstance(v, (list, numpy.ndarray))
+                    and len(v) >= MIN_SIDECAR_LENGTH
+                ):
+                    out[k] = self.put(v)
+                else:
+                    out[k] = self.externalize(v)
+            return out
+        if isinstance(data, (list, tuple)):
+            return [self.externalize(v) for v in data]
+        return data
+
+    def resolve(self, data: Any) -> Any:
+        """Ersätt referenserna i data med minnesmappade arrayer, på plats."""
+        if isinstance(data, dict):
+            for k, v in data.items():
+                if k == SAMPLES_KEY and is_ref(v):
+                    data[k] = self.load(v)
+                else:
+                    self.resolve(v)
+        elif isinstance(data, list):
+            for v in data:
+                self.resolve(v)
+        return data
+
+    def prune(self, keep: set[str]) -> int:
+        """Ta bort filer som inte finns i keep. Returnerar antalet."""
+        removed = 0
+        if not self.folder.exists():
+            return removed
+        for path in self.folder.glob("*.npy"):
+            if path.stem not in keep:
+                path.unlink(missing_ok=True)
+                removed += 1
+        return removed
@@ -0,0 +1,522 @@
+#
+# MIT License
+#
+# Copyright (c) 2025 Martin Vesterlund
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+from __future__ import annotations
+
+import copy
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Optional, Union
+
+from filesystem.repo import (
+    SORT_KEYS,
+    AnalysisListItem,
+    AnalysisPage,
+    COMPACT_AFTER,
+    DraftOperations,
+    DraftRepository,
+    JsonAnalysisRepository,
+    _scenario_index,
+    apply_draft_op,
+    new_analysis_id,
+    new_draft,
+    new_draft_id,
+)
+from filesystem.codec import JsonCodec, get_codec
+from filesystem.samples import SampleStore, refs
+from filesystem.versions import VersionStore, is_delta
+from riskcalculator.definitions import DefinitionStore
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS analyses (
+    analysis_id TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    date TEXT NOT NULL,
+    owner TEXT NOT NULL,
+    version TEXT NOT NULL,
+    summary TEXT NOT NULL,
+    scenario_count INTEGER NOT NULL,
+    updated_ns INTEGER NOT NULL,
+    body TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS analyses_date ON analyses (date);
+CREATE INDEX IF NOT EXISTS analyses_owner ON analyses (owner COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS analyses_title ON analyses (title);
+CREATE TABLE IF NOT EXISTS drafts (
+    draft_id TEXT PRIMARY KEY,
+    updated_ns INTEGER NOT NULL,
+    body TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS draft_ops (
+    draft_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    op TEXT NOT NULL,
+    PRIMARY KEY (draft_id, seq)
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+# AnalysisListItem-fält -> kolumn
+_COLUMNS = {
+    "date": "date",
+    "title": "title",
+    "owner": "owner",
+    "version": "version",
+    "scenario_count": "scenario_count",
+    "mtime_ns": "updated_ns",
+}
+
+
+class SqliteDatabase:
+    """
+    En SQLite-fil i WAL-läge med en anslutning per tråd, så att läsare och
+    skrivare i olika trådar inte blockerar varandra.
+    """
+
+    def __init__(self, path: Path, codec: Optional[JsonCodec] = None):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.codec = codec or get_codec()
+        self.definitions = DefinitionStore(
+            self.path.parent / f"{self.path.stem}.definitions"
+        )
+        self._local = threading.local()
+        self._connections: list[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        with self.connection() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=30000")
+        with self._lock:
+            self._connections.append(conn)
+        return conn
+
+    def connection(self) -> sqlite3.Connection:
+        """
+        Trådens anslutning. Används som context manager för en transaktion.
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    def dumps(self, obj: Any) -> str:
+        return self.codec.dumps(obj).decode("utf-8")
+
+    def loads(self, text: str) -> Any:
+        return self.codec.loads(text)
+
+    def samples(self, *parts: str) -> SampleStore:
+        """Dragningarna ligger i <databas>.samples/ bredvid databasfilen."""
+        return SampleStore(
+            self.path.parent / f"{self.path.stem}.samples" / Path(*parts)
+        )
+
+    def close(self) -> None:
+        with self._lock:
+            for conn in self._connections:
+                try:
+                    conn.close()
+                except sqlite3.ProgrammingError:
+                    # Skapad i en annan tråd som redan har avslutats
+                    pass
+            self._connections.clear()
+        self._local = threading.local()
+
+
+def _database(db: Union[SqliteDatabase, Path, str]) -> SqliteDatabase:
+    return db if isinstance(db, SqliteDatabase) else SqliteDatabase(Path(db))
+
+
+def _analysis_row(
+    db: SqliteDatabase,
+    analysis_id: str,
+    analysis: dict[str, Any],
+    body: Optional[dict[str, Any]] = None,
+) -> tuple:
+    return (
+        analysis_id,
+        str(analysis.get("analysis_object", analysis_id)),
+        str(analysis.get("date", "")),
+        str(analysis.get("owner", "")),
+        str(analysis.get("version", "")),
+        str(analysis.get("summary", "")),
+        len(analysis.get("scenarios") or []),
+        time.time_ns(),
+        db.dumps(analysis if body is None else body),
+    )
+
+
+class SqliteAnalysisRepository:
+    """
+    Samma gränssnitt som JsonAnalysisRepository, men analyserna ligger i
+    tabellen analyses med rubrikfälten som indexerade kolumner.
+    """
+
+    def __init__(self, db: Union[SqliteDatabase, Path, str]):
+        self.db = _database(db)
+        self.samples = self.db.samples("analyses")
+        self.versions = VersionStore(
+            self._read_stored, lambda doc: self.db.loads(self.db.dumps(doc))
+        )
+
+    def _item(self, row) -> AnalysisListItem:
+        return AnalysisListItem(
+            analysis_id=row[0],
+            title=row[1],
+            date=row[2],
+            owner=row[3],
+            version=row[4],
+            summary=row[5],
+            scenario_count=row[6],
+            mtime_ns=row[7],
+            size=row[8],
+        )
+
+    _SELECT = (
+        "SELECT analysis_id, title, date, owner, version, summary, "
+        "scenario_count, updated_ns, length(body) FROM analyses"
+    )
+
+    def rebuild_index(self) -> None:
+        """Rubrikkolumnerna hålls alltid aktuella, finns för gränssnittets skull."""
+
+    def list(self) -> list[AnalysisListItem]:
+        rows = self.db.connection().execute(
+            self._SELECT + " ORDER BY date DESC, analysis_id DESC"
+        )
+        return [self._item(row) for row in rows]
+
+    def query(
+        self,
+        page: int = 1,
+        per_page: int = 50,
+        sort: str = "date",
+        descending: bool = True,
+        owner: Optional[str] = None,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+    ) -> AnalysisPage:
+        if sort not in SORT_KEYS:
+            sort = "date"
+        where, params = [], []
+        if owner:
+            where.append("owner LIKE ?")
+            params.append(f"%{owner.strip()}%")
+        if date_from:
+            where.append("substr(date, 1, ?) >= ?")
+            params += [len(date_from), date_from]
+        if date_to:
+            where.append("substr(date, 1, ?) <= ?")
+            params += [len(date_to), date_to]
+        clause = (" WHERE " + " AND ".join(where)) if where else ""
+        direction = "DESC" if descending else "ASC"
+        per_page = max(1, per_page)
+        page = max(1, page)
+        conn = self.db.connection()
+        total = conn.execute(
+            "SELECT count(*) FROM analyses" + clause, params
+        ).fetchone()[0]
+        rows = conn.execute(
+            self._SELECT
+            + clause
+            + f" ORDER BY {_COLUMNS[sort]} {direction}, analysis_id {direction}"
+            + " LIMIT ? OFFSET ?",
+            params + [per_page, (page - 1) * per_page],
+        )
+        return AnalysisPage(
+            items=[self._item(row) for row in rows],
+            total=total,
+            page=page,
+            per_page=per_page,
+        )
+
+    def signature(self, analysis_id: str) -> str:
+        """Ändras när raden skrivs, utan att läsa body."""
+        row = (
+            self.db.connection()
+            .execute(
+                "SELECT updated_ns, length(body) FROM analyses WHERE analysis_id = ?",
+                (analysis_id,),
+            )
+            .fetchone()
+        )
+        if row is None:
+            raise FileNotFoundError(analysis_id)
+        return f"{row[0]:x}-{row[1]:x}"
+
+    def listing_signature(self) -> str:
+        """
+        Ändras när någon analys läggs till, tas bort eller skrivs om. En
+        omskriven rad får ett nytt updated_ns, det största ändras därmed.
+        """
+        count, latest = (
+            self.db.connection()
+            .execute("SELECT count(*), coalesce(max(updated_ns), 0) FROM analyses")
+            .fetchone()
+        )
+        return f"{count:x}-{latest:x}"
+
+    def _read_stored(self, analysis_id: str) -> dict[str, Any]:
+        row = (
+            self.db.connection()
+            .execute("SELECT body FROM analyses WHERE analysis_id = ?", (analysis_id,))
+            .fetchone()
+        )
+        if row is None:
+            raise FileNotFoundError(analysis_id)
+        return self.db.loads(row[0])
+
+    def get_dict(self, analysis_id: str) -> dict[str, Any]:
+        analysis = self._read_stored(analysis_id)
+        if is_delta(analysis):
+            analysis = copy.deepcopy(self.versions.materialize(analysis))
+        return self.db.definitions.expand_document(self.samples.resolve(analysis))
+
+    def _stored(self, analysis: dict[str, Any]) -> dict[str, Any]:
+        return self.db.definitions.compress_document(self.samples.externalize(analysis))
+
+    def save_new(self, analysis: dict[str, Any]) -> str:
+        analysis_id = new_analysis_id(analysis)
+        analysis = self._stored(analysis)
+        body = self.versions.store(analysis)
+        # Två analyser med samma namn inom samma sekund får inte skriva över
+        # varandra, primärnyckeln avgör vem som får id:t
+        candidate, n = analysis_id, 1
+        while True:
+            try:
+                with self.db.connection() as conn:
+                    conn.execute(
+                        "INSERT INTO analyses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        _analysis_row(self.db, candidate, analysis, body),
+                    )
+                return candidate
+            except sqlite3.IntegrityError:
+                n += 1
+                candidate = f"{analysis_id}_{n}"
+
+    def put(self, analysis_id: str, analysis: dict[str, Any]) -> None:
+        """Spara en analys med givet id, en befintlig skrivs över."""
+        analysis = self._stored(analysis)
+        with self.db.connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO analyses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                _analysis_row(
+                    self.db, analysis_id, analysis, self.versions.store(analysis)
+                ),
+            )
+        # Versioner som bygger på den kan ha cachats med det gamla innehållet
+        self.versions.invalidate()
+
+
+class SqliteDraftRepository(DraftOperations):
+    """
+    Samma gränssnitt som DraftRepository, utkasten ligger i tabellen drafts
+    och journalposterna i draft_ops.
+    """
+
+    def __init__(
+        self, db: Union[SqliteDatabase, Path, str], compact_after: int = COMPACT_AFTER
+    ):
+        self.db = _database(db)
+        self.compact_after = compact_after
+
+    def create(self) -> str:
+        draft_id = new_draft_id()
+        self.save(draft_id, new_draft())
+        return draft_id
+
+    def create_from(self, draft_dict: dict[str, Any]) -> str:
+        draft_id = uuid.uuid4().hex[:12]
+        self.save(draft_id, draft_dict)
+        return draft_id
+
+    def load(self, draft_id: str) -> dict[str, Any]:
+        row = (
+            self.db.connection()
+            .execute("SELECT body FROM drafts WHERE draft_id = ?", (draft_id,))
+            .fetchone()
+        )
+        if row is None:
+            raise FileNotFoundError(draft_id)
+        draft = self._replay(self.db.connection(), draft_id, self.db.loads(row[0]))
+        return self.db.definitions.expand_document(
+            self.samples(draft_id).resolve(draft)
+        )
+
+    def samples(self, draft_id: str) -> SampleStore:
+        return self.db.samples("drafts", draft_id)
+
+    def _replay(
+        self, conn: sqlite3.Connection, draft_id: str, draft: dict[str, Any]
+    ) -> dict[str, Any]:
+        for (op,) in conn.execute(
+            "SELECT op FROM draft_ops WHERE draft_id = ? ORDER BY seq", (draft_id,)
+        ):
+            apply_draft_op(draft, self.db.loads(op))
+        return draft
+
+    def save(self, draft_id: str, data: dict[str, Any]) -> None:
+        with self.db.connection() as conn:
+            self._save(conn, draft_id, data)
+
+    def _save(
+        self, conn: sqlite3.Connection, draft_id: str, data: dict[str, Any]
+    ) -> None:
+        samples = self.samples(draft_id)
+        data = self.db.definitions.compress_document(samples.externalize(data))
+        body = self.db.dumps(data)
+        conn.execute(
+            "INSERT OR REPLACE INTO drafts VALUES (?, ?, ?)",
+            (draft_id, time.time_ns(), body),
+        )
+        conn.execute("DELETE FROM draft_ops WHERE draft_id = ?", (draft_id,))
+        try:
+            samples.prune(refs(data))
+        except OSError:
+            pass
+
+    def append(self, draft_id: str, op: dict[str, Any]) -> None:
+        """Lägg till en journalpost, utkastet skrivs inte om."""
+        conn = self.db.connection()
+        with conn:
+            # Skrivlås direkt, så att seq och kontrollen nedan hör ihop
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT body FROM drafts WHERE draft_id = ?", (draft_id,)
+            ).fetchone()
+            if row is None:
+                raise FileNotFoundError(draft_id)
+            entries, scenarios, seq = conn.execute(
+                "SELECT COUNT(*), "
+                "COALESCE(SUM(CASE json_extract(op, '$.op') "
+                "WHEN 'add-scenario' THEN 1 WHEN 'delete-scenario' THEN -1 "
+                "ELSE 0 END), 0), COALESCE(MAX(seq), 0) "
+                "FROM draft_ops WHERE draft_id = ?",
+                (draft_id,),
+            ).fetchone()
+            if op["op"] in ("update-scenario", "delete-scenario"):
+                count = conn.execute(
+                    "SELECT json_array_length(body, '$.scenarios') "
+                    "FROM drafts WHERE draft_id = ?",
+                    (draft_id,),
+                ).fetchone()[0]
+                _scenario_index(range((count or 0) + scenarios), op["index"])
+            conn.execute(
+                "INSERT INTO draft_ops VALUES (?, ?, ?)",
+                (
+                    draft_id,
+                    seq + 1,
+                    self.db.dumps(
+                        self.db.definitions.compress_document(
+                            self.samples(draft_id).externalize(op)
+                        )
+                    ),
+                ),
+            )
+            if entries + 1 >= self.compact_after:
+                draft = self._replay(conn, draft_id, self.db.loads(row[0]))
+                self._save(conn, draft_id, draft)
+
+    def compact(self, draft_id: str) -> None:
+        """Skriv in journalen i utkastet och töm den."""
+        conn = self.db.connection()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            self._save(conn, draft_id, self.load(draft_id))
+
+    def delete(self, draft_id: str) -> None:
+        with self.db.connection() as conn:
+            conn.execute("DELETE FROM drafts WHERE draft_id = ?", (draft_id,))
+            conn.execute("DELETE FROM draft_ops WHERE draft_id = ?", (draft_id,))
+        shutil.rmtree(self.samples(draft_id).folder, ignore_errors=True)
+
+
+def migrate_json(
+    db: Union[SqliteDatabase, Path, str],
+    analyses_folder: Optional[Path] = None,
+    drafts_folder: Optional[Path] = None,
+) -> int:
+    """
+    Engångsmigrering från data/analyses/*.json och data/drafts/*.json.
+    JSON-filerna lämnas kvar. Returnerar antalet importerade objekt, 0 om
+    migreringen redan är gjord.
+    """
+    db = _database(db)
+    conn = db.connection()
+    if conn.execute("SELECT 1 FROM meta WHERE key = 'json_migrated'").fetchone():
+        return 0
+    count = 0
+    with conn:
+        for table, folder in (("analyses", analyses_folder), ("drafts", drafts_folder)):
+            if folder is None or not Path(folder).exists():
+                continue
+            # Utkasten med journalen uppspelad, analyserna uppbyggda ur
+            # versionskedjan
+            if table == "drafts":
+                load = DraftRepository(Path(folder)).load
+            else:
+                load = JsonAnalysisRepository(Path(folder)).get_dict
+            for path in sorted(Path(folder).glob("*.json")):
+                try:
+                    data = load(path.stem)
+                except (OSError, ValueError, LookupError):
+                    continue
+                if table == "analyses":
+                    conn.execute(
+                        "INSERT OR IGNORE INTO analyses "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        _analysis_row(
+                            db,
+                            path.stem,
+                            db.definitions.compress_document(
+                                db.samples("analyses").externalize(data)
+                            ),
+                        ),
+                    )
+                else:
+                    data = db.definitions.compress_document(
+                        db.samples("drafts", path.stem).externalize(data)
+                    )
+                    conn.execute(
+                        "INSERT OR IGNORE INTO drafts VALUES (?, ?, ?)",
+                        (
+                            path.stem,
+                            time.time_ns(),
+                            db.dumps(data),
+                        ),
+                    )
+                count += 1
+        conn.execute("INSERT INTO meta VALUES ('json_migrated', ?)", (str(count),))
+    return count
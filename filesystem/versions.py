@@ -0,0 +1,172 @@
+#
+# MIT License
+#
+# Copyright (c) 2025 Martin Vesterlund
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+
+"""
+Analysversioner som skillnader mot föregående version.
+
+En analys som skapats med "ny version" har previous_analysis_id satt och
+sparas som en delta mot den analysen:
+
+    {"__base": <analysis_id>, "__depth": n, "__removed": [...],
+     "scenarios": [{"__parent": 3}, {...nytt scenario...}], ...ändrade fält}
+
+Oförändrade scenarier är index i basens scenariolista, ändrade och nya
+sparas i sin helhet. Efter SNAPSHOT_EVERY led sparas analysen hel igen så
+kedjan som måste spelas upp vid läsning hålls kort.
+"""
+
+from __future__ import annotations
+
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Callable
+
+BASE = "__base"
+DEPTH = "__depth"
+REMOVED = "__removed"
+PARENT = "__parent"
+PREVIOUS = "previous_analysis_id"
+SNAPSHOT_EVERY = 8
+CACHE_SIZE = 32
+
+_MISSING = object()
+
+
+def is_delta(doc: Any) -> bool:
+    return isinstance(doc, dict) and BASE in doc
+
+
+def _is_parent(scenario: Any) -> bool:
+    return isinstance(scenario, dict) and set(scenario) == {PARENT}
+
+
+def _key(value: Any) -> str:
+    return json.dumps(value, sort_keys=True, default=str)
+
+
+def make_delta(
+    base_id: str, base: dict[str, Any], doc: dict[str, Any], depth: int
+) -> dict[str, Any]:
+    """Delta från base till doc, båda i lagrad form."""
+    delta: dict[str, Any] = {BASE: base_id, DEPTH: depth}
+    removed = [k for k in base if k not in doc]
+    if removed:
+        delta[REMOVED] = removed
+    for k, v in doc.items():
+        if k != "scenarios" and base.get(k, _MISSING) != v:
+            delta[k] = v
+    if "scenarios" in doc:
+        index: dict[str, int] = {}
+        for i, scenario in enumerate(base.get("scenarios") or []):
+            index.setdefault(_key(scenario), i)
+        delta["scenarios"] = [
+            {PARENT: index[key]} if (key := _key(s)) in index else s
+            for s in doc["scenarios"] or []
+        ]
+    return delta
+
+
+def apply_delta(base: dict[str, Any], delta: dict[str, Any]) -> dict[str, Any]:
+    """Analysen delta beskriver. Oförändrade scenarier delas med base."""
+    removed = delta.get(REMOVED, ())
+    doc = {k: v for k, v in base.items() if k not in removed}
+    for k, v in delta.items():
+        if k in (BASE, DEPTH, REMOVED):
+            continue
+        if k == "scenarios":
+            parents = base.get("scenarios") or []
+            v = [parents[s[PARENT]] if _is_parent(s) else s for s in v]
+        doc[k] = v
+    return doc
+
+
+class VersionStore:
+    """
+    Bygger upp analyser ur deltakedjan. read(analysis_id) ger en analys i
+    lagrad form, normalize(doc) ger doc som den ser ut efter en omgång
+    genom lagringen. Uppbyggda baser hålls i en liten LRU, analyser ändras
+    inte efter att de sparats.
+    """
+
+    def __init__(
+        self,
+        read: Callable[[str], dict[str, Any]],
+        normalize: Callable[[dict[str, Any]], dict[str, Any]],
+        snapshot_every: int = SNAPSHOT_EVERY,
+        cache_size: int = CACHE_SIZE,
+    ):
+        self._read = read
+        self._normalize = normalize
+        self.snapshot_every = snapshot_every
+        self.cache_size = cache_size
+        self._cache: OrderedDict[str, dict[str, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, analysis_id: str) -> tuple[int, dict[str, Any]]:
+        with self._lock:
+            entry = self._cache.get(analysis_id)
+            if entry is not None:
+                self._cache.move_to_end(analysis_id)
+                return entry
+        raw = self._read(analysis_id)
+        if not isinstance(raw, dict):
+            raise ValueError(analysis_id)
+        entry = (raw.get(DEPTH, 0), self.materialize(raw))
+        with self._lock:
+            self._cache[analysis_id] = entry
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return entry
+
+    def materialize(self, doc: dict[str, Any]) -> dict[str, Any]:
+        """
+        Hela analysen för doc i lagrad form. Delar innehåll med cachen, så
+        resultatet ska kopieras innan det ändras.
+        """
+        if not is_delta(doc):
+            return doc
+        return apply_delta(self._get(doc[BASE])[1], doc)
+
+    def invalidate(self) -> None:
+        """Töm cachen, för när en sparad analys har skrivits över."""
+        with self._lock:
+            self._cache.clear()
+
+    def store(self, doc: dict[str, Any]) -> dict[str, Any]:
+        """Det som ska sparas för doc: en delta om det lönar sig, annars doc."""
+        base_id = doc.get(PREVIOUS)
+        if not base_id:
+            return doc
+        try:
+            depth, base = self._get(base_id)
+        except (OSError, ValueError):
+            return doc
+        if depth + 1 >= self.snapshot_every:
+            return doc
+        delta = make_delta(base_id, base, self._normalize(doc), depth + 1)
+        if not any(_is_parent(s) for s in delta.get("scenarios") or []):
+            # Inget att dela med basen
+            return doc
+        return delta
@@ -0,0 +1,237 @@
+#
+# MIT License
+#
+# Copyright (c) 2025 Martin Vesterlund
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+
+"""
+Bevakning av kataloger i en bakgrundstråd.
+
+På Linux används inotify via ctypes, annars och om inotify inte går att
+starta jämförs filernas mtime och storlek med jämna mellanrum. Ändrade
+sökvägar lämnas i omgångar till en callback; när filer skapas, tas bort
+eller byter namn ingår även katalogen själv.
+"""
+
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+from pathlib import Path
+from typing import Callable, Iterable, Optional
+
+from filesystem.paths import logger
+
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = (
+    IN_MODIFY
+    | IN_ATTRIB
+    | IN_CLOSE_WRITE
+    | IN_MOVED_FROM
+    | IN_MOVED_TO
+    | IN_CREATE
+    | IN_DELETE
+    | IN_DELETE_SELF
+    | IN_MOVE_SELF
+)
+# Händelser som ändrar katalogens innehåll
+DIRECTORY_MASK = IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+_EVENT = struct.Struct("iIII")
+# Väntan efter första händelsen, så att en sparning i flera steg blir en omgång
+SETTLE_SECONDS = 0.05
+
+
+class _Inotify:
+    def __init__(self, folders: list[Path]):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1")
+        self.folders: dict[int, Path] = {}
+        try:
+            for folder in folders:
+                wd = libc.inotify_add_watch(self.fd, os.fsencode(folder), WATCH_MASK)
+                if wd < 0:
+                    raise OSError(ctypes.get_errno(), f"inotify_add_watch {folder}")
+                self.folders[wd] = folder
+        except OSError:
+            os.close(self.fd)
+            raise
+
+    def read(self, timeout: float) -> Optional[set[Path]]:
+        """Ändrade sökvägar, None om bevakningen har upphört."""
+        changed: set[Path] = set()
+        wait = timeout
+        while select.select([self.fd], [], [], wait)[0]:
+            try:
+                data = os.read(self.fd, 65536)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(data):
+                wd, mask, _cookie, length = _EVENT.unpack_from(data, offset)
+                name = data[offset + _EVENT.size : offset + _EVENT.size + length]
+                offset += _EVENT.size + length
+                if mask & IN_Q_OVERFLOW:
+                    changed |= set(self.folders.values())
+                    continue
+                folder = self.folders.get(wd)
+                if folder is None:
+                    continue
+                if mask & (IN_IGNORED | IN_DELETE_SELF | IN_MOVE_SELF):
+                    return None
+                name = name.rstrip(b"\0")
+                if name:
+                    changed.add(folder / os.fsdecode(name))
+                if mask & DIRECTORY_MASK:
+                    changed.add(folder)
+            wait = SETTLE_SECONDS
+        return changed
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+class _Poller:
+    def __init__(self, folders: list[Path]):
+        self.folders = folders
+        self.state = self._scan()
+
+    def _scan(self) -> dict[Path, tuple[int, int]]:
+        state = {}
+        for folder in self.folders:
+            try:
+                st = os.stat(folder)
+                state[folder] = (st.st_mtime_ns, st.st_size)
+                with os.scandir(folder) as it:
+                    for entry in it:
+                        if entry.is_file():
+                            st = entry.stat()
+                            state[Path(entry.path)] = (st.st_mtime_ns, st.st_size)
+            except FileNotFoundError:
+                continue
+        return state
+
+    def read(self, timeout: float, stop: threading.Event) -> set[Path]:
+        stop.wait(timeout)
+        state = self._scan()
+        changed = {
+            p
+            for p in state.keys() | self.state.keys()
+            if state.get(p) != self.state.get(p)
+        }
+        self.state = state
+        return changed
+
+    def close(self) -> None:
+        pass
+
+
+class Watcher:
+    """
+    Bevakar folders (inte rekursivt) och anropar on_change med de ändrade
+    sökvägarna. on_change körs i bevakarens tråd.
+    """
+
+    def __init__(
+        self,
+        folders: Iterable[Path],
+        on_change: Callable[[set[Path]], None],
+        interval: float = 1.0,
+        use_inotify: bool = True,
+    ):
+        self.folders = [Path(os.path.abspath(f)) for f in folders]
+        self.on_change = on_change
+        self.interval = interval
+        self.use_inotify = use_inotify and sys.platform.startswith("linux")
+        self.backend: Optional[str] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "Watcher":
+        self._source = self._open()
+        self._thread = threading.Thread(
+            target=self._run, name="filesystem-watcher", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def _open(self):
+        if self.use_inotify:
+            try:
+                source = _Inotify(self.folders)
+                self.backend = "inotify"
+                return source
+            except (OSError, AttributeError) as e:
+                logger.info("inotify är inte tillgängligt, bevakar med polling: %s", e)
+        self.backend = "polling"
+        return _Poller(self.folders)
+
+    def _run(self) -> None:
+        source = self._source
+        try:
+            while not self._stop.is_set():
+                if isinstance(source, _Inotify):
+                    changed = source.read(self.interval)
+                    if changed is None:
+                        # En bevakad katalog försvann, fortsätt med polling
+                        source.close()
+                        source = self._source = _Poller(self.folders)
+                        self.backend = "polling"
+                        changed = set(self.folders)
+                else:
+                    changed = source.read(self.interval, self._stop)
+                if changed and not self._stop.is_set():
+                    try:
+                        self.on_change(changed)
+                    except Exception:
+                        logger.exception("Ombyggnad efter ändring misslyckades")
+        finally:
+            source.close()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
@@ -46,7 +46,9 @@ from common import D
 from filesystem.repo import DiscreteThresholdsRepository
 from filesystem.questionaires_repo import JsonQuestionairesRepository
 from filesystem.paths import ensure_user_data_initialized, packaged_root
+from riskcalculator.cache import RiskCache
 from riskcalculator.questionaire import Questionaires
+from riskcalculator.simulation import PREVIEW_TOLERANCE
 
 
 BASE_DIR = Path(__file__).parent
@@ -63,6 +65,7 @@ questionaires_repo = JsonQuestionairesRepository(DATA_DIR / "questionaires")
 discrete_thresholds_repo = DiscreteThresholdsRepository(
     DATA_DIR / "discrete_thresholds.json"
 )
+risk_cache = RiskCache(folder=p["cache"] / "risk")
 
 
 def load_questionaire_sets() -> Dict[str, Any]:
@@ -471,7 +474,7 @@ class RiskCalcQt(QMainWindow):
                 "currency": currency_str,
                 "mappings": threshold_set,
             }
-            risk = HybridRisk(values=values)
+            risk = risk_cache.evaluate(values, tolerance=PREVIEW_TOLERANCE)
             self._render_risk(risk)
             self._update_manual_plots(risk)
         except Exception as e:
@@ -510,7 +513,7 @@ class RiskCalcQt(QMainWindow):
                 {"budget": budget, "mappings": threshold_set, "currency": currency_str}
             )
 
-            risk = HybridRisk(values=values)
+            risk = risk_cache.evaluate(values, tolerance=PREVIEW_TOLERANCE)
             self._render_risk(risk)
             self._update_manual_plots(risk)
         except Exception as e:
@@ -538,6 +541,14 @@ class RiskCalcQt(QMainWindow):
             "ale",
             f"{currency_formatted.get_money_format(round(ale.probable, 2))} (P90: {currency_formatted.get_money_format(round(ale.p90, 2))})",
         )
+        convergence = getattr(risk, "convergence", None)
+        lbl = self.result_labels.get("ale")
+        if convergence is not None and lbl is not None:
+            errors = ", ".join(
+                f"{name} ±{error * 100:.2f} %"
+                for name, error in convergence.error.items()
+            )
+            lbl.setToolTip(f"{convergence.samples} dragningar, {errors}")
 
 
 def main():
@@ -0,0 +1,155 @@
+#
+# MIT License
+#
+# Copyright (c) 2025 Martin Vesterlund
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+
+"""
+Batch evaluation of many answer vectors against one questionaire set.
+
+Instead of building Questionaires and a HybridRisk per scenario, the
+answers for N scenarios are aggregated with one vectorized pass per
+dimension and simulated together by riskcalculator.simulation.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Any, Optional, Union
+
+import numpy
+from otyg_risk_base.hybrid import HybridRisk
+from otyg_risk_base.qualitative_scale import QualitativeScale
+
+from . import simulation
+from .template import CALCULATIONS, DIMENSIONS, QuestionairesTemplate
+
+VALUE_NAMES = {
+    "tef": "threat_event_frequency",
+    "vuln": "vulnerability",
+    "lm": "loss_magnitude",
+}
+
+
+@dataclass
+class BatchResult:
+    """Factor ranges and risks for N answer vectors, in input order."""
+
+    # threat_event_frequency/vulnerability/loss_magnitude -> (N, 3) ranges
+    values: dict[str, numpy.ndarray]
+    simulation: simulation.Simulation
+    currency: str = "SEK"
+    mappings: Optional[QualitativeScale] = None
+    _risks: dict[int, HybridRisk] = field(default_factory=dict, repr=False)
+
+    def __len__(self):
+        return len(self.simulation)
+
+    def risk(self, index: int) -> HybridRisk:
+        """HybridRisk for one answer vector, built on first access."""
+        if index not in self._risks:
+            self._risks[index] = simulation.hybrid_risk(
+                self.simulation, index, currency=self.currency, mappings=self.mappings
+            )
+        return self._risks[index]
+
+    def risks(self) -> list[HybridRisk]:
+        return [self.risk(i) for i in range(len(self))]
+
+    def overall_risks(self) -> list[str]:
+        return [self.risk(i).qualitative.overall_risk for i in range(len(self))]
+
+    def statistic(self, name: str, stat: str = "p90") -> numpy.ndarray:
+        """One statistic, e.g. ("annual_loss_expectancy", "p90"), for all rows."""
+        return self.simulation.stats[name][:, simulation.STATS.index(stat)]
+
+
+def split_answers(
+    template: QuestionairesTemplate, answers: Union[numpy.ndarray, dict]
+) -> dict[str, numpy.ndarray]:
+    """
+    Accept either {tef, vuln, lm} -> (N, n_dim) matrices or one
+    (N, n_tef + n_vuln + n_lm) matrix with the dimensions side by side.
+    """
+    if isinstance(answers, dict):
+        return {dim: numpy.atleast_2d(answers[dim]) for dim in DIMENSIONS}
+    answers = numpy.atleast_2d(numpy.asarray(answers, dtype=numpy.intp))
+    sizes = [len(template.get(dim).questions) for dim in DIMENSIONS]
+    if answers.shape[1] != sum(sizes):
+        raise ValueError(
+            f"Expected {sum(sizes)} answers per row, got {answers.shape[1]}"
+        )
+    parts = numpy.split(answers, numpy.cumsum(sizes)[:-1], axis=1)
+    return dict(zip(DIMENSIONS, parts))
+
+
+def factor_values(
+    template: QuestionairesTemplate, answers: Union[numpy.ndarray, dict]
+) -> dict[str, numpy.ndarray]:
+    """Questionaire values for every row, like calculate_questionairy_values."""
+    answers = split_answers(template, answers)
+    values = {}
+    for dim in DIMENSIONS:
+        qtemplate = template.get(dim)
+        name = CALCULATIONS.get(qtemplate.calculation)
+        if name is not None:
+            values[VALUE_NAMES[dim]] = qtemplate.factors(answers[dim])[name]
+        else:
+            values[VALUE_NAMES[dim]] = simulation.as_ranges(
+                [qtemplate.value(row) for row in answers[dim]]
+            )
+    return values
+
+
+def evaluate_batch(
+    template: QuestionairesTemplate,
+    answers: Union[numpy.ndarray, dict],
+    budget: Any = 1000000,
+    currency: str = "SEK",
+    mappings: Any = None,
+    samples: int = simulation.DEFAULT_SAMPLES,
+    seed=None,
+    keep_samples: bool = False,
+    workers: int = 1,
+) -> BatchResult:
+    """
+    Evaluate N answer vectors in one call.
+
+    budget may be a scalar or one value per row. All rows share the same
+    uniform draws, so with a fixed seed the results are reproducible and
+    differences between rows come from the answers only.
+    """
+    values = factor_values(template, answers)
+    result = simulation.simulate(
+        values["threat_event_frequency"],
+        values["vulnerability"],
+        values["loss_magnitude"],
+        numpy.asarray(budget, dtype=float),
+        samples=samples,
+        seed=seed,
+        keep_samples=keep_samples,
+        workers=workers,
+    )
+    if not isinstance(mappings, QualitativeScale):
+        mappings = QualitativeScale(scales=mappings)
+    return BatchResult(
+        values=values, simulation=result, currency=currency, mappings=mappings
+    )
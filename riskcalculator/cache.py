@@ -0,0 +1,338 @@
+#
+# MIT License
+#
+# Copyright (c) 2025 Martin Vesterlund
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+
+"""
+Result cache for HybridRisk calculations.
+
+Results are keyed on a canonical digest of the inputs (tef/vuln/lm ranges,
+budget, currency, mappings, seed and sample count). The in-memory tier is an
+LRU bounded by the size of the kept samples, the optional disk tier keeps
+results between restarts and is pruned oldest first.
+
+Disk entries are plain data, one .npz per result: the ranges, statistics
+and samples as arrays and the rest as a JSON string. They are loaded
+without pickle and rebuilt with simulation.hybrid_risk, so a file in the
+cache folder cannot run code and does not depend on the class layout of
+otyg_risk_base.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Optional
+
+import numpy
+from otyg_risk_base.hybrid import HybridRisk
+from otyg_risk_base.qualitative_scale import QualitativeScale
+
+from . import simulation
+
+# Bump when the calculation changes so old disk entries are not reused
+CACHE_VERSION = 1
+# Bump when the layout of the disk entries changes
+DISK_FORMAT = 2
+SUFFIX = ".npz"
+# Earlier formats, removed when the folder is pruned
+LEGACY_SUFFIXES = (".pickle",)
+# Statistics kept on MonteCarloSimulation, in simulation.STATS order
+_KEPT_STATS = simulation.STATS[:5]
+
+
+def _canonical(value: Any) -> Any:
+    if hasattr(value, "to_dict"):
+        value = value.to_dict()
+    if isinstance(value, dict):
+        return {str(k): _canonical(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_canonical(v) for v in value]
+    if isinstance(value, numpy.ndarray):
+        return _canonical(value.tolist())
+    if isinstance(value, bool) or value is None or isinstance(value, str):
+        return value
+    try:
+        return repr(float(value))
+    except (TypeError, ValueError):
+        return str(value)
+
+
+def digest(values: dict[str, Any], samples: int, seed=None, tolerance=None) -> str:
+    """Canonical digest of the inputs that HybridRisk(values) depends on."""
+    key = {
+        "version": CACHE_VERSION,
+        "format": DISK_FORMAT,
+        "ranges": [
+            simulation.as_ranges(values[name]).ravel().tolist()
+            for name in ("threat_event_frequency", "vulnerability", "loss_magnitude")
+        ],
+        "budget": repr(float(values.get("budget", 1000000))),
+        "currency": str(values.get("currency", "SEK")),
+        "mappings": _canonical(values.get("mappings")),
+        "samples": int(samples),
+        "seed": _canonical(seed),
+        "tolerance": _canonical(tolerance),
+    }
+    text = json.dumps(key, sort_keys=True, separators=(",", ":"))
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=20).hexdigest()
+
+
+def _decimal_default(value: Any) -> Any:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        raise TypeError(f"{type(value).__name__} is not JSON serializable") from None
+
+
+def _to_arrays(risk: HybridRisk) -> dict[str, numpy.ndarray]:
+    """The data hybrid_risk needs to rebuild risk, as arrays."""
+    quantitative = risk.quantitative
+    convergence = getattr(risk, "convergence", None)
+    mappings = dict(risk.qualitative.mappings.to_dict())
+    # As pairs, JSON would turn integer keys into strings
+    mappings["num_to_text"] = list(mappings["num_to_text"].items())
+    meta = {
+        "currency": str(quantitative.currency),
+        "mappings": mappings,
+        "convergence": convergence.to_dict() if convergence else None,
+    }
+    arrays = {
+        "meta": numpy.array(json.dumps(meta, default=_decimal_default)),
+        "ranges": numpy.array(
+            [
+                [float(r.min), float(r.probable), float(r.max)]
+                for r in (quantitative.threat_event_frequency, quantitative.vuln_score)
+            ]
+        ),
+        "budget": numpy.array([float(quantitative.budget)]),
+    }
+    for name in simulation.SIMULATED:
+        s = getattr(quantitative, name)
+        arrays[f"stats_{name}"] = numpy.array(
+            [float(getattr(s, stat)) for stat in _KEPT_STATS]
+        )
+        samples = getattr(s, "_MonteCarloSimulation__samples", None)
+        arrays[f"samples_{name}"] = numpy.asarray(
+            samples if samples is not None else (), dtype=numpy.float64
+        )
+    return arrays
+
+
+def _from_arrays(arrays) -> HybridRisk:
+    meta = json.loads(str(arrays["meta"]))
+    mappings = meta["mappings"]
+    mappings["num_to_text"] = {k: v for k, v in mappings["num_to_text"]}
+    stats, samples = {}, {}
+    for name in simulation.SIMULATED:
+        # p50 is not kept on the result
+        row = numpy.full(len(simulation.STATS), numpy.nan)
+        row[: len(_KEPT_STATS)] = arrays[f"stats_{name}"]
+        stats[name] = row[None, :]
+        samples[name] = arrays[f"samples_{name}"][None, :]
+    convergence = meta["convergence"]
+    result = simulation.Simulation(
+        threat_event_frequency=arrays["ranges"][0:1],
+        vulnerability=arrays["ranges"][1:2],
+        budget=arrays["budget"],
+        stats=stats,
+        samples=samples,
+        convergence=simulation.Convergence(**convergence) if convergence else None,
+    )
+    return simulation.hybrid_risk(
+        result,
+        0,
+        currency=meta["currency"],
+        mappings=QualitativeScale.from_dict(scales=mappings),
+    )
+
+
+def _size(risk: HybridRisk) -> int:
+    """Approximate memory use, dominated by the kept samples."""
+    size = 4096
+    for name in simulation.SIMULATED:
+        s = getattr(risk.quantitative, name, None)
+        samples = getattr(s, "_MonteCarloSimulation__samples", None)
+        if isinstance(samples, numpy.ndarray):
+            size += samples.nbytes
+    return size
+
+
+class RiskCache:
+    """
+    Two-tier cache of HybridRisk results. Cached results are shared between
+    callers and must be treated as read-only.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = 256 * 1024 * 1024,
+        folder: Optional[Path] = None,
+        max_disk_bytes: int = 1024 * 1024 * 1024,
+    ):
+        self.max_bytes = max_bytes
+        self.folder = Path(folder) if folder else None
+        self.max_disk_bytes = max_disk_bytes
+        self._entries: OrderedDict[str, tuple[int, HybridRisk]] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _remember(self, key: str, risk: HybridRisk) -> None:
+        size = _size(risk)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old:
+                self._bytes -= old[0]
+            self._entries[key] = (size, risk)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (evicted, _) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+
+    def _disk_path(self, key: str) -> Path:
+        return self.folder / f"{key}{SUFFIX}"
+
+    def _load(self, key: str) -> Optional[HybridRisk]:
+        if self.folder is None:
+            return None
+        path = self._disk_path(key)
+        try:
+            with numpy.load(path, allow_pickle=False) as arrays:
+                risk = _from_arrays(arrays)
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        except Exception:
+            # Truncated or not a cache entry, calculate again
+            path.unlink(missing_ok=True)
+            return None
+        return risk
+
+    def _store(self, key: str, risk: HybridRisk) -> None:
+        if self.folder is None:
+            return
+        try:
+            arrays = _to_arrays(risk)
+        except (AttributeError, TypeError, ValueError):
+            # Not built by simulation or the library, keep it in memory only
+            return
+        tmp = None
+        try:
+            self.folder.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=self.folder, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                numpy.savez(f, **arrays)
+            os.replace(tmp, self._disk_path(key))
+            self._prune_disk()
+        except OSError:
+            # The disk tier is best effort
+            if tmp is not None:
+                Path(tmp).unlink(missing_ok=True)
+
+    def _prune_disk(self) -> None:
+        for suffix in LEGACY_SUFFIXES:
+            for path in self.folder.glob(f"*{suffix}"):
+                path.unlink(missing_ok=True)
+        files = []
+        for path in self.folder.glob(f"*{SUFFIX}"):
+            try:
+                st = path.stat()
+            except FileNotFoundError:
+                continue
+            files.append((st.st_mtime_ns, st.st_size, path))
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_disk_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+
+    def get(self, key: str) -> Optional[HybridRisk]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry[1]
+        risk = self._load(key)
+        if risk is not None:
+            self._remember(key, risk)
+        return risk
+
+    def put(self, key: str, risk: HybridRisk) -> None:
+        self._remember(key, risk)
+        self._store(key, risk)
+
+    def lookup(
+        self,
+        values: dict[str, Any],
+        samples: int = simulation.DEFAULT_SAMPLES,
+        seed=None,
+        tolerance: Optional[float] = None,
+    ) -> tuple[str, Optional[HybridRisk]]:
+        """
+        Key and cached result for the inputs. For callers that run the
+        simulation elsewhere and put() the result themselves.
+        """
+        key = digest(values, samples, seed, tolerance)
+        risk = self.get(key)
+        if risk is not None:
+            self.hits += 1
+        else:
+            self.misses += 1
+        return key, risk
+
+    def evaluate(
+        self,
+        values: dict[str, Any],
+        samples: int = simulation.DEFAULT_SAMPLES,
+        seed=None,
+        tolerance: Optional[float] = None,
+    ) -> HybridRisk:
+        """Cached drop-in for HybridRisk(values=values), see evaluate_risk."""
+        key, risk = self.lookup(values, samples, seed, tolerance)
+        if risk is not None:
+            return risk
+        risk = simulation.evaluate_risk(
+            values, samples=samples, seed=seed, tolerance=tolerance
+        )
+        self.put(key, risk)
+        return risk
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+        if self.folder is not None:
+            for path in self.folder.glob(f"*{SUFFIX}"):
+                path.unlink(missing_ok=True)
@@ -0,0 +1,214 @@
+#
+# MIT License
+#
+# Copyright (c) 2025 Martin Vesterlund
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+"""
+Process pool for the Monte Carlo work behind the web handlers.
+
+The simulations are CPU bound and hold the GIL, so running them on the
+event loop, or in its thread pool, stalls every other request. Jobs are
+submitted to a pool of worker processes instead. The number of jobs that
+may be running or queued is bounded; when the bound is reached run()
+fails fast with ComputeBusy instead of letting requests pile up.
+
+A job that times out, or whose client goes away, is cancelled if it has
+not started yet. A job that already runs cannot be interrupted in its
+worker; its result is dropped and its slot is released when it finishes,
+so the bound still holds.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Awaitable, Callable, Optional, TypeVar
+
+T = TypeVar("T")
+
+DEFAULT_TIMEOUT = 120.0
+POLL_INTERVAL = 0.25
+_DEFAULT = object()
+
+
+class ComputeBusy(RuntimeError):
+    """All workers are busy and the queue is full."""
+
+
+class ComputeTimeout(TimeoutError):
+    """The job did not finish within its timeout."""
+
+
+class ComputeCancelled(RuntimeError):
+    """The job was abandoned because its client disconnected."""
+
+
+def default_workers() -> int:
+    return max(1, (os.cpu_count() or 2) - 1)
+
+
+_in_worker = False
+
+
+def _init_worker() -> None:
+    global _in_worker
+    _in_worker = True
+
+
+def in_worker() -> bool:
+    """
+    True in a worker process of a ComputeExecutor. The pool already uses
+    the cores, jobs should not start threads or processes of their own.
+    """
+    return _in_worker
+
+
+class ComputeExecutor:
+    """
+    Bounded pool of worker processes. With workers=0 the jobs run in one
+    background thread instead, e.g. where processes cannot be started.
+    """
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        max_pending: Optional[int] = None,
+        timeout: Optional[float] = DEFAULT_TIMEOUT,
+        poll_interval: float = POLL_INTERVAL,
+    ):
+        self.workers = default_workers() if workers is None else max(0, workers)
+        self.max_pending = (
+            2 * max(1, self.workers) if max_pending is None else max(0, max_pending)
+        )
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self.capacity = max(1, self.workers) + self.max_pending
+        self._slots = threading.BoundedSemaphore(self.capacity)
+        self._active = 0
+        self._pool: Optional[Executor] = None
+        self._lock = threading.Lock()
+
+    @property
+    def active(self) -> int:
+        """Jobs that are running or queued."""
+        return self._active
+
+    def _executor(self) -> Executor:
+        with self._lock:
+            if self._pool is None:
+                if self.workers:
+                    # Forking a process with running threads is not safe
+                    self._pool = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        mp_context=multiprocessing.get_context("spawn"),
+                        initializer=_init_worker,
+                    )
+                else:
+                    self._pool = ThreadPoolExecutor(
+                        max_workers=1, thread_name_prefix="compute"
+                    )
+            return self._pool
+
+    def _release(self, _future=None) -> None:
+        with self._lock:
+            self._active -= 1
+        self._slots.release()
+
+    def _reset(self, pool: Executor) -> None:
+        with self._lock:
+            if self._pool is pool:
+                self._pool = None
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    async def run(
+        self,
+        func: Callable[..., T],
+        /,
+        *args: Any,
+        timeout: Any = _DEFAULT,
+        cancelled: Optional[Callable[[], Awaitable[bool]]] = None,
+        wait: bool = False,
+        **kwargs: Any,
+    ) -> T:
+        """
+        Run func(*args, **kwargs) in a worker. func and its arguments must
+        be picklable. cancelled is polled while waiting, e.g.
+        request.is_disconnected. With wait a full pool is waited out
+        instead of raising ComputeBusy, the timeout starts once the job is
+        submitted.
+
+        A job that times out or is cancelled before it starts is dropped.
+        One that is already running cannot be stopped: it keeps its worker
+        and its slot until it finishes, so timeouts do not free capacity.
+        """
+        while not self._slots.acquire(blocking=False):
+            if not wait:
+                raise ComputeBusy(f"{self.capacity} jobs already running or queued")
+            if cancelled is not None and await cancelled():
+                raise ComputeCancelled("client disconnected")
+            await asyncio.sleep(self.poll_interval)
+        with self._lock:
+            self._active += 1
+        pool = self._executor()
+        try:
+            future = pool.submit(func, *args, **kwargs)
+        except BaseException as e:
+            self._release()
+            if isinstance(e, BrokenProcessPool):
+                self._reset(pool)
+            raise
+        future.add_done_callback(self._release)
+
+        timeout = self.timeout if timeout is _DEFAULT else timeout
+        task = asyncio.ensure_future(
+            asyncio.wait_for(asyncio.wrap_future(future), timeout)
+        )
+        try:
+            while True:
+                done, _ = await asyncio.wait(
+                    {task}, timeout=self.poll_interval if cancelled else None
+                )
+                if done:
+                    break
+                if await cancelled():
+                    raise ComputeCancelled("client disconnected")
+            return task.result()
+        except asyncio.TimeoutError as e:
+            # Not the builtin TimeoutError before Python 3.11
+            raise ComputeTimeout(f"no result within {timeout} s") from e
+        except BrokenProcessPool:
+            # A worker died, start a new pool for the next job
+            self._reset(pool)
+            raise
+        finally:
+            if not task.done():
+                task.cancel()
+                future.cancel()
+
+    def shutdown(self) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,266 @@
+#
+# MIT License
+#
+# Copyright (c) 2025 Martin Vesterlund
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+"""
+Content addressed questionaire definitions.
+
+A stored scenario used to embed the whole questionaire set, every question
+with all of its alternatives, in each scenario. The definition is the same
+for every scenario answered from the same set, so it is stored once under its
+content digest and the scenario only keeps a reference and the index of the
+chosen alternative per question:
+
+    {"ref": "<digest>", "answers": {"tef": [0, 2, ...], "vuln": [...], "lm": [...]}}
+
+An answer that is not one of the alternatives (e.g. an unanswered question)
+is kept inline instead of as an index. Definitions are immutable, so every
+store that has seen a digest can resolve it and Questionaires.from_dict
+expands references transparently.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import tempfile
+import threading
+import weakref
+from decimal import Decimal
+from pathlib import Path
+from typing import Any, Optional
+
+from .util import content_digest
+
+DIMENSIONS = ("tef", "vuln", "lm")
+REF = "ref"
+ANSWERS = "answers"
+SUFFIX = ".json"
+
+# Definitions seen by this process, shared by all stores
+_definitions: dict[str, dict] = {}
+_lock = threading.Lock()
+_stores: "weakref.WeakSet[DefinitionStore]" = weakref.WeakSet()
+
+
+def _default(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if hasattr(value, "to_dict"):
+        return value.to_dict()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def is_ref(values) -> bool:
+    return isinstance(values, dict) and REF in values and ANSWERS in values
+
+
+def is_embedded(values) -> bool:
+    return isinstance(values, dict) and all(
+        isinstance(values.get(dim), dict) and "questions" in values[dim]
+        for dim in DIMENSIONS
+    )
+
+
+def split(questionaires: dict) -> tuple[dict, dict]:
+    """Split an embedded questionaire set into its definition and the answers."""
+    definition = {}
+    answers = {}
+    for dim in DIMENSIONS:
+        questionaire = questionaires[dim]
+        questions = []
+        indices = []
+        for q in questionaire["questions"]:
+            alternatives = [_plain(a) for a in q["alternatives"]]
+            answer = _plain(q.get("answer"))
+            try:
+                indices.append(alternatives.index(answer))
+            except ValueError:
+                indices.append(answer)
+            questions.append({"text": q.get("text", ""), "alternatives": alternatives})
+        definition[dim] = {
+            "factor": questionaire["factor"],
+            "calculation": questionaire.get("calculation", "mean"),
+            "questions": questions,
+        }
+        answers[dim] = indices
+    return definition, answers
+
+
+def join(definition: dict, answers: dict) -> dict:
+    """Inverse of split. The alternatives are shared with the definition."""
+    questionaires = {}
+    for dim in DIMENSIONS:
+        questions = []
+        for q, answer in zip(definition[dim]["questions"], answers[dim]):
+            if isinstance(answer, int):
+                answer = q["alternatives"][answer]
+            questions.append(
+                {"text": q["text"], "alternatives": q["alternatives"], "answer": answer}
+            )
+        questionaires[dim] = {
+            "factor": definition[dim]["factor"],
+            "calculation": definition[dim]["calculation"],
+            "questions": questions,
+        }
+    return questionaires
+
+
+def _plain(value):
+    if hasattr(value, "to_dict"):
+        value = value.to_dict()
+    if isinstance(value, dict):
+        return {k: _plain(v) for k, v in value.items()}
+    if isinstance(value, Decimal):
+        return float(value)
+    return value
+
+
+def digest(definition: dict) -> str:
+    return content_digest(definition).hex()
+
+
+def lookup(ref: str) -> dict:
+    """Definition for a digest from this process or any live store."""
+    definition = _definitions.get(ref)
+    if definition is not None:
+        return definition
+    for store in list(_stores):
+        definition = store.read(ref)
+        if definition is not None:
+            return definition
+    raise LookupError(f"Unknown questionaire definition {ref}")
+
+
+def expand(values: dict) -> dict:
+    """Embedded questionaire set for a reference, other values as they are."""
+    if not is_ref(values):
+        return values
+    expanded = join(lookup(values[REF]), values[ANSWERS])
+    for key, value in values.items():
+        if key not in (REF, ANSWERS):
+            expanded[key] = value
+    return expanded
+
+
+def expand_scenario(scenario: dict) -> dict:
+    if not is_ref(scenario.get("questionaires")):
+        return scenario
+    return {**scenario, "questionaires": expand(scenario["questionaires"])}
+
+
+def expand_document(document: dict) -> dict:
+    """Copy of an assessment dict with every scenario expanded."""
+    scenarios = document.get("scenarios")
+    if not scenarios or not any(
+        isinstance(s, dict) and is_ref(s.get("questionaires")) for s in scenarios
+    ):
+        return document
+    return {**document, "scenarios": [expand_scenario(s) for s in scenarios]}
+
+
+class DefinitionStore:
+    """
+    Definitions by digest, written once to folder as <digest>.json. Without a
+    folder the store only registers definitions in memory.
+    """
+
+    def __init__(self, folder: Optional[Path | str] = None):
+        self.folder = Path(folder) if folder is not None else None
+        _stores.add(self)
+
+    def path(self, ref: str) -> Path:
+        return self.folder / f"{ref}{SUFFIX}"
+
+    def read(self, ref: str) -> Optional[dict]:
+        if self.folder is None:
+            return None
+        try:
+            definition = json.loads(self.path(ref).read_bytes())
+        except (FileNotFoundError, ValueError):
+            return None
+        with _lock:
+            return _definitions.setdefault(ref, definition)
+
+    def get(self, ref: str) -> dict:
+        return lookup(ref)
+
+    def put(self, definition: dict) -> str:
+        ref = digest(definition)
+        with _lock:
+            definition = _definitions.setdefault(ref, definition)
+        if self.folder is not None and not self.path(ref).exists():
+            self.folder.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=self.folder, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(json.dumps(definition, default=_default).encode("utf-8"))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.path(ref))
+        return ref
+
+    def expand_document(self, document: dict) -> dict:
+        """expand_document with this store's folder available for lookups."""
+        return expand_document(document)
+
+    def compress(self, questionaires: Any) -> Any:
+        """Reference for an embedded questionaire set, anything else as it is."""
+        if hasattr(questionaires, "to_dict") and not isinstance(questionaires, dict):
+            questionaires = questionaires.to_dict()
+        if is_ref(questionaires):
+            # Make sure a reference copied from another store resolves here too
+            if self.folder is not None and not self.path(questionaires[REF]).exists():
+                self.put(lookup(questionaires[REF]))
+            return questionaires
+        if not is_embedded(questionaires):
+            return questionaires
+        definition, answers = split(questionaires)
+        compressed = {REF: self.put(definition), ANSWERS: answers}
+        for key, value in questionaires.items():
+            if key not in DIMENSIONS:
+                compressed[key] = value
+        return compressed
+
+    def compress_scenario(self, scenario: Any) -> Any:
+        if not isinstance(scenario, dict) or "questionaires" not in scenario:
+            return scenario
+        compressed = self.compress(scenario["questionaires"])
+        if compressed is scenario["questionaires"]:
+            return scenario
+        return {**scenario, "questionaires": compressed}
+
+    def compress_document(self, document: dict) -> dict:
+        """
+        Copy of an assessment dict, or a draft journal entry, with every
+        scenario compressed.
+        """
+        if document.get("scenarios"):
+            document = {
+                **document,
+                "scenarios": [self.compress_scenario(s) for s in document["scenarios"]],
+            }
+        if isinstance(document.get("scenario"), dict):
+            document = {
+                **document,
+                "scenario": self.compress_scenario(document["scenario"]),
+            }
+        return document
@@ -24,13 +24,101 @@
 
 from decimal import Decimal
 import statistics
+import weakref
 
 import numpy
 from otyg_risk_base.montecarlo import MonteCarloRange
-from .util import freeze, reduce_decimal_places
+from . import definitions
+from .aggregation import aggregate, aggregate_decimal, to_range, weights_array
+from .util import content_digest, reduce_decimal_places
 
 
-class Alternative:
+class _Owned:
+    """
+    Part of a question or questionaire. The owners cache values derived
+    from it and are invalidated when it changes. Owners are held weakly.
+    """
+
+    _owners = None
+
+    def _add_owner(self, owner):
+        if self._owners is None:
+            self._owners = {}
+        key = id(owner)
+        self._owners[key] = weakref.ref(
+            owner, lambda _, key=key: self._owners.pop(key, None)
+        )
+
+    def _notify_owners(self):
+        for ref in list((self._owners or {}).values()):
+            owner = ref()
+            if owner is not None:
+                owner.invalidate()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.pop("_owners", None)
+        return state
+
+
+class _OwnedList(list):
+    """
+    List of questions or alternatives that invalidates its owner when it is
+    changed in place. Pickled and copied as a plain list.
+    """
+
+    __slots__ = ("_owner",)
+
+    def __init__(self, items, owner):
+        super().__init__(items)
+        self._owner = weakref.ref(owner)
+
+    def _changed(self):
+        owner = self._owner()
+        if owner is not None:
+            owner._items_changed()
+
+    def __reduce_ex__(self, protocol):
+        return list, (list(self),)
+
+
+def _mutator(name):
+    method = getattr(list, name)
+
+    def mutate(self, *args):
+        result = method(self, *args)
+        self._changed()
+        return result
+
+    mutate.__name__ = name
+    return mutate
+
+
+for _name in (
+    "__setitem__",
+    "__delitem__",
+    "__iadd__",
+    "__imul__",
+    "append",
+    "extend",
+    "insert",
+    "pop",
+    "remove",
+    "clear",
+    "sort",
+    "reverse",
+):
+    setattr(_OwnedList, _name, _mutator(_name))
+
+
+class Alternative(_Owned):
+    """
+    An answer alternative. Assigning text or weight invalidates the questions
+    holding it; the weight is a value and is replaced, not changed in place.
+    """
+
+    _digest = None
+
     def __init__(self, text: str = "", weight: MonteCarloRange = MonteCarloRange()):
         # TODO: Dict i konstruktorn
         self.text = text
@@ -49,20 +137,72 @@ class Alternative:
     def __repr__(self):
         return str(self.to_dict())
 
+    def __setattr__(self, name, value):
+        object.__setattr__(self, name, value)
+        if not name.startswith("_"):
+            object.__setattr__(self, "_digest", None)
+            self._notify_owners()
+
+    def digest(self) -> bytes:
+        """Content digest, weights compared with 5 decimals."""
+        if self._digest is None:
+            reduced = reduce_decimal_places(value=self.weight, ndigits=5)
+            self._digest = content_digest(
+                "Alternative", self.text, reduced.min, reduced.probable, reduced.max
+            )
+        return self._digest
+
     def __hash__(self):
-        reduced = reduce_decimal_places(value=self.weight, ndigits=5)
-        return hash((self.text, reduced.max, reduced.min, reduced.probable))
+        return hash(self.digest())
 
     def __eq__(self, value):
-        return isinstance(value, Alternative) and self.__hash__() == value.__hash__()
+        return isinstance(value, Alternative) and self.digest() == value.digest()
 
 
-class Question:
+class Question(_Owned):
+    _digest = None
+
     def __init__(self, text: str = "", alternatives: list = None):
         # TODO: dict i konstruktorn
+        self._answer = Alternative()
+        self._answer._add_owner(self)
         self.text = text
         self.alternatives = alternatives
-        self.answer = Alternative()
+
+    @property
+    def answer(self):
+        return self._answer
+
+    @answer.setter
+    def answer(self, answer):
+        if answer is not self._answer:
+            self._answer = answer
+            answer._add_owner(self)
+            self.invalidate()
+
+    def __setattr__(self, name, value):
+        if name == "alternatives" and value is not None:
+            value = _OwnedList(value, self)
+            for alternative in value:
+                alternative._add_owner(self)
+        object.__setattr__(self, name, value)
+        if name in ("text", "alternatives"):
+            self.invalidate()
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._answer._add_owner(self)
+        self.alternatives = self.alternatives
+
+    def _items_changed(self):
+        for alternative in self.alternatives:
+            alternative._add_owner(self)
+        self.invalidate()
+
+    def invalidate(self):
+        """Drop the cached digest and invalidate the questionaires."""
+        self._digest = None
+        self._notify_owners()
 
     def to_dict(self):
         alternatives = []
@@ -86,11 +226,21 @@ class Question:
         new.answer = Alternative.from_dict(values.get("answer"))
         return new
 
+    def digest(self) -> bytes:
+        if self._digest is None:
+            self._digest = content_digest(
+                "Question",
+                self.text,
+                [a.digest() for a in self.alternatives or ()],
+                self.answer.digest(),
+            )
+        return self._digest
+
     def __hash__(self):
-        return hash(freeze(self.to_dict()))
+        return hash(self.digest())
 
     def __eq__(self, value):
-        return isinstance(value, Question) and self.__hash__() == value.__hash__()
+        return isinstance(value, Question) and self.digest() == value.digest()
 
     def __repr__(self):
         return str(self.to_dict())
@@ -114,6 +264,10 @@ class Question:
 
 
 class Questionaire:
+    # Use the Decimal reference implementation instead of the vectorized engine
+    exact_aggregation = False
+    _digest = None
+
     def __init__(
         self, factor: str = "", calculation: str = "mean", questions: list = None
     ):
@@ -123,32 +277,74 @@ class Questionaire:
             self.questions = list(questions)
         self.factor = factor
         self.calculation = calculation
-        self.sum_factor()
-        self.multiply_factor()
-        self.mean()
-        self.range()
-        self.mean_75()
+        self.invalidate()
+
+    def __setattr__(self, name, value):
+        if name == "questions":
+            # Answer changes on the new questions must reach this cache too
+            value = _OwnedList(value, self)
+            for question in value:
+                question._add_owner(self)
+        object.__setattr__(self, name, value)
+        if name in ("factor", "calculation", "questions"):
+            self.invalidate()
+
+    def digest(self) -> bytes:
+        """Content digest, cached until a question changes."""
+        if self._digest is None:
+            self._digest = content_digest(
+                "Questionaire",
+                self.factor,
+                self.calculation,
+                [q.digest() for q in self.questions],
+            )
+        return self._digest
 
     def __hash__(self):
-        questions_hash = 0
-        for question in self.questions:
-            questions_hash += hash((question.text, question.answer.__hash__()))
-            for alternative in question.alternatives:
-                reduced = reduce_decimal_places(value=alternative.weight, ndigits=5)
-                questions_hash += hash(
-                    (alternative.text, reduced.max, reduced.min, reduced.probable)
-                )
-        return hash((self.factor, self.calculation, questions_hash))
+        return hash(self.digest())
 
     def __eq__(self, value):
-        return isinstance(value, Questionaire) and self.__hash__() == value.__hash__()
+        return isinstance(value, Questionaire) and self.digest() == value.digest()
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.questions = self.questions
+
+    def _items_changed(self):
+        for question in self.questions:
+            question._add_owner(self)
+        self.invalidate()
+
+    def invalidate(self):
+        """
+        Drop cached answers, factors and digest, they are recalculated when
+        needed.
+        """
+        self._answers = None
+        self._factors = None
+        self._digest = None
+
+    @property
+    def factor_sum(self):
+        return self.aggregate()["factor_sum"]
+
+    @property
+    def factor_mul(self):
+        return self.aggregate()["factor_mul"]
+
+    @property
+    def factor_range(self):
+        return self.aggregate()["factor_range"]
+
+    @property
+    def factor_mean(self):
+        return self.aggregate()["factor_mean"]
+
+    @property
+    def factor_mean_75(self):
+        return self.aggregate()["factor_mean_75"]
 
     def to_dict(self):
-        self.sum_factor()
-        self.multiply_factor()
-        self.mean()
-        self.range()
-        self.mean_75()
         questions = []
         for q in self.questions:
             questions.append(q.to_dict())
@@ -193,11 +389,6 @@ class Questionaire:
                 )
             )
             qs.append_question(question=question)
-        qs.factor_sum = dict.get("factor_sum", MonteCarloRange())
-        qs.factor_mul = dict.get("factor_mul", MonteCarloRange(probable=1))
-        qs.factor_range = dict.get("factor_range", MonteCarloRange())
-        qs.factor_mean = dict.get("factor_mean", MonteCarloRange())
-        qs.factor_mean_75 = dict.get("factor_mean_75", MonteCarloRange())
         return qs
 
     def append_question(self, question: Question = Question()):
@@ -206,31 +397,36 @@ class Questionaire:
     def sum(self):
         return self.sum_factor()
 
+    def answers(self) -> numpy.ndarray:
+        """Answer weights as a read-only (n_questions, 3) min/probable/max array."""
+        if self._answers is None:
+            answers = weights_array(q.answer.weight for q in self.questions)
+            answers.setflags(write=False)
+            self._answers = answers
+        return self._answers
+
+    def aggregate(self) -> dict:
+        """
+        Calculate all factors in one pass. The result is cached until an
+        answer, question or alternative changes.
+        """
+        exact = self.exact_aggregation
+        if self._factors is None or self._factors[0] != exact:
+            if exact:
+                factors = aggregate_decimal([q.answer.weight for q in self.questions])
+            else:
+                factors = {
+                    name: to_range(values)
+                    for name, values in aggregate(self.answers()).items()
+                }
+            self._factors = (exact, factors)
+        return self._factors[1]
+
     def sum_factor(self):
-        max = 0
-        min = 0
-        mode = 0
-        for q in self.questions:
-            max += q.answer.weight.max
-            min += q.answer.weight.min
-            mode += q.answer.weight.probable
-        self.factor_sum = MonteCarloRange(min=min, max=max, probable=mode)
-        return self.factor_sum
+        return self.aggregate()["factor_sum"]
 
     def multiply_factor(self):
-        max = min = mode = 1
-        for q in self.questions:
-            if (
-                q.answer.weight.max
-                != q.answer.weight.min
-                != q.answer.weight.probable
-                != 0
-            ):
-                max *= q.answer.weight.max
-                min *= q.answer.weight.min
-                mode *= q.answer.weight.probable
-        self.factor_mul = MonteCarloRange(min=min, max=max, probable=mode)
-        return self.factor_mul
+        return self.aggregate()["factor_mul"]
 
     def max_range(self):
         if len(self.questions) == 0:
@@ -272,22 +468,7 @@ class Questionaire:
         return Decimal(statistics.mode(mode))
 
     def range(self):
-        if len(self.questions) == 0:
-            self.factor_range = MonteCarloRange(
-                min=Decimal(0), probable=Decimal(0), max=Decimal(0)
-            )
-        else:
-            mode = []
-            for q in self.questions:
-                mode.append(q.answer.weight.probable)
-                mode.append(q.answer.weight.max)
-                mode.append(q.answer.weight.min)
-            self.factor_range = MonteCarloRange(
-                min=Decimal(numpy.min(mode)),
-                probable=Decimal(statistics.mode(mode)),
-                max=Decimal(numpy.max(mode)),
-            )
-        return self.factor_range
+        return self.aggregate()["factor_range"]
 
     def count_answered_questions(self):
         num = 0
@@ -301,38 +482,10 @@ class Questionaire:
         return num
 
     def mean(self):
-        if len(self.questions) == 0:
-            self.factor_mean = MonteCarloRange()
-        else:
-            sum = self.sum_factor()
-            non_zero_answers = self.count_answered_questions()
-            if non_zero_answers == 0:
-                non_zero_answers = 1
-            self.factor_mean = MonteCarloRange(
-                min=sum.min / non_zero_answers,
-                max=sum.max / non_zero_answers,
-                probable=sum.probable / non_zero_answers,
-            )
-        return self.factor_mean
+        return self.aggregate()["factor_mean"]
 
     def mean_75(self):
-        if len(self.questions) == 0:
-            self.factor_mean_75 = MonteCarloRange()
-        else:
-            weights = []
-            for q in self.questions:
-                weights.append(q.answer.weight.probable)
-                weights.append(q.answer.weight.max)
-                weights.append(q.answer.weight.min)
-            weights.sort()
-            split = numpy.array_split(weights, 3)
-            p75 = split[2]
-            self.factor_mean_75 = MonteCarloRange(
-                min=Decimal(numpy.min(p75)),
-                probable=Decimal(statistics.mode(p75)),
-                max=Decimal(numpy.max(p75)),
-            )
-        return self.factor_mean_75
+        return self.aggregate()["factor_mean_75"]
 
     def calculate_questionaire_value(self):
         calc = getattr(self, self.calculation)
@@ -380,36 +533,22 @@ class Questionaires:
             "lm": self.questionaires["lm"].to_dict(),
         }
 
-    def __hash__(self):
-        return hash(
-            (
-                self.questionaires.get("tef").__hash__(),
-                self.questionaires.get("vuln").__hash__(),
-                self.questionaires.get("lm").__hash__(),
-            )
+    def digest(self) -> bytes:
+        return content_digest(
+            "Questionaires",
+            *(self.questionaires.get(dim).digest() for dim in ("tef", "vuln", "lm")),
         )
 
+    def __hash__(self):
+        return hash(self.digest())
+
     def __eq__(self, other):
-        eq = False
-        if isinstance(other, Questionaires):
-            if self.__hash__() == other.__hash__():
-                eq = True
-                if not (self.questionaires["tef"] == other.questionaires["tef"]):
-                    eq = False
-                elif not (
-                    self.questionaires["vuln"].__hash__()
-                    == other.questionaires["vuln"].__hash__()
-                ):
-                    eq = False
-                elif not (
-                    self.questionaires["lm"].__hash__()
-                    == other.questionaires["lm"].__hash__()
-                ):
-                    eq = False
-        return eq
+        return isinstance(other, Questionaires) and self.digest() == other.digest()
 
     @classmethod
     def from_dict(cls, values: dict = {}):
+        # Sparade scenarier refererar till en delad definition
+        values = definitions.expand(values)
         tef = Questionaire.from_dict(dict=values["tef"])
         vuln = Questionaire.from_dict(dict=values["vuln"])
         lm = Questionaire.from_dict(dict=values["lm"])
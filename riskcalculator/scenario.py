@@ -22,12 +22,102 @@
 # SOFTWARE.
 #
 
+from typing import Optional
+
+import numpy
+
+from riskcalculator import simulation
 from riskcalculator.questionaire import Questionaire, Questionaires
 from otyg_risk_base.hybrid import HybridRisk
-from .util import freeze
+from .util import content_digest
+
+QUANTITATIVE_STATS = {
+    "threat_event_frequency": ("min", "probable", "max"),
+    "vuln_score": ("min", "probable", "max"),
+    "loss_event_frequency": ("min", "probable", "max", "p75", "p90"),
+    "loss_magnitude": ("min", "probable", "max", "p75", "p90"),
+    "ale": ("min", "probable", "max", "p75", "p90"),
+    "annual_loss_expectancy": ("min", "probable", "max", "p75", "p90"),
+}
+
+
+def _stat(value):
+    # 12 significant digits, MonteCarloRange.from_dict adds Decimal noise
+    return None if value is None else float(f"{float(value):.12g}")
+
+
+def _risk_from_dict(values: dict) -> HybridRisk:
+    """
+    HybridRisk.from_dict, but kept sample arrays are attached as they are.
+    from_dict copies them with numpy.array, which would read a memory
+    mapped array in full.
+    """
+    quantitative = values.get("quantitative") or {}
+    kept = {
+        name: sim["__samples"]
+        for name, sim in quantitative.items()
+        if isinstance(sim, dict) and isinstance(sim.get("__samples"), numpy.ndarray)
+    }
+    if kept:
+        quantitative = dict(quantitative)
+        for name in kept:
+            quantitative[name] = {
+                k: v for k, v in quantitative[name].items() if k != "__samples"
+            }
+        values = dict(values, quantitative=quantitative)
+    risk = HybridRisk.from_dict(values=values)
+    for name, samples in kept.items():
+        setattr(
+            getattr(risk.quantitative, name), "_MonteCarloSimulation__samples", samples
+        )
+    return risk
+
+
+INPUT_RANGES = ("threat_event_frequency", "vulnerability", "loss_magnitude")
+
+
+def _input_ranges(parameters: dict) -> Optional[dict]:
+    """
+    The tef/vuln/lm ranges given directly in parameters, None unless all
+    three are. The risk only keeps the simulated loss magnitude, so these
+    are what a manual scenario is simulated again from.
+    """
+    if not all(parameters.get(name) for name in INPUT_RANGES):
+        return None
+    return {
+        name: dict(
+            zip(
+                ("min", "probable", "max"),
+                map(float, simulation.as_ranges(parameters[name])[0]),
+            )
+        )
+        for name in INPUT_RANGES
+    }
+
+
+def _risk_digest(risk) -> bytes:
+    """Digest of the statistics of a HybridRisk, the samples are left out."""
+    if not isinstance(risk, HybridRisk):
+        return content_digest(risk)
+    quantitative = risk.quantitative
+    stats = [
+        [_stat(getattr(getattr(quantitative, name, None), s, None)) for s in names]
+        for name, names in QUANTITATIVE_STATS.items()
+    ]
+    return content_digest(
+        "HybridRisk",
+        risk.qualitative.to_dict(),
+        stats,
+        quantitative.budget,
+        quantitative.currency,
+    )
 
 
 class RiskScenario:
+    _digest = None
+    # Input ranges of a scenario without questionaires, see _input_ranges
+    inputs = None
+
     def __init__(self, parameters: dict = None):
         if not parameters:
             self.actor = ""
@@ -47,6 +137,7 @@ class RiskScenario:
             self.vulnerability = parameters.get("vulnerability_desc", "")
             self.risk = parameters.get("risk", HybridRisk())
             self.category = parameters.get("category", "")
+            self.inputs = _input_ranges(parameters)
             self.name = parameters.get("name", self.auto_desc())
             if self.name == "":
                 self.name = self.auto_desc()
@@ -88,7 +179,7 @@ class RiskScenario:
         return f"Risk att {self.actor} utnyttjar {self.vulnerability} för att realisera {self.threat} mot {self.asset}."
 
     def to_dict(self):
-        return {
+        d = {
             "name": self.name,
             "category": self.category,
             "actor": self.actor,
@@ -99,6 +190,9 @@ class RiskScenario:
             "risk": self.risk.to_dict(),
             "questionaires": self.questionaires.to_dict(),
         }
+        if self.inputs:
+            d["inputs"] = self.inputs
+        return d
 
     @classmethod
     def from_dict(cls, dict: dict = None):
@@ -110,8 +204,9 @@ class RiskScenario:
         new.threat = dict.get("threat", "")
         new.vulnerability = dict.get("vulnerability_desc", "")
         new.description = dict.get("description")
-        new.risk = HybridRisk.from_dict(values=dict.get("risk", {}))
+        new.risk = _risk_from_dict(dict.get("risk", {}))
         new.questionaires = Questionaires.from_dict(dict.get("questionaires"))
+        new.inputs = dict.get("inputs")
         return new
 
     def __str__(self):
@@ -122,20 +217,37 @@ class RiskScenario:
     def __repr__(self):
         return str(self.to_dict())
 
-    def __hash__(self):
-        return hash(
-            (
+    def __setattr__(self, name, value):
+        object.__setattr__(self, name, value)
+        if not name.startswith("_"):
+            object.__setattr__(self, "_digest", None)
+
+    def digest(self) -> bytes:
+        """
+        Content digest. The scenario fields and the risk are digested once
+        per assignment, the risk is treated as a value and not mutated in
+        place. The questionaires keep their own cached digest.
+        """
+        if self._digest is None:
+            self._digest = content_digest(
+                "RiskScenario",
                 self.actor,
                 self.description,
                 self.asset,
                 self.threat,
-                freeze(self.vulnerability),
+                self.vulnerability,
                 self.category,
                 self.name,
-                self.risk.__hash__(),
-                self.questionaires.__hash__(),
+                self.inputs,
+                _risk_digest(self.risk),
             )
+        questionaires = self.questionaires
+        return content_digest(
+            self._digest, questionaires.digest() if questionaires else None
         )
 
+    def __hash__(self):
+        return hash(self.digest())
+
     def __eq__(self, value):
-        return self.__hash__() == value.__hash__()
+        return isinstance(value, RiskScenario) and self.digest() == value.digest()
@@ -0,0 +1,224 @@
+#
+# MIT License
+#
+# Copyright (c) 2025 Martin Vesterlund
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+
+"""
+Per-question sensitivity analysis (tornado data) for a stored scenario.
+
+Every alternative of every question is switched one at a time while the
+other answers keep their stored value. All variants are evaluated in one
+batch with shared draws, so the differences against the baseline come from
+the answers only.
+"""
+
+from __future__ import annotations
+
+import os
+from dataclasses import asdict, dataclass
+from typing import Any, Union
+
+import numpy
+
+from .batch import evaluate_batch
+from .compute import in_worker
+from .questionaire import Questionaires
+from .scenario import RiskScenario
+from .template import DIMENSIONS, QuestionairesTemplate, QuestionaireTemplate
+
+DEFAULT_SAMPLES = 20000
+DEFAULT_SEED = 0
+
+
+@dataclass(frozen=True)
+class Outcome:
+    ale_p50: float
+    ale_p90: float
+    overall_risk: str
+
+
+@dataclass(frozen=True)
+class Variant:
+    dimension: str
+    question: int
+    question_text: str
+    alternative: int
+    alternative_text: str
+    outcome: Outcome
+    delta_p50: float
+    delta_p90: float
+    risk_changed: bool
+
+
+@dataclass(frozen=True)
+class QuestionSensitivity:
+    """One tornado bar: the spread of ALE p90 over the alternatives."""
+
+    dimension: str
+    question: int
+    question_text: str
+    low_p90: float
+    high_p90: float
+    swing: float
+    risks: tuple[str, ...]
+
+
+@dataclass(frozen=True)
+class Sensitivity:
+    baseline: Outcome
+    variants: tuple[Variant, ...]
+    questions: tuple[QuestionSensitivity, ...]
+    samples: int
+    seed: Any
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+def _scenario_inputs(scenario: Union[RiskScenario, dict]):
+    """Questionaires, budget, currency and mappings of a scenario or its dict."""
+    if isinstance(scenario, RiskScenario):
+        quantitative = scenario.risk.quantitative
+        return (
+            scenario.questionaires,
+            quantitative.budget,
+            quantitative.currency,
+            scenario.risk.qualitative.mappings,
+        )
+    risk = scenario.get("risk") or {}
+    quantitative = risk.get("quantitative") or {}
+    qualitative = risk.get("qualitative") or {}
+    return (
+        Questionaires.from_dict(scenario["questionaires"]),
+        quantitative.get("budget", 1000000),
+        quantitative.get("currency", "SEK"),
+        qualitative.get("mappings"),
+    )
+
+
+def _template(questionaires: Questionaires) -> QuestionairesTemplate:
+    compiled = {
+        dim: QuestionaireTemplate.from_questionaire(questionaires.questionaires[dim])
+        for dim in DIMENSIONS
+    }
+    return QuestionairesTemplate(set_id="", **compiled)
+
+
+def _variants(template: QuestionairesTemplate):
+    """Baseline answers followed by one row per alternative switch."""
+    baseline = {dim: template.get(dim).default_answers for dim in DIMENSIONS}
+    rows = [baseline]
+    switches = []
+    for dim in DIMENSIONS:
+        qtemplate = template.get(dim)
+        for qi, count in enumerate(qtemplate.alternative_counts):
+            for ai in range(int(count)):
+                if ai == baseline[dim][qi]:
+                    continue
+                row = dict(baseline)
+                row[dim] = baseline[dim].copy()
+                row[dim][qi] = ai
+                rows.append(row)
+                switches.append((dim, qi, ai))
+    answers = {dim: numpy.stack([row[dim] for row in rows]) for dim in DIMENSIONS}
+    return answers, switches
+
+
+def analyze(
+    scenario: Union[RiskScenario, dict],
+    samples: int = DEFAULT_SAMPLES,
+    seed=DEFAULT_SEED,
+    workers: int = None,
+    mappings: Any = None,
+) -> Sensitivity:
+    """
+    Sensitivity of ALE p50/p90 and overall risk to every answer of a scenario.
+
+    mappings overrides the qualitative scale stored with the scenario.
+    Variants are ranked by |delta ALE p90|, questions by their swing.
+    workers defaults to all cores, or one in a compute pool worker.
+    """
+    questionaires, budget, currency, stored_mappings = _scenario_inputs(scenario)
+    template = _template(questionaires)
+    answers, switches = _variants(template)
+    result = evaluate_batch(
+        template,
+        answers,
+        budget=float(budget),
+        currency=currency,
+        mappings=mappings if mappings is not None else stored_mappings,
+        samples=samples,
+        seed=seed,
+        workers=workers or (1 if in_worker() else os.cpu_count() or 1),
+    )
+    p50 = result.statistic("annual_loss_expectancy", "p50")
+    p90 = result.statistic("annual_loss_expectancy", "p90")
+    risks = result.overall_risks()
+    outcomes = [
+        Outcome(ale_p50=float(p50[i]), ale_p90=float(p90[i]), overall_risk=risks[i])
+        for i in range(len(result))
+    ]
+    baseline = outcomes[0]
+
+    variants = []
+    by_question: dict[tuple, list[Outcome]] = {}
+    for (dim, qi, ai), outcome in zip(switches, outcomes[1:]):
+        question = template.get(dim).questions[qi]
+        variants.append(
+            Variant(
+                dimension=dim,
+                question=qi,
+                question_text=question.text,
+                alternative=ai,
+                alternative_text=question.alternatives[ai].text,
+                outcome=outcome,
+                delta_p50=outcome.ale_p50 - baseline.ale_p50,
+                delta_p90=outcome.ale_p90 - baseline.ale_p90,
+                risk_changed=outcome.overall_risk != baseline.overall_risk,
+            )
+        )
+        by_question.setdefault((dim, qi), [baseline]).append(outcome)
+    variants.sort(key=lambda v: (-abs(v.delta_p90), -abs(v.delta_p50)))
+
+    questions = []
+    for (dim, qi), question_outcomes in by_question.items():
+        values = [o.ale_p90 for o in question_outcomes]
+        questions.append(
+            QuestionSensitivity(
+                dimension=dim,
+                question=qi,
+                question_text=template.get(dim).questions[qi].text,
+                low_p90=min(values),
+                high_p90=max(values),
+                swing=max(values) - min(values),
+                risks=tuple(sorted({o.overall_risk for o in question_outcomes})),
+            )
+        )
+    questions.sort(key=lambda q: -q.swing)
+
+    return Sensitivity(
+        baseline=baseline,
+        variants=tuple(variants),
+        questions=tuple(questions),
+        samples=samples,
+        seed=seed,
+    )
@@ -0,0 +1,484 @@
+#
+# MIT License
+#
+# Copyright (c) 2025 Martin Vesterlund
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+
+"""
+Vectorized Monte Carlo engine mirroring otyg_risk_base.hybrid.HybridRisk.
+
+HybridRisk draws its samples from an unseeded generator, one scenario at a
+time. This module performs the same calculation for many scenarios at once,
+with an explicit sample count and seed. All scenarios in a call share the
+same uniform draws (common random numbers), so the sampling work is done
+once and differences between near-identical scenarios are not drowned in
+sampling noise.
+
+Ranges are float64 arrays of shape (N, 3) holding min, probable, max.
+"""
+
+from __future__ import annotations
+
+import math
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Any, Optional
+
+import numpy
+from otyg_risk_base.hybrid import HybridRisk
+from otyg_risk_base.montecarlo import MonteCarloRange, MonteCarloSimulation
+from otyg_risk_base.qualitative_risk import QualitativeRisk
+from otyg_risk_base.qualitative_scale import QualitativeScale
+from otyg_risk_base.quantitative_risk import QuantitativeRisk
+
+MIN, PROBABLE, MAX = 0, 1, 2
+DEFAULT_SAMPLES = 100000
+UPPER_QUANTILE = 0.99
+# Number of independent uniform streams used by one risk calculation
+STREAMS = 5
+# Keep the (scenarios x samples) working set of one chunk around 64 MB
+CHUNK_BYTES = 64 * 1024 * 1024
+
+# Statistics kept per simulated quantity, in this column order. The first
+# five are the ones stored on MonteCarloSimulation.
+STATS = ("min", "probable", "max", "p90", "p75", "p50")
+SIMULATED = (
+    "loss_event_frequency",
+    "loss_magnitude",
+    "ale",
+    "annual_loss_expectancy",
+)
+
+# Adaptive sampling: statistics that must converge, relative tolerance,
+# first batch and hard cap
+TRACKED = (("loss_event_frequency", "p90"), ("annual_loss_expectancy", "p90"))
+DEFAULT_TOLERANCE = 0.01
+PREVIEW_TOLERANCE = 0.02
+REPORT_TOLERANCE = 0.005
+DEFAULT_BATCH = 10000
+MAX_SAMPLES = 1000000
+# Two-sided 95 % normal quantile for the error estimates
+_Z = 1.959964
+
+_EPS = numpy.finfo(float).eps
+_LOGIT_Q = math.log(UPPER_QUANTILE / (1.0 - UPPER_QUANTILE))
+
+
+def _row(value) -> tuple:
+    if isinstance(value, MonteCarloRange):
+        return (float(value.min), float(value.probable), float(value.max))
+    if isinstance(value, dict):
+        return (float(value["min"]), float(value["probable"]), float(value["max"]))
+    return tuple(float(v) for v in value)
+
+
+def as_ranges(value) -> numpy.ndarray:
+    """Convert MonteCarloRange, dict, list or array input to a (N, 3) array."""
+    if isinstance(value, (MonteCarloRange, dict)):
+        value = [value]
+    if isinstance(value, (list, tuple)):
+        value = [_row(v) for v in value]
+    return numpy.atleast_2d(numpy.asarray(value, dtype=numpy.float64))
+
+
+def normalize(ranges: numpy.ndarray) -> numpy.ndarray:
+    """Apply the adjustments made by the MonteCarloRange constructor."""
+    r_min, r_probable, r_max = ranges[:, MIN], ranges[:, PROBABLE], ranges[:, MAX]
+    invalid = (r_max != r_min) & (
+        (r_probable < r_min) | (r_probable > r_max) | (r_min > r_max)
+    )
+    if invalid.any():
+        raise ValueError
+    out = ranges.copy()
+    widen = (r_probable != 0) & (r_max == r_min)
+    centre = ~widen & (r_max != 0)
+    out[widen, MAX] = r_probable[widen] * 2
+    out[widen, MIN] = r_probable[widen] / 2
+    out[centre, PROBABLE] = (r_min[centre] + r_max[centre]) / 2
+    return out
+
+
+def _clip(ranges: numpy.ndarray) -> numpy.ndarray:
+    return numpy.where(ranges < 1e-20, 0.0, ranges)
+
+
+def multiply(a: numpy.ndarray, b: numpy.ndarray) -> numpy.ndarray:
+    """MonteCarloRange.multiply for two normalized ranges."""
+    return normalize(_clip(a * b))
+
+
+def scale(a: numpy.ndarray, factor: numpy.ndarray) -> numpy.ndarray:
+    """MonteCarloRange.multiply with a scalar per scenario."""
+    return normalize(_clip(a * numpy.asarray(factor, dtype=float).reshape(-1, 1)))
+
+
+def loglogistic(ranges: numpy.ndarray, uniform: numpy.ndarray) -> numpy.ndarray:
+    """
+    Samples of the truncated log-logistic distribution used by
+    MonteCarloSimulation, shape (N, len(uniform)).
+    """
+    r_min = ranges[:, MIN].copy()
+    r_probable = ranges[:, PROBABLE]
+    r_max = ranges[:, MAX].copy()
+    point = (r_min == r_max) & (r_max == r_probable)
+    r_min[point] -= 1e-12
+    r_max[point] += 1e-12
+
+    span = r_max - r_min
+    degenerate = span <= 0
+    span = numpy.where(degenerate, 1.0, span)
+    alpha = r_probable - r_min
+    alpha = numpy.where(alpha <= _EPS, numpy.maximum(span * 0.1, _EPS), alpha)
+    span_ratio = span / alpha
+    with numpy.errstate(divide="ignore", invalid="ignore"):
+        beta = _LOGIT_Q / numpy.log(span_ratio)
+    beta = numpy.where(
+        (span_ratio <= 1.0 + _EPS) | ~numpy.isfinite(beta) | (beta <= 0), 10.0, beta
+    )
+    f_max = 1.0 / (1.0 + (alpha / span) ** beta)
+    high = numpy.maximum(f_max - _EPS, _EPS)
+    u = _EPS + uniform[None, :] * (high - _EPS)[:, None]
+    samples = r_min[:, None] + alpha[:, None] * (u / (1.0 - u)) ** (1.0 / beta[:, None])
+    if degenerate.any():
+        samples[degenerate] = r_min[degenerate, None]
+    return samples
+
+
+def statistics(samples: numpy.ndarray) -> numpy.ndarray:
+    """min, mean, max, p90, p75 and p50 per row, shape (N, len(STATS))."""
+    out = numpy.empty((samples.shape[0], len(STATS)))
+    out[:, 0] = samples.min(axis=1)
+    out[:, 1] = samples.mean(axis=1)
+    out[:, 2] = samples.max(axis=1)
+    out[:, 3:] = numpy.percentile(samples, [90, 75, 50], axis=1).T
+    return out
+
+
+def _simulate_chunk(tef, vuln, lm, budget, uniforms, keep_samples):
+    lef_samples = loglogistic(multiply(tef, vuln), uniforms[0])
+    lef = statistics(lef_samples)
+    lm_samples = loglogistic(lm, uniforms[1])
+    lm_stats = statistics(lm_samples)
+    ale_range = multiply(normalize(lef[:, :3]), normalize(lm_stats[:, :3]))
+    ale_samples = loglogistic(ale_range, uniforms[2])
+    ale_range = scale(normalize(statistics(ale_samples)[:, :3]), budget)
+    ale_samples = loglogistic(ale_range, uniforms[3])
+    ale = statistics(ale_samples)
+    annual_samples = loglogistic(ale[:, :3], uniforms[4])
+    annual = statistics(annual_samples)
+    stats = {
+        "loss_event_frequency": lef,
+        "loss_magnitude": lm_stats,
+        "ale": ale,
+        "annual_loss_expectancy": annual,
+    }
+    samples = None
+    if keep_samples:
+        samples = {
+            "loss_event_frequency": lef_samples,
+            "loss_magnitude": lm_samples,
+            "ale": ale_samples,
+            "annual_loss_expectancy": annual_samples,
+        }
+    return stats, samples
+
+
+@dataclass(frozen=True)
+class Convergence:
+    """How an adaptive simulation ended."""
+
+    samples: int
+    tolerance: float
+    converged: bool
+    # "loss_event_frequency.p90" -> estimated relative error, worst scenario
+    error: dict[str, float]
+
+    def to_dict(self) -> dict:
+        return {
+            "samples": self.samples,
+            "tolerance": self.tolerance,
+            "converged": self.converged,
+            "error": dict(self.error),
+        }
+
+
+@dataclass
+class Simulation:
+    """Result of simulate() for N scenarios."""
+
+    threat_event_frequency: numpy.ndarray
+    vulnerability: numpy.ndarray
+    budget: numpy.ndarray
+    stats: dict[str, numpy.ndarray]
+    samples: Optional[dict[str, numpy.ndarray]]
+    convergence: Optional[Convergence] = None
+
+    def __len__(self):
+        return self.threat_event_frequency.shape[0]
+
+
+def uniforms(samples: int = DEFAULT_SAMPLES, seed=None) -> numpy.ndarray:
+    """The shared uniform draws for one calculation, shape (STREAMS, samples)."""
+    return numpy.random.default_rng(seed).random((STREAMS, samples))
+
+
+def simulate(
+    tef,
+    vuln,
+    lm,
+    budget,
+    samples: int = DEFAULT_SAMPLES,
+    seed=None,
+    keep_samples: bool = False,
+    draws: numpy.ndarray = None,
+    workers: int = 1,
+) -> Simulation:
+    """
+    Run the HybridRisk quantitative calculation for N scenarios.
+
+    tef, vuln and lm are (N, 3) ranges as produced by the questionaires (not
+    yet normalized), budget is a scalar or a (N,) array. seed is anything
+    accepted by numpy.random.default_rng; draws overrides seed and samples
+    with precomputed uniforms(). With workers > 1 the scenarios are split
+    over a thread pool, the results do not depend on the number of workers.
+    """
+    tef = normalize(as_ranges(tef))
+    vuln = normalize(as_ranges(vuln))
+    lm = normalize(as_ranges(lm))
+    n = max(tef.shape[0], vuln.shape[0], lm.shape[0])
+    tef, vuln, lm = (numpy.broadcast_to(r, (n, 3)) for r in (tef, vuln, lm))
+    budget = numpy.broadcast_to(numpy.asarray(budget, dtype=float), (n,))
+    if draws is None:
+        draws = uniforms(samples, seed)
+    chunk = max(1, CHUNK_BYTES // (draws.shape[1] * 8 * 2))
+    if workers > 1:
+        chunk = max(1, min(chunk, -(-n // workers)))
+    parts = [slice(start, min(start + chunk, n)) for start in range(0, n, chunk)]
+
+    def run(part):
+        return _simulate_chunk(
+            tef[part], vuln[part], lm[part], budget[part], draws, keep_samples
+        )
+
+    if workers > 1 and len(parts) > 1:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(run, parts))
+    else:
+        results = [run(part) for part in parts]
+
+    stats = {name: numpy.empty((n, len(STATS))) for name in SIMULATED}
+    kept = {name: [] for name in SIMULATED} if keep_samples else None
+    for part, (chunk_stats, chunk_samples) in zip(parts, results):
+        for name in SIMULATED:
+            stats[name][part] = chunk_stats[name]
+            if keep_samples:
+                kept[name].append(chunk_samples[name])
+    if keep_samples:
+        kept = {name: numpy.concatenate(parts) for name, parts in kept.items()}
+    return Simulation(
+        threat_event_frequency=tef,
+        vulnerability=vuln,
+        budget=budget,
+        stats=stats,
+        samples=kept,
+    )
+
+
+def _relative(delta: numpy.ndarray, value: numpy.ndarray) -> numpy.ndarray:
+    scale = numpy.abs(value)
+    return numpy.where(scale > 0, numpy.abs(delta) / numpy.maximum(scale, _EPS), 0.0)
+
+
+def sampling_error(samples: numpy.ndarray, stat: str) -> numpy.ndarray:
+    """
+    Relative half-width of a 95 % confidence interval for a statistic of
+    (N, n) samples. Percentiles use the distribution-free order statistic
+    interval, the mean its standard error.
+    """
+    n = samples.shape[1]
+    if stat == "probable":
+        mean = samples.mean(axis=1)
+        return _relative(_Z * samples.std(axis=1) / math.sqrt(n), mean)
+    if not stat.startswith("p"):
+        raise ValueError(f"No error estimate for {stat}")
+    q = int(stat[1:]) / 100
+    spread = _Z * math.sqrt(n * q * (1 - q))
+    lo = max(0, int(math.floor(n * q - spread)))
+    hi = min(n - 1, int(math.ceil(n * q + spread)))
+    bounds = numpy.partition(samples, [lo, hi], axis=1)
+    value = numpy.percentile(samples, q * 100, axis=1)
+    return _relative((bounds[:, hi] - bounds[:, lo]) / 2, value)
+
+
+def simulate_adaptive(
+    tef,
+    vuln,
+    lm,
+    budget,
+    tolerance: float = DEFAULT_TOLERANCE,
+    batch: int = DEFAULT_BATCH,
+    max_samples: int = MAX_SAMPLES,
+    seed=None,
+    keep_samples: bool = False,
+    track=TRACKED,
+) -> Simulation:
+    """
+    Like simulate(), but draw in batches until the tracked statistics have
+    converged. The sample count doubles every round; the error of a
+    statistic is the larger of its confidence interval and the change since
+    the previous round, both relative. Stops at max_samples regardless.
+    """
+    rng = numpy.random.default_rng(seed)
+    draws = rng.random((STREAMS, min(batch, max_samples)))
+    previous = None
+    while True:
+        result = simulate(tef, vuln, lm, budget, draws=draws, keep_samples=True)
+        samples = draws.shape[1]
+        error = {}
+        for name, stat in track:
+            value = result.stats[name][:, STATS.index(stat)]
+            rows = sampling_error(result.samples[name], stat)
+            if previous is not None:
+                drift = previous.stats[name][:, STATS.index(stat)]
+                rows = numpy.maximum(rows, _relative(value - drift, value))
+            error[f"{name}.{stat}"] = float(rows.max()) if rows.size else 0.0
+        converged = previous is not None and all(e <= tolerance for e in error.values())
+        if converged or samples >= max_samples:
+            break
+        previous = result
+        more = min(samples, max_samples - samples)
+        draws = numpy.concatenate([draws, rng.random((STREAMS, more))], axis=1)
+
+    result.convergence = Convergence(
+        samples=samples, tolerance=tolerance, converged=converged, error=error
+    )
+    if not keep_samples:
+        result.samples = None
+    return result
+
+
+def _range(values) -> MonteCarloRange:
+    # Values are already normalized, bypass the constructor adjustments
+    r = MonteCarloRange.__new__(MonteCarloRange)
+    r.min, r.probable, r.max = (Decimal(float(v)) for v in values[:3])
+    return r
+
+
+def _simulation(stats, samples) -> MonteCarloSimulation:
+    # Built from precomputed statistics, the constructor would sample again
+    s = MonteCarloSimulation.__new__(MonteCarloSimulation)
+    s.min, s.probable, s.max, s.p90, s.p75 = (Decimal(float(v)) for v in stats[:5])
+    s._MonteCarloSimulation__samples = (
+        samples if samples is not None else numpy.empty(0)
+    )
+    return s
+
+
+def qualitative(tef_probable, vuln_probable, lm_probable, mappings) -> QualitativeRisk:
+    """The HybridRisk qualitative assessment for the probable values."""
+    if isinstance(mappings, QualitativeScale):
+        qs = mappings
+    else:
+        qs = QualitativeScale(scales=mappings)
+    return QualitativeRisk(
+        likelihood_init=qs.get(
+            raw=tef_probable, mapping="likelihood_initiation_or_occurence"
+        ).get("numeric"),
+        likelihood_impact=qs.get(
+            raw=vuln_probable, mapping="likelihood_adverse_impact"
+        ).get("numeric"),
+        impact=qs.get(raw=lm_probable, mapping="impact").get("numeric"),
+        mappings=qs,
+    )
+
+
+def hybrid_risk(
+    simulation: Simulation, index: int, currency: str = "SEK", mappings=None
+) -> HybridRisk:
+    """Build the HybridRisk for one scenario of a simulation."""
+    samples = simulation.samples or {}
+    stats = simulation.stats
+
+    def sim(name):
+        s = samples.get(name)
+        return _simulation(stats[name][index], None if s is None else s[index])
+
+    quantitative = QuantitativeRisk.__new__(QuantitativeRisk)
+    quantitative.threat_event_frequency = _range(
+        simulation.threat_event_frequency[index]
+    )
+    quantitative.vuln_score = _range(simulation.vulnerability[index])
+    quantitative.loss_event_frequency = sim("loss_event_frequency")
+    quantitative.loss_magnitude = sim("loss_magnitude")
+    quantitative.ale = sim("ale")
+    quantitative.annual_loss_expectancy = sim("annual_loss_expectancy")
+    quantitative.budget = Decimal(float(simulation.budget[index]))
+    quantitative.currency = currency
+
+    risk = HybridRisk.__new__(HybridRisk)
+    risk.convergence = simulation.convergence
+    risk.quantitative = quantitative
+    risk.qualitative = qualitative(
+        quantitative.threat_event_frequency.probable,
+        quantitative.vuln_score.probable,
+        quantitative.loss_magnitude.probable,
+        mappings,
+    )
+    return risk
+
+
+def evaluate_risk(
+    values: dict[str, Any],
+    samples: int = DEFAULT_SAMPLES,
+    seed=None,
+    tolerance: Optional[float] = None,
+) -> HybridRisk:
+    """
+    Drop-in for HybridRisk(values=values) with explicit sample count and seed.
+    The samples are kept on the result like HybridRisk does.
+
+    With a tolerance the sampling is adaptive and samples is the hard cap,
+    the achieved precision is found on risk.convergence.
+    """
+    args = (
+        values["threat_event_frequency"],
+        values["vulnerability"],
+        values["loss_magnitude"],
+        float(values["budget"]),
+    )
+    if tolerance is not None:
+        simulation = simulate_adaptive(
+            *args,
+            tolerance=tolerance,
+            batch=min(DEFAULT_BATCH, samples),
+            max_samples=samples,
+            seed=seed,
+            keep_samples=True,
+        )
+    else:
+        simulation = simulate(*args, samples=samples, seed=seed, keep_samples=True)
+    return hybrid_risk(
+        simulation,
+        0,
+        currency=values["currency"],
+        mappings=values.get("mappings"),
+    )
@@ -0,0 +1,245 @@
+#
+# MIT License
+#
+# Copyright (c) 2025 Martin Vesterlund
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+
+"""
+Compiled, read-only questionaire templates.
+
+A template is built once from a questionaire definition and shared between
+requests. The per-request state of a questionaire is then only an integer
+vector with the index of the chosen alternative for every question, where
+UNANSWERED (-1) selects the answer stored in the definition.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Optional
+
+import numpy
+
+from .aggregation import aggregate, to_range, weights_array
+from .questionaire import Alternative, Question, Questionaire, Questionaires
+
+UNANSWERED = -1
+DIMENSIONS = ("tef", "vuln", "lm")
+
+# Questionaire.calculation -> key in aggregation.aggregate()
+CALCULATIONS = {
+    "sum": "factor_sum",
+    "sum_factor": "factor_sum",
+    "multiply_factor": "factor_mul",
+    "mean": "factor_mean",
+    "range": "factor_range",
+    "mean_75": "factor_mean_75",
+}
+
+
+@dataclass(frozen=True)
+class QuestionTemplate:
+    text: str
+    alternatives: tuple[Alternative, ...]
+    default_answer: Alternative
+
+    @property
+    def answer(self) -> Alternative:
+        return self.default_answer
+
+
+@dataclass(frozen=True, eq=False)
+class QuestionaireTemplate:
+    factor: str
+    calculation: str
+    questions: tuple[QuestionTemplate, ...]
+    # (n_questions, max_alternatives + 1, 3), the last slot is the default answer
+    weights: numpy.ndarray
+    alternative_counts: numpy.ndarray
+    default_answers: numpy.ndarray
+
+    @classmethod
+    def from_questionaire(cls, questionaire: Questionaire) -> QuestionaireTemplate:
+        questions = tuple(
+            QuestionTemplate(
+                text=q.text,
+                alternatives=tuple(q.alternatives),
+                default_answer=q.answer,
+            )
+            for q in questionaire.questions
+        )
+        counts = numpy.array([len(q.alternatives) for q in questions], dtype=numpy.intp)
+        width = int(counts.max()) + 1 if len(questions) else 1
+        weights = numpy.zeros((len(questions), width, 3))
+        default_answers = numpy.full(len(questions), UNANSWERED, dtype=numpy.intp)
+        for qi, q in enumerate(questions):
+            if q.alternatives:
+                weights[qi, : len(q.alternatives)] = weights_array(
+                    a.weight for a in q.alternatives
+                )
+            weights[qi, -1] = weights_array([q.default_answer.weight])[0]
+            for ai, alternative in enumerate(q.alternatives):
+                if alternative == q.default_answer:
+                    default_answers[qi] = ai
+                    break
+        for array in (weights, counts, default_answers):
+            array.setflags(write=False)
+        return cls(
+            factor=questionaire.factor,
+            calculation=questionaire.calculation,
+            questions=questions,
+            weights=weights,
+            alternative_counts=counts,
+            default_answers=default_answers,
+        )
+
+    @classmethod
+    def from_dict(cls, values: dict) -> QuestionaireTemplate:
+        return cls.from_questionaire(Questionaire.from_dict(values))
+
+    def blank_answers(self) -> numpy.ndarray:
+        return numpy.full(len(self.questions), UNANSWERED, dtype=numpy.intp)
+
+    def check_answers(self, answers) -> numpy.ndarray:
+        answers = numpy.asarray(answers, dtype=numpy.intp)
+        if answers.shape[-1:] != (len(self.questions),):
+            raise ValueError(
+                f"Expected {len(self.questions)} answers for {self.factor}, "
+                f"got shape {answers.shape}"
+            )
+        if ((answers < UNANSWERED) | (answers >= self.alternative_counts)).any():
+            raise IndexError(f"Answer index out of range for {self.factor}")
+        return answers
+
+    def selected_answers(self, answers=None) -> numpy.ndarray:
+        """
+        The alternative shown as chosen for each question. UNANSWERED is
+        replaced by the default answer, and stays UNANSWERED when that is
+        not one of the alternatives.
+        """
+        if answers is None:
+            answers = self.blank_answers()
+        answers = self.check_answers(answers)
+        return numpy.where(answers == UNANSWERED, self.default_answers, answers)
+
+    def answer_weights(self, answers) -> numpy.ndarray:
+        """Weights of the chosen alternatives, shape (..., n_questions, 3)."""
+        answers = self.check_answers(answers)
+        return self.weights[numpy.arange(len(self.questions)), answers]
+
+    def factors(self, answers) -> dict[str, numpy.ndarray]:
+        return aggregate(self.answer_weights(answers))
+
+    def value(self, answers):
+        """Same as Questionaire.calculate_questionaire_value for the answers."""
+        name = CALCULATIONS.get(self.calculation)
+        if name is None:
+            return self.instantiate(answers).calculate_questionaire_value()
+        return to_range(self.factors(answers)[name])
+
+    def instantiate(self, answers=None) -> Questionaire:
+        """Build a mutable Questionaire with the given answers."""
+        if answers is None:
+            answers = self.blank_answers()
+        answers = self.check_answers(answers)
+        questionaire = Questionaire(factor=self.factor, calculation=self.calculation)
+        for template, index in zip(self.questions, answers):
+            question = Question(template.text, alternatives=list(template.alternatives))
+            if index == UNANSWERED:
+                question.set_answer(template.default_answer)
+            else:
+                question.set_answer(int(index))
+            questionaire.append_question(question)
+        return questionaire
+
+    def answers_from(self, questionaire: Questionaire) -> numpy.ndarray:
+        """Answer indices of a Questionaire built from this template."""
+        answers = self.blank_answers()
+        for qi, (template, question) in enumerate(
+            zip(self.questions, questionaire.questions)
+        ):
+            for ai, alternative in enumerate(template.alternatives):
+                if alternative == question.answer:
+                    answers[qi] = ai
+                    break
+        return answers
+
+
+@dataclass(frozen=True, eq=False)
+class QuestionairesTemplate:
+    set_id: str
+    tef: Optional[QuestionaireTemplate]
+    vuln: Optional[QuestionaireTemplate]
+    lm: Optional[QuestionaireTemplate]
+
+    @classmethod
+    def from_dict(cls, set_id: str, values: dict) -> QuestionairesTemplate:
+        compiled = {
+            dim: QuestionaireTemplate.from_dict(values[dim]) if dim in values else None
+            for dim in DIMENSIONS
+        }
+        return cls(set_id=set_id, **compiled)
+
+    def get(self, dim: str, default: Any = None):
+        if dim == "qset":
+            return self.set_id
+        if dim in DIMENSIONS:
+            return getattr(self, dim)
+        return default
+
+    def __getitem__(self, dim: str):
+        return self.get(dim)
+
+    def blank_answers(self) -> dict[str, numpy.ndarray]:
+        return {
+            dim: template.blank_answers()
+            for dim in DIMENSIONS
+            if (template := getattr(self, dim)) is not None
+        }
+
+    def selected_answers(self, answers: dict = None) -> dict[str, numpy.ndarray]:
+        answers = answers or {}
+        return {
+            dim: template.selected_answers(answers.get(dim))
+            for dim in DIMENSIONS
+            if (template := getattr(self, dim)) is not None
+        }
+
+    def calculate_values(self, answers: dict) -> dict:
+        """Same as Questionaires.calculate_questionairy_values for the answers."""
+        return {
+            "threat_event_frequency": self.tef.value(answers["tef"]),
+            "vulnerability": self.vuln.value(answers["vuln"]),
+            "loss_magnitude": self.lm.value(answers["lm"]),
+        }
+
+    def instantiate(self, answers: dict = None) -> dict[str, Any]:
+        """Mutable Questionaire objects, shaped like load_objects() returns."""
+        answers = answers or {}
+        objects = {"qset": self.set_id}
+        for dim in DIMENSIONS:
+            template = getattr(self, dim)
+            objects[dim] = template.instantiate(answers.get(dim)) if template else None
+        return objects
+
+    def questionaires(self, answers: dict) -> Questionaires:
+        objects = self.instantiate(answers)
+        return Questionaires(tef=objects["tef"], vuln=objects["vuln"], lm=objects["lm"])
@@ -22,7 +22,10 @@
 # SOFTWARE.
 #
 
+import hashlib
 import json
+import struct
+from decimal import Decimal
 
 from numpy import ndarray
 from otyg_risk_base.montecarlo import MonteCarloRange
@@ -66,3 +69,51 @@ def freeze(x):
     if isinstance(x, set):
         return frozenset(freeze(i) for i in x)
     return x
+
+
+def _feed(h, value) -> None:
+    # Type tagged and length prefixed, so different structures never collide
+    if value is None:
+        h.update(b"N")
+    elif isinstance(value, bool):
+        h.update(b"T" if value else b"F")
+    elif isinstance(value, bytes):
+        h.update(b"b" + struct.pack("<Q", len(value)) + value)
+    elif isinstance(value, str):
+        data = value.encode("utf-8")
+        h.update(b"s" + struct.pack("<Q", len(data)) + data)
+    elif isinstance(value, (int, float, Decimal)):
+        if not isinstance(value, Decimal):
+            value = Decimal(value if isinstance(value, int) else repr(value))
+        if value.is_finite():
+            text = format(value.normalize(), "f") if value else "0"
+        else:
+            text = str(value)
+        data = text.encode("ascii")
+        h.update(b"n" + struct.pack("<Q", len(data)) + data)
+    elif isinstance(value, dict):
+        h.update(b"d" + struct.pack("<Q", len(value)))
+        for k in sorted(value, key=str):
+            _feed(h, str(k))
+            _feed(h, value[k])
+    elif isinstance(value, (list, tuple)):
+        h.update(b"l" + struct.pack("<Q", len(value)))
+        for v in value:
+            _feed(h, v)
+    elif isinstance(value, ndarray):
+        _feed(h, value.tolist())
+    elif hasattr(value, "to_dict"):
+        _feed(h, value.to_dict())
+    else:
+        _feed(h, str(value))
+
+
+def content_digest(*parts) -> bytes:
+    """
+    Stable blake2b digest of a canonical encoding of the parts. Numbers of
+    different types that compare equal (1, 1.0, Decimal("1.00")) give the
+    same digest.
+    """
+    h = hashlib.blake2b(digest_size=16)
+    _feed(h, parts)
+    return h.digest()
@@ -22,15 +22,149 @@
 # SOFTWARE.
 #
 
-from riskcalculator.scenario import RiskScenario
+import copy
+import os
+from collections.abc import MutableSequence
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Union
+
+import numpy
+from riskcalculator import simulation
+from riskcalculator.scenario import INPUT_RANGES, RiskScenario
 from otyg_risk_base.hybrid import HybridRisk
-from riskcalculator.util import freeze
+from riskcalculator.util import content_digest
+from riskregister.portfolio import Portfolio
+
+
+def _overall_risk(scenario: Union[RiskScenario, dict]) -> Optional[str]:
+    """overall_risk of a scenario object or a stored scenario dict."""
+    if isinstance(scenario, dict):
+        risk = scenario.get("risk") or {}
+        return (risk.get("qualitative") or {}).get("overall_risk")
+    risk = scenario.risk
+    if isinstance(risk, HybridRisk):
+        return risk.qualitative.overall_risk
+    return None
+
+
+class ScenarioList(MutableSequence):
+    """
+    The scenarios of an assessment. Stored scenario dicts are turned into
+    RiskScenario objects the first time they are accessed, and dicts that
+    were never accessed are passed through unchanged by to_dicts().
+    """
+
+    def __init__(self, scenarios=()):
+        self._items: list[Union[RiskScenario, dict]] = list(scenarios)
+        # Digests of the stored dicts, None until computed
+        self._digests: list[Optional[bytes]] = [None] * len(self._items)
+        self._digest = None
+
+    def __len__(self):
+        return len(self._items)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        item = self._items[index]
+        if isinstance(item, dict):
+            item = RiskScenario.from_dict(item)
+            self._items[index] = item
+            # The object can be changed in place from now on
+            self._digest = None
+        return item
+
+    def __setitem__(self, index, value):
+        self._items[index] = value
+        self._digests[index] = None
+        self._digest = None
+
+    def __delitem__(self, index):
+        del self._items[index]
+        del self._digests[index]
+        self._digest = None
+
+    def insert(self, index, value):
+        self._items.insert(index, value)
+        self._digests.insert(index, None)
+        self._digest = None
+
+    def raw(self, index) -> Union[RiskScenario, dict]:
+        """The scenario as stored, without creating the object."""
+        return self._items[index]
+
+    def hydrated(self) -> int:
+        return sum(1 for item in self._items if not isinstance(item, dict))
+
+    def to_dicts(self) -> list[dict]:
+        return [
+            item if isinstance(item, dict) else item.to_dict() for item in self._items
+        ]
+
+    def digest(self) -> bytes:
+        """
+        Content digest of the scenarios, without hydrating them. A stored
+        dict is digested once through a throwaway RiskScenario, objects give
+        their own cached digest. Cached until the list changes while every
+        scenario is still a dict.
+        """
+        if self._digest is not None:
+            return self._digest
+        digests = []
+        for index, item in enumerate(self._items):
+            if not isinstance(item, dict):
+                digests.append(item.digest())
+                continue
+            if self._digests[index] is None:
+                self._digests[index] = RiskScenario.from_dict(item).digest()
+            digests.append(self._digests[index])
+        digest = content_digest("ScenarioList", digests)
+        if not self.hydrated():
+            self._digest = digest
+        return digest
+
+
+def _scenario_values(scenario: RiskScenario) -> Optional[numpy.ndarray]:
+    """
+    (3, 3) tef/vuln/lm input ranges of a scenario. Answered questionaires are
+    the source of the risk, scenarios without questions use the ranges they
+    were created with. None when neither is known: the risk only holds the
+    simulated loss magnitude, simulating from that would drift on every
+    recompute.
+    """
+    questionaires = (
+        scenario.questionaires.questionaires if scenario.questionaires else {}
+    )
+    if questionaires and all(
+        q is not None and q.questions for q in questionaires.values()
+    ):
+        values = scenario.questionaires.calculate_questionairy_values()
+    elif scenario.inputs:
+        values = scenario.inputs
+    else:
+        return None
+    return simulation.as_ranges([values[name] for name in INPUT_RANGES])
+
+
+def _recompute(job) -> simulation.Simulation:
+    # Runs in a worker process, one seed per scenario
+    values, budget, samples, seed, keep_samples = job
+    return simulation.simulate(
+        values[0],
+        values[1],
+        values[2],
+        budget,
+        samples=samples,
+        seed=seed,
+        keep_samples=keep_samples,
+    )
 
 
 class RiskAssessment:
     def __init__(self, assessment: dict = None):
         self.summary = dict()
-        self.scenarios = list()
+        self.scenarios = ScenarioList()
+        self._portfolio = None
         if assessment:
             self.analysis_object = assessment["analysis_object"]
             self.version = assessment["version"]
@@ -38,9 +172,9 @@ class RiskAssessment:
             self.scope = assessment["scope"]
             self.owner = assessment["owner"]
             if "scenarios" in assessment:
+                # Kept as dicts until accessed, see ScenarioList
                 for scenario in assessment["scenarios"]:
-                    base_scenario = RiskScenario.from_dict(scenario)
-                    self.add_scenario(base_scenario)
+                    self.add_scenario(scenario)
         else:
             self.analysis_object = str()
             self.version = float()
@@ -48,32 +182,116 @@ class RiskAssessment:
             self.scope = str()
             self.owner = str()
 
-    def add_scenario(self, scenario: RiskScenario):
+    @property
+    def portfolio(self) -> Portfolio:
+        """
+        Aggregated annual loss of all scenarios. Built on first access and
+        then kept up to date by add_scenario and update_scenario.
+        """
+        if self._portfolio is None:
+            portfolio = Portfolio()
+            for scenario in self.scenarios:
+                portfolio.add(scenario)
+            self._portfolio = portfolio
+        return self._portfolio
+
+    def add_scenario(self, scenario: Union[RiskScenario, dict]):
         self.scenarios.append(scenario)
-        risk = scenario.risk
-        if isinstance(risk, HybridRisk):
-            if risk.qualitative.overall_risk not in self.summary:
-                self.summary[risk.qualitative.overall_risk] = 1
+        if self._portfolio is not None:
+            self._portfolio.add(self.scenarios[-1])
+        overall_risk = _overall_risk(scenario)
+        if overall_risk is not None:
+            if overall_risk not in self.summary:
+                self.summary[overall_risk] = 1
             else:
-                self.summary[risk.qualitative.overall_risk] += 1
+                self.summary[overall_risk] += 1
 
     def update_scenario(self, index: int, scenario: RiskScenario):
-        old_scenario = self.scenarios[index]
-        risk = old_scenario.risk
-        if isinstance(risk, HybridRisk):
-            self.summary[risk.qualitative.overall_risk] -= 1
+        overall_risk = _overall_risk(self.scenarios.raw(index))
+        if overall_risk is not None:
+            self.summary[overall_risk] -= 1
         self.scenarios[index] = scenario
-        risk = scenario.risk
-        if isinstance(risk, HybridRisk):
-            if self.summary.get(risk.qualitative.overall_risk):
-                self.summary[risk.qualitative.overall_risk] += 1
+        if self._portfolio is not None:
+            self._portfolio.replace(index, scenario)
+        overall_risk = _overall_risk(scenario)
+        if overall_risk is not None:
+            if self.summary.get(overall_risk):
+                self.summary[overall_risk] += 1
             else:
-                self.summary[risk.qualitative.overall_risk] = 1
+                self.summary[overall_risk] = 1
+
+    def recompute_all(
+        self,
+        mappings=None,
+        seed=None,
+        workers: int = None,
+        samples: int = simulation.DEFAULT_SAMPLES,
+        keep_samples: bool = False,
+    ) -> dict:
+        """
+        Recalculate the risk of every scenario in a process pool.
+
+        Every scenario gets its own stream spawned from seed, so the result
+        does not depend on the number of workers. mappings replaces the
+        qualitative scale of all scenarios, default is to keep their own.
+        Returns the updated summary.
+        """
+        streams = numpy.random.SeedSequence(seed).spawn(len(self.scenarios))
+        indices, jobs = [], []
+        for index, (scenario, stream) in enumerate(zip(self.scenarios, streams)):
+            values = _scenario_values(scenario)
+            if values is None:
+                continue
+            indices.append(index)
+            jobs.append(
+                (
+                    values,
+                    float(scenario.risk.quantitative.budget),
+                    samples,
+                    stream,
+                    keep_samples,
+                )
+            )
+        workers = min(workers or os.cpu_count() or 1, max(1, len(jobs)))
+        if workers > 1:
+            chunksize = max(1, len(jobs) // (workers * 4))
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(_recompute, jobs, chunksize=chunksize))
+        else:
+            results = [_recompute(job) for job in jobs]
+
+        for index, result in zip(indices, results):
+            scenario = self.scenarios[index]
+            old = scenario.risk
+            scenario.risk = simulation.hybrid_risk(
+                result,
+                0,
+                currency=old.quantitative.currency,
+                mappings=mappings if mappings is not None else old.qualitative.mappings,
+            )
+        self.summary = dict()
+        simulated = set(indices)
+        for index, scenario in enumerate(self.scenarios):
+            if index not in simulated and mappings is not None:
+                # Kept risk, only the qualitative scale is new. Risks are
+                # values, replace it instead of changing it in place
+                risk = copy.copy(scenario.risk)
+                quantitative = risk.quantitative
+                risk.qualitative = simulation.qualitative(
+                    quantitative.threat_event_frequency.probable,
+                    quantitative.vuln_score.probable,
+                    quantitative.loss_magnitude.probable,
+                    mappings,
+                )
+                scenario.risk = risk
+            overall_risk = scenario.risk.qualitative.overall_risk
+            self.summary[overall_risk] = self.summary.get(overall_risk, 0) + 1
+        # Every risk is new, the portfolio is built again on next access
+        self._portfolio = None
+        return self.summary
 
     def to_dict(self):
-        scenarios_as_dicts = []
-        for scenario in self.scenarios:
-            scenarios_as_dicts.append(scenario.to_dict())
+        scenarios_as_dicts = self.scenarios.to_dicts()
         return {
             "analysis_object": self.analysis_object,
             "version": self.version,
@@ -84,24 +302,24 @@ class RiskAssessment:
             "summary": self.summary,
         }
 
-    def __hash__(self):
-        scenario_hash = 0
-        for scenario in self.scenarios:
-            scenario_hash += scenario.__hash__()
-        return hash(
-            (
-                self.analysis_object,
-                self.version,
-                self.date,
-                self.scope,
-                self.owner,
-                scenario_hash,
-                freeze(self.summary),
-            )
+    def digest(self) -> bytes:
+        """Content digest built from the cached digests of the scenarios."""
+        return content_digest(
+            "RiskAssessment",
+            self.analysis_object,
+            self.version,
+            self.date,
+            self.scope,
+            self.owner,
+            self.scenarios.digest(),
+            self.summary,
         )
 
+    def __hash__(self):
+        return hash(self.digest())
+
     def __eq__(self, value):
-        return self.__hash__() == value.__hash__()
+        return isinstance(value, RiskAssessment) and self.digest() == value.digest()
 
     def __str__(self):
         scenarios = str()
@@ -0,0 +1,158 @@
+#
+# MIT License
+#
+# Copyright (c) 2025 Martin Vesterlund
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+
+"""
+Portfolio loss for a whole assessment.
+
+The annual loss samples of all scenarios are summed element-wise into one
+distribution. Scenarios are added and replaced incrementally, the total is
+never summed again from scratch. Scenarios without kept samples get them
+drawn from their ALE statistics, the same way HybridRisk draws them, with a
+seed derived from the scenario and its position so the result is
+reproducible and identical scenarios are not perfectly correlated.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy
+from otyg_risk_base.hybrid import HybridRisk
+
+from riskcalculator import simulation
+from riskcalculator.scenario import RiskScenario
+
+PERCENTILES = (50, 90, 99)
+
+
+def loss_samples(scenario: RiskScenario, samples: int, index: int = 0) -> numpy.ndarray:
+    """
+    Annual loss samples of a scenario, drawn again if they were not kept.
+    index is the position of the scenario in the portfolio.
+    """
+    risk = scenario.risk
+    if not isinstance(risk, HybridRisk):
+        return numpy.zeros(samples)
+    quantitative = risk.quantitative
+    kept = getattr(
+        quantitative.annual_loss_expectancy, "_MonteCarloSimulation__samples", None
+    )
+    if kept is not None and numpy.shape(kept) == (samples,):
+        return numpy.asarray(kept, dtype=numpy.float64)
+    ale = quantitative.ale
+    seed = numpy.random.SeedSequence(
+        [index, int.from_bytes(scenario.digest()[:16], "little")]
+    )
+    uniform = numpy.random.default_rng(seed).random(samples)
+    ranges = simulation.as_ranges([(ale.min, ale.probable, ale.max)])
+    return simulation.loglogistic(ranges, uniform)[0]
+
+
+@dataclass
+class _Entry:
+    name: str
+    category: str
+    currency: str
+    losses: numpy.ndarray
+
+
+class Portfolio:
+    def __init__(self, samples: int = simulation.DEFAULT_SAMPLES):
+        self.samples = samples
+        self.total = numpy.zeros(samples)
+        self._entries: list[_Entry] = []
+        self._report: Optional[dict] = None
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _entry(self, scenario: RiskScenario, index: int) -> _Entry:
+        risk = scenario.risk
+        currency = risk.quantitative.currency if isinstance(risk, HybridRisk) else ""
+        return _Entry(
+            name=scenario.name,
+            category=scenario.category,
+            currency=currency,
+            losses=loss_samples(scenario, self.samples, index),
+        )
+
+    def add(self, scenario: RiskScenario) -> None:
+        entry = self._entry(scenario, len(self._entries))
+        self.total += entry.losses
+        self._entries.append(entry)
+        self._report = None
+
+    def replace(self, index: int, scenario: RiskScenario) -> None:
+        entry = self._entry(scenario, index)
+        self.total += entry.losses - self._entries[index].losses
+        self._entries[index] = entry
+        self._report = None
+
+    def report(self) -> dict:
+        """
+        Mean and percentiles of the total annual loss, with the contribution
+        of every scenario and category. "mean" contributions add up to the
+        total mean, "tail" contributions to the mean loss of the worst 10 %.
+        """
+        if self._report is not None:
+            return self._report
+        total = self.total
+        p50, p90, p99 = numpy.percentile(total, PERCENTILES)
+        tail = total >= p90
+        total_mean = float(total.mean())
+        scenarios = []
+        categories: dict[str, dict] = {}
+        for index, entry in enumerate(self._entries):
+            mean = float(entry.losses.mean())
+            tail_mean = float(entry.losses[tail].mean()) if tail.any() else 0.0
+            scenarios.append(
+                {
+                    "index": index,
+                    "name": entry.name,
+                    "category": entry.category,
+                    "mean": mean,
+                    "share": mean / total_mean if total_mean else 0.0,
+                    "tail": tail_mean,
+                }
+            )
+            category = categories.setdefault(
+                entry.category, {"mean": 0.0, "share": 0.0, "tail": 0.0, "count": 0}
+            )
+            category["mean"] += mean
+            category["share"] += scenarios[-1]["share"]
+            category["tail"] += tail_mean
+            category["count"] += 1
+        currencies = sorted({e.currency for e in self._entries if e.currency})
+        self._report = {
+            "currency": currencies[0] if len(currencies) == 1 else currencies,
+            "samples": self.samples,
+            "mean": total_mean,
+            "p50": float(p50),
+            "p90": float(p90),
+            "p99": float(p99),
+            "scenarios": scenarios,
+            "categories": categories,
+        }
+        return self._report
@@ -0,0 +1,82 @@
+import json
+import random
+import unittest
+from pathlib import Path
+
+import numpy
+from otyg_risk_base.montecarlo import MonteCarloRange
+
+from riskcalculator.aggregation import (
+    FACTORS,
+    aggregate,
+    aggregate_decimal,
+    to_range,
+    weights_array,
+)
+from riskcalculator.questionaire import Questionaire
+
+QUESTIONAIRES_DIR = Path(__file__).parent.parent / "data" / "questionaires"
+
+
+class TestAggregation(unittest.TestCase):
+    def assertEquivalent(self, weights):
+        expected = aggregate_decimal(weights)
+        actual = aggregate(weights_array(weights))
+        for name in FACTORS:
+            numpy.testing.assert_allclose(
+                list(to_range(actual[name]).to_dict().values()),
+                list(expected[name].to_dict().values()),
+                rtol=1e-12,
+                err_msg=name,
+            )
+
+    def test_empty(self):
+        self.assertEquivalent([])
+
+    def test_equivalence_with_shipped_questionaires(self):
+        rng = random.Random(1)
+        for path in sorted(QUESTIONAIRES_DIR.glob("*.json")):
+            raw = json.loads(path.read_text(encoding="utf-8"))
+            for dim in ("tef", "vuln", "lm"):
+                questionaire = Questionaire.from_dict(raw[dim])
+                for _ in range(25):
+                    for question in questionaire.questions:
+                        question.set_answer(rng.randrange(len(question.alternatives)))
+                    self.assertEquivalent(
+                        [q.answer.weight for q in questionaire.questions]
+                    )
+
+    def test_unanswered_and_ties(self):
+        weights = [
+            MonteCarloRange(),
+            MonteCarloRange(min=1, probable=2, max=3),
+            MonteCarloRange(min=2, probable=3, max=4),
+        ]
+        self.assertEquivalent(weights)
+
+    def test_batch_matches_single(self):
+        rng = numpy.random.default_rng(7)
+        low = rng.uniform(0, 1, size=(4, 6))
+        weights = numpy.stack((low, low + 0.5, low + 1), axis=-1)
+        batch = aggregate(weights)
+        for i in range(weights.shape[0]):
+            single = aggregate(weights[i])
+            for name in FACTORS:
+                numpy.testing.assert_allclose(batch[name][i], single[name])
+
+    def test_exact_aggregation_mode(self):
+        raw = json.loads((QUESTIONAIRES_DIR / "default.json").read_text("utf-8"))
+        questionaire = Questionaire.from_dict(raw["lm"])
+        for question in questionaire.questions:
+            question.set_answer(1)
+        vectorized = questionaire.to_dict()
+        try:
+            Questionaire.exact_aggregation = True
+            exact = questionaire.to_dict()
+        finally:
+            Questionaire.exact_aggregation = False
+        self.assertEqual(vectorized, exact)
+
+
+if __name__ == "__main__":
+    unittest.main()
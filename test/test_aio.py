@@ -0,0 +1,64 @@
+import asyncio
+import threading
+import time
+import unittest
+
+from filesystem.aio import IO_WORKERS, aio, run_io
+
+
+class _Repo:
+    folder = "data"
+
+    def load(self, item_id):
+        if item_id == "saknas":
+            raise FileNotFoundError(item_id)
+        return {"id": item_id, "thread": threading.current_thread().name}
+
+    def slow(self):
+        time.sleep(0.2)
+        return "klar"
+
+
+class TestAsyncRepository(unittest.TestCase):
+    def test_methods_run_in_io_pool(self):
+        repo = aio(_Repo())
+        result = asyncio.run(repo.load("a"))
+        self.assertEqual(result["id"], "a")
+        self.assertTrue(result["thread"].startswith("repo-io"))
+        self.assertEqual(repo.folder, "data")
+
+    def test_errors_propagate(self):
+        with self.assertRaises(FileNotFoundError):
+            asyncio.run(aio(_Repo()).load("saknas"))
+
+    def test_loop_is_not_blocked(self):
+        async def main():
+            ticks = 0
+
+            async def ticker():
+                nonlocal ticks
+                while True:
+                    await asyncio.sleep(0.01)
+                    ticks += 1
+
+            task = asyncio.create_task(ticker())
+            started = time.perf_counter()
+            results = await asyncio.gather(
+                *(aio(_Repo()).slow() for _ in range(min(IO_WORKERS, 4)))
+            )
+            elapsed = time.perf_counter() - started
+            task.cancel()
+            return results, elapsed, ticks
+
+        results, elapsed, ticks = asyncio.run(main())
+        self.assertEqual(set(results), {"klar"})
+        # The slow reads overlap and the loop keeps running meanwhile
+        self.assertLess(elapsed, 0.6)
+        self.assertGreater(ticks, 5)
+
+    def test_run_io_passes_arguments(self):
+        self.assertEqual(asyncio.run(run_io(divmod, 7, 2)), (3, 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
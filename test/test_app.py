@@ -220,6 +220,157 @@ class TestAppScenarioEndpoints(unittest.TestCase):
         self.assertEqual(q["vuln"]["questions"][0]["answer"]["text"], "V1")
         self.assertEqual(q["lm"]["questions"][0]["answer"]["text"], "LM1")
 
+    def test_sensitivity_endpoint_ranks_answer_switches(self):
+        draft_id = self._create_draft()
+        form = {
+            "name": "Scenario 1",
+            "risk_input_mode": "questionnaire",
+            "qset": "default",
+            "budget": "1000",
+            "currency": "SEK",
+            "q_tef_0": "0",
+            "q_vuln_0": "0",
+            "q_lm_0": "0",
+        }
+        r = self.client.post(
+            f"/create/{draft_id}/scenario/save", data=form, follow_redirects=False
+        )
+        self.assertEqual(r.status_code, 303)
+
+        r = self.client.get(
+            "/risk-calc/sensitivity",
+            params={"draft_id": draft_id, "scenario_index": 0, "samples": 2000},
+        )
+        self.assertEqual(r.status_code, 200)
+        result = r.json()
+        self.assertEqual(len(result["variants"]), 3)
+        self.assertEqual(
+            {v["alternative_text"] for v in result["variants"]}, {"TEF1", "V1", "LM1"}
+        )
+
+        r = self.client.get(
+            "/risk-calc/sensitivity",
+            params={"draft_id": draft_id, "scenario_index": 5},
+        )
+        self.assertEqual(r.status_code, 404)
+
+    def test_risk_calc_reports_precision(self):
+        r = self.client.post(
+            "/risk-calc",
+            data={
+                "risk_input_mode": "questionnaire",
+                "qset": "default",
+                "tolerance": "0.02",
+                "q_tef_0": "1",
+                "q_vuln_0": "1",
+                "q_lm_0": "1",
+            },
+        )
+        self.assertEqual(r.status_code, 200)
+        self.assertIn("dragningar", r.text)
+
+    def test_risk_calc_selects_one_option_per_question(self):
+        r = self.client.post(
+            "/risk-calc",
+            data={
+                "risk_input_mode": "questionnaire",
+                "qset": "default",
+                "q_tef_0": "1",
+            },
+        )
+        self.assertEqual(r.status_code, 200)
+        # The default answer shares its text with alternative 0
+        select = r.text.split('name="q_tef_0"', 1)[1].split("</select>", 1)[0]
+        self.assertEqual(select.count("selected"), 1)
+        self.assertIn('<option value="1" selected>', select)
+
+    def test_risk_calc_batch_streams_in_order(self):
+        manual = {
+            "tef": {"min": 1, "probable": 2, "max": 4},
+            "vuln": {"min": 0.1, "probable": 0.3, "max": 0.5},
+            "lm": {"min": 1000, "probable": 5000, "max": 20000},
+        }
+        items = [
+            dict(manual, id="a"),
+            {"id": "b", "qset": "default", "answers": {"tef": [1]}},
+            {"id": "c", "qset": "missing"},
+            {"id": "d", "tef": {"min": 1}},
+            dict(manual, id="e"),
+        ]
+        r = self.client.post("/api/risk-calc/batch", json={"items": items})
+        self.assertEqual(r.status_code, 200)
+        self.assertTrue(r.headers["content-type"].startswith("application/x-ndjson"))
+        lines = [json.loads(line) for line in r.text.splitlines() if line]
+        self.assertEqual([line["index"] for line in lines], [0, 1, 2, 3, 4])
+        self.assertEqual([line["id"] for line in lines], ["a", "b", "c", "d", "e"])
+        for line in (lines[0], lines[1], lines[4]):
+            self.assertIn("result", line)
+            self.assertNotIn("__samples", line["result"])
+        self.assertEqual(lines[0]["result"], lines[4]["result"])
+        self.assertIn("error", lines[2])
+        self.assertIn("error", lines[3])
+
+    def test_index_honors_if_none_match(self):
+        analyses_repo = self.app_module.analyses_repo
+        analysis_id = analyses_repo.save_new(
+            {"analysis_object": "Etag", "version": "1", "scenarios": []}
+        )
+        url = f"/?selected={analysis_id}"
+        r = self.client.get(url)
+        self.assertEqual(r.status_code, 200)
+        etag = r.headers["etag"]
+        self.assertEqual(r.headers["cache-control"], "no-cache")
+
+        r = self.client.get(url, headers={"If-None-Match": f'"other", W/{etag}'})
+        self.assertEqual(r.status_code, 304)
+        self.assertEqual(r.content, b"")
+
+        # Another selection, or a new analysis in the list, is a new page
+        r = self.client.get("/", headers={"If-None-Match": etag})
+        self.assertEqual(r.status_code, 200)
+        listing_etag = r.headers["etag"]
+        analyses_repo.save_new(
+            {"analysis_object": "Etag 2", "version": "1", "scenarios": []}
+        )
+        r = self.client.get("/", headers={"If-None-Match": listing_etag})
+        self.assertEqual(r.status_code, 200)
+        self.assertNotEqual(r.headers["etag"], listing_etag)
+
+    def test_risk_calc_batch_rejects_non_list(self):
+        r = self.client.post("/api/risk-calc/batch", json={"items": "nope"})
+        self.assertEqual(r.status_code, 400)
+
+    def test_export_pdf_is_cached(self):
+        analyses_repo = self.app_module.analyses_repo
+        report_cache = self.app_module.report_cache
+        analysis_id = analyses_repo.save_new(
+            {"analysis_object": "Board pack", "version": "1", "scenarios": []}
+        )
+        url = f"/analysis/{analysis_id}/export/pdf"
+
+        misses = report_cache.misses
+        r = self.client.get(url)
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(r.headers["content-type"], "application/pdf")
+        self.assertIn("Board_pack", r.headers["content-disposition"])
+        self.assertTrue(r.content.startswith(b"%PDF"))
+        self.assertEqual(int(r.headers["content-length"]), len(r.content))
+        self.assertEqual(report_cache.misses, misses + 1)
+
+        hits = report_cache.hits
+        again = self.client.get(url)
+        self.assertEqual(again.content, r.content)
+        self.assertEqual(report_cache.hits, hits + 1)
+        # The browser's copy is revalidated without building the report
+        etag = r.headers["etag"]
+        hits = report_cache.hits
+        r = self.client.get(url, headers={"If-None-Match": etag})
+        self.assertEqual(r.status_code, 304)
+        self.assertEqual(r.headers["etag"], etag)
+        self.assertEqual(report_cache.hits, hits)
+        # Only the finished report is left in the cache folder
+        self.assertEqual([p.suffix for p in report_cache.folder.iterdir()], [".pdf"])
+
 
 if __name__ == "__main__":
     unittest.main()
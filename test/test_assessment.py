@@ -76,6 +76,115 @@ class TestAssessment(unittest.TestCase):
         assessment_b = RiskAssessment(assessment=assessment.to_dict())
         self.assertTrue(assessment == assessment_b)
 
+    def test_recompute_all_is_independent_of_workers(self):
+        assessment_dict = {
+            "analysis_object": "foo",
+            "version": 1.0,
+            "date": "2026-02-02",
+            "scope": "Allt",
+            "owner": "Jag",
+        }
+        scenarios = [RiskScenario(self.SCENARIO_PARAMETERS).to_dict() for _ in range(3)]
+        results = []
+        for workers in (1, 2):
+            assessment = RiskAssessment(assessment=assessment_dict)
+            for scenario in scenarios:
+                assessment.add_scenario(RiskScenario.from_dict(scenario))
+            summary = assessment.recompute_all(seed=7, workers=workers, samples=2000)
+            self.assertEqual(sum(summary.values()), 3)
+            results.append(
+                [
+                    s.risk.quantitative.annual_loss_expectancy.p90
+                    for s in assessment.scenarios
+                ]
+            )
+        self.assertEqual(results[0], results[1])
+        # Every scenario has its own stream
+        self.assertEqual(len(set(results[0])), 3)
+
+    def test_recompute_does_not_drift(self):
+        assessment_dict = {
+            "analysis_object": "foo",
+            "version": 1.0,
+            "date": "2026-02-02",
+            "scope": "Allt",
+            "owner": "Jag",
+        }
+        manual = RiskScenario(self.SCENARIO_PARAMETERS).to_dict()
+        # A stored scenario from before the input ranges were kept
+        legacy = {k: v for k, v in manual.items() if k != "inputs"}
+        self.assertIn("inputs", manual)
+
+        def loss_magnitude(assessment):
+            return [
+                (lm.min, lm.probable, lm.max, lm.p90)
+                for lm in (
+                    s.risk.quantitative.loss_magnitude for s in assessment.scenarios
+                )
+            ]
+
+        assessment = RiskAssessment(assessment=dict(assessment_dict))
+        assessment.add_scenario(RiskScenario.from_dict(manual))
+        assessment.add_scenario(RiskScenario.from_dict(legacy))
+        kept = loss_magnitude(assessment)[1]
+        assessment.recompute_all(seed=7, workers=1, samples=2000)
+        first = loss_magnitude(assessment)
+        # Simulated again from what was saved, not from the last result
+        assessment = RiskAssessment(assessment=assessment.to_dict())
+        assessment.recompute_all(seed=7, workers=1, samples=2000)
+        self.assertEqual(loss_magnitude(assessment), first)
+        self.assertEqual(first[1], kept)
+
+    def test_scenarios_are_hydrated_on_access(self):
+        stored = RiskScenario(self.SCENARIO_PARAMETERS).to_dict()
+        assessment_dict = {
+            "analysis_object": "foo",
+            "version": 1.0,
+            "date": "2026-02-02",
+            "scope": "Allt",
+            "owner": "Jag",
+            "scenarios": [stored, dict(stored), dict(stored)],
+        }
+        assessment = RiskAssessment(assessment=assessment_dict)
+        self.assertEqual(assessment.scenarios.hydrated(), 0)
+        self.assertEqual(sum(assessment.summary.values()), 3)
+
+        replacement = RiskScenario(self.SCENARIO_PARAMETERS)
+        assessment.update_scenario(1, replacement)
+        self.assertEqual(assessment.scenarios.hydrated(), 1)
+        self.assertEqual(sum(assessment.summary.values()), 3)
+
+        scenarios = assessment.to_dict()["scenarios"]
+        self.assertIs(scenarios[0], stored)
+        self.assertEqual(scenarios[1], replacement.to_dict())
+        self.assertIsInstance(assessment.scenarios[2], RiskScenario)
+        self.assertEqual(assessment.scenarios.hydrated(), 2)
+
+    def test_digest_does_not_hydrate(self):
+        stored = RiskScenario(self.SCENARIO_PARAMETERS).to_dict()
+        assessment_dict = {
+            "analysis_object": "foo",
+            "version": 1.0,
+            "date": "2026-02-02",
+            "scope": "Allt",
+            "owner": "Jag",
+            "scenarios": [stored, dict(stored)],
+        }
+        assessment = RiskAssessment(assessment=assessment_dict)
+        digest = assessment.digest()
+        self.assertEqual(assessment.scenarios.hydrated(), 0)
+        self.assertIs(assessment.scenarios.digest(), assessment.scenarios.digest())
+
+        hydrated = RiskAssessment(assessment=assessment_dict)
+        list(hydrated.scenarios)
+        self.assertEqual(hydrated.scenarios.hydrated(), 2)
+        self.assertEqual(hydrated.digest(), digest)
+
+        hydrated.scenarios[0].name = "Eld"
+        self.assertNotEqual(hydrated.digest(), digest)
+        assessment.scenarios[1] = RiskScenario.from_dict(dict(stored, name="Eld"))
+        self.assertNotEqual(assessment.digest(), digest)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,97 @@
+import json
+import unittest
+from pathlib import Path
+
+import numpy
+from otyg_risk_base.montecarlo import MonteCarloRange
+
+from riskcalculator import simulation
+from riskcalculator.batch import evaluate_batch, factor_values
+from riskcalculator.template import UNANSWERED, QuestionairesTemplate
+
+QUESTIONAIRES_DIR = Path(__file__).parent.parent / "data" / "questionaires"
+
+
+class TestBatch(unittest.TestCase):
+    def setUp(self):
+        raw = json.loads((QUESTIONAIRES_DIR / "default.json").read_text("utf-8"))
+        self.template = QuestionairesTemplate.from_dict("default", raw)
+        rng = numpy.random.default_rng(3)
+        self.answers = {
+            dim: numpy.stack(
+                [
+                    rng.integers(UNANSWERED, self.template.get(dim).alternative_counts)
+                    for _ in range(6)
+                ]
+            )
+            for dim in ("tef", "vuln", "lm")
+        }
+
+    def test_factor_values_match_template(self):
+        values = {
+            name: simulation.normalize(ranges)
+            for name, ranges in factor_values(self.template, self.answers).items()
+        }
+        for i in range(6):
+            row = {dim: self.answers[dim][i] for dim in self.answers}
+            expected = self.template.calculate_values(row)
+            for name, value in expected.items():
+                numpy.testing.assert_allclose(
+                    values[name][i],
+                    [float(value.min), float(value.probable), float(value.max)],
+                )
+
+    def test_flat_answer_matrix(self):
+        flat = numpy.hstack([self.answers[dim] for dim in ("tef", "vuln", "lm")])
+        a = factor_values(self.template, flat)
+        b = factor_values(self.template, self.answers)
+        for name in a:
+            numpy.testing.assert_array_equal(a[name], b[name])
+
+    def test_batch_matches_single_evaluation(self):
+        batch = evaluate_batch(self.template, self.answers, samples=2000, seed=11)
+        self.assertEqual(len(batch.overall_risks()), 6)
+        for i in (0, 5):
+            row = {dim: self.answers[dim][i : i + 1] for dim in self.answers}
+            single = evaluate_batch(self.template, row, samples=2000, seed=11)
+            for name in simulation.SIMULATED:
+                numpy.testing.assert_allclose(
+                    batch.simulation.stats[name][i], single.simulation.stats[name][0]
+                )
+            self.assertEqual(
+                batch.risk(i).qualitative.overall_risk,
+                single.risk(0).qualitative.overall_risk,
+            )
+
+    def test_risk_serializes_like_hybrid_risk(self):
+        batch = evaluate_batch(self.template, self.answers, samples=1000, seed=1)
+        risk = batch.risk(2).to_dict()
+        self.assertEqual(
+            set(risk["quantitative"]),
+            {
+                "threat_event_frequency",
+                "vulnerability",
+                "loss_event_frequency",
+                "loss_magnitude",
+                "ale",
+                "annual_loss_expectancy",
+                "budget",
+                "currency",
+            },
+        )
+        ale = risk["quantitative"]["annual_loss_expectancy"]
+        self.assertLessEqual(ale["min"], ale["p90"])
+        self.assertLessEqual(ale["p90"], ale["max"])
+
+    def test_normalize_matches_montecarlorange(self):
+        cases = [(0, 0, 0), (1, 1, 1), (0.5, 2, 4), (0, 0.2, 1), (2, 3, 2)]
+        for case in cases:
+            expected = MonteCarloRange(min=case[0], probable=case[1], max=case[2])
+            numpy.testing.assert_allclose(
+                simulation.normalize(numpy.array([case], dtype=float))[0],
+                [float(expected.min), float(expected.probable), float(expected.max)],
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,125 @@
+import tempfile
+import unittest
+from decimal import Decimal
+from pathlib import Path
+
+import numpy
+from otyg_risk_base.montecarlo import MonteCarloRange
+
+from riskcalculator.cache import RiskCache, digest
+
+
+def _values(**overrides):
+    values = {
+        "threat_event_frequency": {"min": "1", "probable": "2.5", "max": "4"},
+        "vulnerability": {"min": "0.1", "probable": "0.2", "max": "0.3"},
+        "loss_magnitude": {"min": "0.01", "probable": "0.02", "max": "0.05"},
+        "budget": Decimal("1000000"),
+        "currency": "SEK",
+    }
+    values.update(overrides)
+    return values
+
+
+class TestRiskCache(unittest.TestCase):
+    def test_digest_is_canonical(self):
+        a = digest(_values(), 1000, seed=1)
+        b = digest(
+            _values(
+                threat_event_frequency=MonteCarloRange(
+                    min=Decimal(1), probable=Decimal("2.5"), max=Decimal(4)
+                ),
+                budget=1000000.0,
+            ),
+            1000,
+            seed=1,
+        )
+        self.assertEqual(a, b)
+        self.assertNotEqual(a, digest(_values(), 1000, seed=2))
+        self.assertNotEqual(a, digest(_values(), 2000, seed=1))
+        self.assertNotEqual(a, digest(_values(currency="EUR"), 1000, seed=1))
+
+    def test_memory_tier_returns_cached_result(self):
+        cache = RiskCache()
+        first = cache.evaluate(_values(), samples=1000, seed=1)
+        second = cache.evaluate(_values(), samples=1000, seed=1)
+        self.assertIs(first, second)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_size_based_eviction(self):
+        # Room for about two results with 1000 kept samples per simulation
+        cache = RiskCache(max_bytes=2 * (4 * 8000 + 4096))
+        for seed in range(3):
+            cache.evaluate(_values(), samples=1000, seed=seed)
+        self.assertEqual(len(cache), 2)
+        cache.evaluate(_values(), samples=1000, seed=0)
+        self.assertEqual(cache.misses, 4)
+
+    def test_disk_tier_survives_restart(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            folder = Path(tmp) / "cache"
+            first = RiskCache(folder=folder).evaluate(_values(), samples=1000, seed=1)
+            cache = RiskCache(folder=folder)
+            second = cache.evaluate(_values(), samples=1000, seed=1)
+            self.assertEqual(cache.hits, 1)
+            self.assertEqual(
+                first.to_dict()["qualitative"], second.to_dict()["qualitative"]
+            )
+            self.assertEqual(
+                first.quantitative.annual_loss_expectancy.p90,
+                second.quantitative.annual_loss_expectancy.p90,
+            )
+
+    def test_disk_tier_is_pruned(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            folder = Path(tmp)
+            cache = RiskCache(folder=folder, max_disk_bytes=1)
+            cache.evaluate(_values(), samples=1000, seed=1)
+            cache.evaluate(_values(), samples=1000, seed=2)
+            self.assertLessEqual(len(list(folder.glob("*.npz"))), 1)
+
+    def test_disk_tier_round_trip(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            folder = Path(tmp)
+            first = RiskCache(folder=folder).evaluate(
+                _values(), samples=1000, seed=1, tolerance=0.05
+            )
+            cache = RiskCache(folder=folder)
+            second = cache.evaluate(_values(), samples=1000, seed=1, tolerance=0.05)
+            self.assertEqual(cache.hits, 1)
+            self.assertEqual(
+                first.to_dict()["qualitative"], second.to_dict()["qualitative"]
+            )
+            self.assertEqual(first.convergence, second.convergence)
+            a, b = first.quantitative, second.quantitative
+            self.assertEqual(a.threat_event_frequency.max, b.threat_event_frequency.max)
+            self.assertEqual(a.budget, b.budget)
+            for name in ("loss_event_frequency", "annual_loss_expectancy"):
+                for stat in ("min", "probable", "max", "p90", "p75"):
+                    self.assertEqual(
+                        getattr(getattr(a, name), stat), getattr(getattr(b, name), stat)
+                    )
+                numpy.testing.assert_array_equal(
+                    getattr(a, name)._MonteCarloSimulation__samples,
+                    getattr(b, name)._MonteCarloSimulation__samples,
+                )
+            # The files are plain arrays, nothing is unpickled
+            (path,) = folder.glob("*.npz")
+            with numpy.load(path, allow_pickle=False) as arrays:
+                self.assertIn("samples_ale", arrays.files)
+
+    def test_disk_tier_ignores_pickles(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            folder = Path(tmp)
+            key = digest(_values(), 1000, seed=1)
+            # A planted pickle is neither loaded nor kept
+            (folder / f"{key}.pickle").write_bytes(b"not loaded")
+            (folder / f"{key}.npz").write_bytes(b"not an npz file")
+            cache = RiskCache(folder=folder)
+            cache.evaluate(_values(), samples=1000, seed=1)
+            self.assertEqual(cache.misses, 1)
+            self.assertEqual([p.suffix for p in folder.iterdir()], [".npz"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+import json
+import tempfile
+import unittest
+from decimal import Decimal
+from pathlib import Path
+
+import numpy
+from otyg_risk_base.montecarlo import MonteCarloRange
+
+from filesystem.codec import CODECS, get_codec, orjson
+from filesystem.repo import DraftRepository
+from riskcalculator.scenario import RiskScenario
+from riskcalculator.util import ComplexEncoder
+
+
+def _names():
+    return [name for name in CODECS if name != "orjson" or orjson is not None]
+
+
+class TestCodec(unittest.TestCase):
+    def test_same_document_for_every_codec(self):
+        scenario = RiskScenario(
+            {
+                "name": "Vatten",
+                "threat_event_frequency": {"min": 1, "probable": 2, "max": 4},
+                "vulnerability": {"min": 0.1, "probable": 0.2, "max": 0.4},
+                "loss_magnitude": {"min": 0.01, "probable": 0.02, "max": 0.05},
+                "budget": 10000,
+                "currency": "SEK",
+            }
+        )
+        document = {
+            "scenario": scenario,
+            "decimal": Decimal("0.5"),
+            "range": MonteCarloRange(min=1, probable=2, max=3),
+            "array": numpy.arange(3.0),
+            "scalar": numpy.float32(1.5),
+            "count": numpy.int64(3),
+        }
+        expected = json.loads(
+            json.dumps(
+                {
+                    **document,
+                    "decimal": 0.5,
+                    "scalar": 1.5,
+                    "count": 3,
+                },
+                cls=ComplexEncoder,
+            )
+        )
+        for name in _names():
+            with self.subTest(codec=name):
+                codec = get_codec(name)
+                data = codec.dumps(document)
+                self.assertIsInstance(data, bytes)
+                self.assertEqual(codec.loads(data), expected)
+                self.assertEqual(b"\n" in data, not codec.compact)
+
+    def test_reads_non_finite_numbers(self):
+        for name in _names():
+            with self.subTest(codec=name):
+                self.assertTrue(numpy.isnan(get_codec(name).loads(b'{"a": NaN}')["a"]))
+
+    def test_unknown_codec(self):
+        with self.assertRaises(ValueError):
+            get_codec("xml")
+
+    def test_pretty_drafts_keep_a_line_journal(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            repo = DraftRepository(Path(tmp), codec=get_codec("pretty"))
+            draft_id = repo.create()
+            repo.add_scenario(draft_id, {"name": "a\nb"})
+            self.assertIn(b"\n  ", repo._path(draft_id).read_bytes())
+            self.assertEqual(
+                len(repo._journal_path(draft_id).read_bytes().splitlines()), 2
+            )
+            self.assertEqual(
+                DraftRepository(Path(tmp)).load(draft_id)["scenarios"],
+                [{"name": "a\nb"}],
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+import asyncio
+import time
+import unittest
+
+from riskcalculator.compute import (
+    ComputeBusy,
+    ComputeCancelled,
+    ComputeExecutor,
+    ComputeTimeout,
+    in_worker,
+)
+
+
+class TestComputeExecutor(unittest.TestCase):
+    def test_runs_in_worker_process(self):
+        executor = ComputeExecutor(workers=1)
+        try:
+            self.assertEqual(asyncio.run(executor.run(pow, 2, 10)), 1024)
+        finally:
+            executor.shutdown()
+
+    def test_worker_knows_it_is_pooled(self):
+        # Jobs use one thread each in the pool, the pool uses the cores
+        executor = ComputeExecutor(workers=1)
+        try:
+            self.assertTrue(asyncio.run(executor.run(in_worker)))
+            self.assertFalse(in_worker())
+        finally:
+            executor.shutdown()
+
+    def test_queue_is_bounded(self):
+        executor = ComputeExecutor(workers=0, max_pending=1)
+        self.assertEqual(executor.capacity, 2)
+
+        async def main():
+            jobs = [
+                asyncio.ensure_future(executor.run(time.sleep, 0.2)) for _ in range(2)
+            ]
+            await asyncio.sleep(0.01)
+            with self.assertRaises(ComputeBusy):
+                await executor.run(time.sleep, 0)
+            await asyncio.gather(*jobs)
+            # Slots are released when the jobs finish
+            await executor.run(time.sleep, 0)
+
+        asyncio.run(main())
+        executor.shutdown()
+
+    def test_wait_for_slot(self):
+        executor = ComputeExecutor(workers=0, max_pending=0, poll_interval=0.01)
+
+        async def main():
+            first = asyncio.ensure_future(executor.run(time.sleep, 0.1))
+            await asyncio.sleep(0.01)
+            # A full pool is waited out instead of raising ComputeBusy
+            self.assertEqual(await executor.run(pow, 2, 3, wait=True), 8)
+            await first
+
+        asyncio.run(main())
+        executor.shutdown()
+
+    def test_timeout(self):
+        executor = ComputeExecutor(workers=0, max_pending=1, timeout=0.05)
+
+        async def main():
+            with self.assertRaises(ComputeTimeout):
+                await executor.run(time.sleep, 0.3)
+            # The running job keeps its slot until it is done
+            self.assertEqual(executor.active, 1)
+            await asyncio.sleep(0.4)
+            self.assertEqual(executor.active, 0)
+
+        asyncio.run(main())
+        executor.shutdown()
+
+    def test_cancelled_when_client_disconnects(self):
+        executor = ComputeExecutor(workers=0, max_pending=1, poll_interval=0.01)
+        polls = []
+
+        async def disconnected():
+            polls.append(1)
+            return len(polls) > 2
+
+        async def main():
+            running = asyncio.ensure_future(executor.run(time.sleep, 0.2))
+            await asyncio.sleep(0.01)
+            with self.assertRaises(ComputeCancelled):
+                # Queued behind the first job, cancelled before it starts
+                await executor.run(time.sleep, 5, cancelled=disconnected)
+            await running
+            self.assertEqual(executor.active, 0)
+
+        started = time.perf_counter()
+        asyncio.run(main())
+        self.assertLess(time.perf_counter() - started, 1)
+        executor.shutdown()
+
+
+if __name__ == "__main__":
+    unittest.main()
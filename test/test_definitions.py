@@ -0,0 +1,101 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from filesystem.questionaires_repo import JsonQuestionairesRepository
+from filesystem.repo import DraftRepository, JsonAnalysisRepository
+from riskcalculator import definitions
+from riskcalculator.definitions import DefinitionStore
+from riskcalculator.questionaire import Questionaires
+
+QUESTIONAIRES = Path(__file__).resolve().parents[1] / "data" / "questionaires"
+
+
+def _answered():
+    qs = JsonQuestionairesRepository(folder=QUESTIONAIRES).load_objects("default")
+    for i, question in enumerate(qs["tef"].questions):
+        question.set_answer(i % len(question.alternatives))
+    # vuln and lm are left partly unanswered
+    qs["vuln"].questions[0].set_answer(1)
+    return Questionaires(tef=qs["tef"], vuln=qs["vuln"], lm=qs["lm"])
+
+
+class TestDefinitions(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.store = DefinitionStore(self.root / "definitions")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_round_trip(self):
+        questionaires = _answered()
+        embedded = questionaires.to_dict()
+        compressed = self.store.compress(dict(embedded, qset="default"))
+        self.assertEqual(set(compressed), {"ref", "answers", "qset"})
+        self.assertTrue(self.store.path(compressed["ref"]).exists())
+        self.assertIsInstance(compressed["answers"]["tef"][1], int)
+        self.assertLess(len(json.dumps(compressed)), len(json.dumps(embedded)) / 4)
+
+        restored = Questionaires.from_dict(json.loads(json.dumps(compressed)))
+        self.assertEqual(restored, questionaires)
+        self.assertEqual(definitions.expand(compressed)["qset"], "default")
+
+    def test_same_set_same_definition(self):
+        a = self.store.compress(_answered().to_dict())
+        other = _answered()
+        other.questionaires["tef"].questions[0].set_answer(2)
+        b = self.store.compress(other.to_dict())
+        self.assertEqual(a["ref"], b["ref"])
+        self.assertNotEqual(a["answers"], b["answers"])
+        self.assertEqual(len(list(self.store.folder.iterdir())), 1)
+
+    def test_read_from_folder(self):
+        compressed = self.store.compress(_answered().to_dict())
+        definitions._definitions.pop(compressed["ref"])
+        self.assertEqual(Questionaires.from_dict(compressed), _answered())
+
+    def test_unknown_reference(self):
+        with self.assertRaises(LookupError):
+            Questionaires.from_dict({"ref": "0" * 32, "answers": {}})
+
+
+class TestRepositories(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_stored_by_reference(self):
+        questionaires = _answered()
+        scenario = {"name": "Vatten", "questionaires": questionaires.to_dict()}
+        drafts = DraftRepository(self.root / "drafts")
+        draft_id = drafts.create()
+        drafts.add_scenario(draft_id, scenario)
+        drafts.compact(draft_id)
+        stored = json.loads((self.root / "drafts" / f"{draft_id}.json").read_text())
+        self.assertIn("ref", stored["scenarios"][0]["questionaires"])
+
+        draft = drafts.load(draft_id)
+        self.assertEqual(
+            Questionaires.from_dict(draft["scenarios"][0]["questionaires"]),
+            questionaires,
+        )
+
+        # Finalizing writes the definition to the analyses folder too
+        analyses = JsonAnalysisRepository(self.root / "analyses")
+        analysis_id = analyses.save_new(draft)
+        ref = stored["scenarios"][0]["questionaires"]["ref"]
+        self.assertTrue(analyses.definitions.path(ref).exists())
+        self.assertEqual(
+            analyses.get_dict(analysis_id)["scenarios"][0]["questionaires"],
+            draft["scenarios"][0]["questionaires"],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
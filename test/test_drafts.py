@@ -0,0 +1,89 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from filesystem.repo import DraftOperations, DraftRepository
+
+
+class TestDraftJournal(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.folder = Path(self.tmp.name)
+        self.repo = DraftRepository(self.folder, compact_after=5)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_operations_are_appended(self):
+        draft_id = self.repo.create()
+        snapshot = self.repo._path(draft_id).read_bytes()
+        self.repo.set_metadata(draft_id, {"owner": "Anna", "bogus": 1})
+        self.repo.add_scenario(draft_id, {"name": "a"})
+        self.repo.add_scenario(draft_id, {"name": "b"})
+        self.repo.update_scenario(draft_id, 0, {"name": "c"})
+        self.assertEqual(self.repo._path(draft_id).read_bytes(), snapshot)
+
+        draft = self.repo.load(draft_id)
+        self.assertEqual(draft["owner"], "Anna")
+        self.assertNotIn("bogus", draft)
+        self.assertEqual(draft["scenarios"], [{"name": "c"}, {"name": "b"}])
+        self.assertEqual(DraftRepository(self.folder).load(draft_id), draft)
+
+    def test_invalid_index_is_rejected(self):
+        draft_id = self.repo.create()
+        self.repo.add_scenario(draft_id, {"name": "a"})
+        with self.assertRaises(IndexError):
+            self.repo.delete_scenario(draft_id, 1)
+        self.repo.delete_scenario(draft_id, 0)
+        with self.assertRaises(IndexError):
+            self.repo.update_scenario(draft_id, 0, {"name": "b"})
+        self.assertEqual(self.repo.load(draft_id)["scenarios"], [])
+
+    def test_compaction(self):
+        draft_id = self.repo.create()
+        for i in range(7):
+            self.repo.add_scenario(draft_id, {"i": i})
+        with self.repo._path(draft_id).open(encoding="utf-8") as f:
+            self.assertEqual(len(json.load(f)["scenarios"]), 5)
+        lines = self.repo._journal_path(draft_id).read_text().splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertEqual(len(self.repo.load(draft_id)["scenarios"]), 7)
+
+    def test_interrupted_writes(self):
+        draft_id = self.repo.create()
+        self.repo.add_scenario(draft_id, {"i": 0})
+        journal = self.repo._journal_path(draft_id)
+        stale = journal.read_bytes()
+        with journal.open("a", encoding="utf-8") as f:
+            f.write('{"op": "add-sc')
+        self.assertEqual(self.repo.load(draft_id)["scenarios"], [{"i": 0}])
+
+        # A journal left behind by an interrupted save is not replayed again
+        self.repo.compact(draft_id)
+        journal.write_bytes(stale)
+        self.assertEqual(self.repo.load(draft_id)["scenarios"], [{"i": 0}])
+
+        # Appending after an outside change starts over from a snapshot
+        self.repo.add_scenario(draft_id, {"i": 1})
+        self.assertEqual(self.repo.load(draft_id)["scenarios"], [{"i": 0}, {"i": 1}])
+
+    def test_delete(self):
+        draft_id = self.repo.create()
+        self.repo.add_scenario(draft_id, {"i": 0})
+        self.repo.delete(draft_id)
+        self.assertEqual(list(self.folder.iterdir()), [])
+        with self.assertRaises(FileNotFoundError):
+            self.repo.add_scenario(draft_id, {"i": 1})
+
+    def test_append_is_required(self):
+        class NoAppend(DraftOperations):
+            pass
+
+        # Fails when created, not on the first edit
+        with self.assertRaises(TypeError):
+            NoAppend()
+
+
+if __name__ == "__main__":
+    unittest.main()
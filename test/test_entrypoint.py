@@ -0,0 +1,88 @@
+import os
+import subprocess
+import sys
+import tempfile
+import textwrap
+import unittest
+from pathlib import Path
+
+from filesystem.paths import APP_NAME
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+class TestEntryPoint(unittest.TestCase):
+    """Spawned compute workers import the entry point, it must stay inert."""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.home = Path(self._tmp.name)
+        self.env = {
+            k: v for k, v in os.environ.items() if k not in ("APPDATA", "PYTHONPATH")
+        }
+        self.env.update(HOME=str(self.home), PYTHONPATH=str(ROOT))
+        self.data = self.home / ".local" / "share" / APP_NAME / "data"
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _run(self, *args, **env):
+        return subprocess.run(
+            [sys.executable, *args],
+            env={**self.env, **env},
+            cwd=self.home,
+            capture_output=True,
+            text=True,
+            timeout=120,
+        )
+
+    def test_worker_import_has_no_side_effects(self):
+        # How a spawned worker imports app.py when it is run as a script
+        code = (
+            "import runpy; "
+            f"runpy.run_path({str(ROOT / 'app.py')!r}, run_name='__mp_main__')"
+        )
+        result = self._run("-c", code, STORAGE_BACKEND="sqlite")
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertFalse((self.data / "actors.json").exists())
+        self.assertFalse((self.data / "riskanalysis.db").exists())
+
+    def test_pool_started_from_script(self):
+        marker = self.home / "imports.txt"
+        script = self.home / "entry.py"
+        script.write_text(
+            textwrap.dedent(
+                f"""
+                import asyncio
+                import multiprocessing
+
+                import app
+
+                with open({str(marker)!r}, "a") as f:
+                    f.write(__name__ + "\\n")
+
+
+                def main():
+                    result = asyncio.run(app.compute_executor.run(pow, 2, 10))
+                    app.compute_executor.shutdown()
+                    print(result)
+
+
+                if __name__ == "__main__":
+                    multiprocessing.freeze_support()
+                    main()
+                """
+            ),
+            encoding="utf-8",
+        )
+        result = self._run(str(script), COMPUTE_WORKERS="1")
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertEqual(result.stdout.strip(), "1024")
+        # The worker re-imported the entry point without running main or
+        # setting up the data folder
+        self.assertEqual(marker.read_text().split(), ["__main__", "__mp_main__"])
+        self.assertFalse((self.data / "actors.json").exists())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+
+from filesystem.actors_repo import JsonActorsRepository
+from filesystem.filecache import FileCache
+from filesystem.repo import DiscreteThresholdsRepository
+
+
+class TestFileCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.cache = FileCache()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _write(self, path, data):
+        path.write_text(json.dumps(data), "utf-8")
+        # Same second on coarse file systems, bump mtime explicitly
+        st = path.stat()
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+
+    def test_revalidated_by_stat(self):
+        path = self.root / "actors.json"
+        self._write(path, {"actors": ["b", "a", " a "]})
+        repo = JsonActorsRepository(path, cache=self.cache)
+        calls = []
+        original = repo._read
+        repo._read = lambda p: calls.append(p) or original(p)
+        self.assertEqual(repo.load(), ["a", "b"])
+        repo.load().append("mutated")
+        self.assertEqual(repo.load(), ["a", "b"])
+        self.assertEqual(len(calls), 1)
+
+        self._write(path, {"actors": ["c"]})
+        self.assertEqual(repo.load(), ["c"])
+        path.unlink()
+        self.assertEqual(repo.load(), [])
+
+    def test_single_build_under_contention(self):
+        path = self.root / "x.json"
+        self._write(path, {})
+        calls = []
+
+        def build(p):
+            calls.append(p)
+            time.sleep(0.05)
+            return object()
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(self.cache.get(path, build)))
+            for _ in range(8)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(len({id(r) for r in results}), 1)
+
+    def test_thresholds_are_compiled_once(self):
+        path = self.root / "discrete_thresholds.json"
+        self._write(path, {"a": {}, "b": {}})
+        repo = DiscreteThresholdsRepository(path, cache=self.cache)
+        self.assertEqual(list(repo.get_set_names()), ["a", "b"])
+        scale = repo.load("a")
+        self.assertIs(repo.load("a"), scale)
+        self.assertIsNot(repo.load("b"), scale)
+        self._write(path, {"a": {}, "b": {}, "c": {}})
+        self.assertIsNot(repo.load("a"), scale)
+        path.unlink()
+        with self.assertRaises(FileNotFoundError):
+            repo.load("a")
+
+
+if __name__ == "__main__":
+    unittest.main()
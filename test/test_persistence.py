@@ -1,12 +1,13 @@
 from __future__ import annotations
 
+import json
 import tempfile
 import shutil
 from pathlib import Path
 import unittest
 
 from filesystem.questionaires_repo import JsonQuestionairesRepository
-from filesystem.repo import DiscreteThresholdsRepository
+from filesystem.repo import DiscreteThresholdsRepository, JsonAnalysisRepository
 from otyg_risk_base.qualitative_scale import QualitativeScale
 
 from riskcalculator.questionaire import Questionaire
@@ -78,3 +79,82 @@ class TestPersistence(unittest.TestCase):
         self.assertIsInstance(
             repo.load_objects(repo.list_sets()[0]).get("tef"), Questionaire
         )
+
+    def test_questionaires_repo_template_is_shared(self):
+        repo = JsonQuestionairesRepository(folder=self.paths.get("questionaires"))
+        set_id = repo.list_sets()[0]
+        template = repo.load_template(set_id)
+        self.assertIs(template, repo.load_template(set_id))
+        self.assertIsInstance(template.instantiate().get("tef"), Questionaire)
+
+    def _analysis(self, title, owner, date, scenarios=0):
+        return {
+            "analysis_object": title,
+            "version": "1",
+            "date": date,
+            "scope": "",
+            "owner": owner,
+            "scenarios": [{} for _ in range(scenarios)],
+            "summary": {},
+        }
+
+    def test_analysis_index(self):
+        folder = self.paths.get("analyses")
+        repo = JsonAnalysisRepository(folder)
+        a = repo.save_new(self._analysis("A", "Anna", "2026-01-01", 2))
+        self.assertEqual([i.analysis_id for i in repo.list()], [a])
+        self.assertTrue(repo.index_path.exists())
+
+        # A file written behind the repository's back is picked up
+        (folder / "b.json").write_text(
+            json.dumps(self._analysis("B", "Bo", "2026-03-01")), encoding="utf-8"
+        )
+        listing = repo.list()
+        self.assertEqual([i.analysis_id for i in listing], ["b", a])
+        self.assertEqual(listing[1].scenario_count, 2)
+
+        # A new repository reads the index instead of the analyses
+        (folder / "b.json").write_text(
+            json.dumps(self._analysis("B2", "Bo", "2026-03-01")), encoding="utf-8"
+        )
+        fresh = JsonAnalysisRepository(folder)
+        self.assertEqual(fresh.list()[0].title, "B2")
+
+        (folder / "b.json").unlink()
+        self.assertEqual([i.analysis_id for i in fresh.list()], [a])
+        fresh.rebuild_index()
+        self.assertEqual(len(fresh.list()), 1)
+
+    def test_analysis_signatures(self):
+        folder = self.paths.get("analyses")
+        repo = JsonAnalysisRepository(folder)
+        empty = repo.listing_signature()
+        a = repo.save_new(self._analysis("A", "Anna", "2026-01-01"))
+        listing, signature = repo.listing_signature(), repo.signature(a)
+        self.assertNotEqual(listing, empty)
+
+        # A new analysis changes the listing but not the existing analysis
+        repo.save_new(self._analysis("B", "Bo", "2026-01-02"))
+        self.assertNotEqual(repo.listing_signature(), listing)
+        self.assertEqual(repo.signature(a), signature)
+        with self.assertRaises(FileNotFoundError):
+            repo.signature("missing")
+
+    def test_analysis_query(self):
+        folder = self.paths.get("analyses")
+        for i in range(7):
+            owner = "Anna" if i % 2 else "Bo"
+            (folder / f"a{i}.json").write_text(
+                json.dumps(self._analysis(f"T{i}", owner, f"2026-01-0{i + 1}")),
+                encoding="utf-8",
+            )
+        repo = JsonAnalysisRepository(folder)
+        page = repo.query(page=2, per_page=3)
+        self.assertEqual((page.total, page.pages), (7, 3))
+        self.assertEqual([i.analysis_id for i in page.items], ["a3", "a2", "a1"])
+
+        page = repo.query(owner="anna", sort="title", descending=False)
+        self.assertEqual([i.title for i in page.items], ["T1", "T3", "T5"])
+
+        page = repo.query(date_from="2026-01-03", date_to="2026-01-05")
+        self.assertEqual(page.total, 3)
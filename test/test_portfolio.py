@@ -0,0 +1,109 @@
+import unittest
+
+import numpy
+
+from riskcalculator.questionaire import Questionaires
+from riskcalculator.scenario import RiskScenario
+from riskcalculator.simulation import evaluate_risk
+from riskregister.assessment import RiskAssessment
+from riskregister.portfolio import loss_samples
+
+
+def _scenario(name, category, tef, seed, samples=5000):
+    risk = evaluate_risk(
+        {
+            "threat_event_frequency": {"min": tef / 2, "probable": tef, "max": tef * 2},
+            "vulnerability": {"min": 0.1, "probable": 0.2, "max": 0.3},
+            "loss_magnitude": {"min": 0.01, "probable": 0.02, "max": 0.05},
+            "budget": 100000,
+            "currency": "SEK",
+        },
+        samples=samples,
+        seed=seed,
+    )
+    return RiskScenario(
+        parameters={
+            "name": name,
+            "category": category,
+            "risk": risk,
+            "questionaires": Questionaires(),
+        }
+    )
+
+
+class TestPortfolio(unittest.TestCase):
+    ASSESSMENT = {
+        "analysis_object": "foo",
+        "version": 1.0,
+        "date": "2026-02-02",
+        "scope": "Allt",
+        "owner": "Jag",
+    }
+
+    def test_incremental_total(self):
+        assessment = RiskAssessment(self.ASSESSMENT)
+        assessment.add_scenario(_scenario("A", "IT", 2, seed=1))
+        portfolio = assessment.portfolio
+        assessment.add_scenario(_scenario("B", "IT", 5, seed=2))
+        assessment.add_scenario(_scenario("C", "Fysisk", 1, seed=3))
+        self.assertIs(portfolio, assessment.portfolio)
+
+        expected = sum(
+            loss_samples(s, portfolio.samples, i)
+            for i, s in enumerate(assessment.scenarios)
+        )
+        numpy.testing.assert_allclose(portfolio.total, expected)
+
+        assessment.update_scenario(1, _scenario("B", "Fysisk", 10, seed=4))
+        expected = sum(
+            loss_samples(s, portfolio.samples, i)
+            for i, s in enumerate(assessment.scenarios)
+        )
+        numpy.testing.assert_allclose(portfolio.total, expected)
+
+    def test_report_contributions(self):
+        assessment = RiskAssessment(self.ASSESSMENT)
+        for i, category in enumerate(("IT", "IT", "Fysisk")):
+            assessment.add_scenario(_scenario(str(i), category, i + 1, seed=i))
+        report = assessment.portfolio.report()
+        self.assertEqual(report["currency"], "SEK")
+        self.assertLessEqual(report["p50"], report["p90"])
+        self.assertLessEqual(report["p90"], report["p99"])
+        self.assertAlmostEqual(
+            sum(s["mean"] for s in report["scenarios"]), report["mean"]
+        )
+        self.assertAlmostEqual(
+            sum(c["share"] for c in report["categories"].values()), 1.0
+        )
+        self.assertEqual(report["categories"]["IT"]["count"], 2)
+        self.assertGreaterEqual(
+            sum(s["tail"] for s in report["scenarios"]), report["p90"]
+        )
+
+    def test_samples_drawn_when_not_kept(self):
+        scenario = _scenario("A", "IT", 2, seed=1, samples=1000)
+        a = loss_samples(scenario, 4000)
+        b = loss_samples(RiskScenario.from_dict(scenario.to_dict()), 4000)
+        self.assertEqual(a.shape, (4000,))
+        numpy.testing.assert_array_equal(a, b)
+        self.assertAlmostEqual(
+            a.mean()
+            / float(scenario.risk.quantitative.annual_loss_expectancy.probable),
+            1.0,
+            delta=0.1,
+        )
+
+    def test_identical_scenarios_not_correlated(self):
+        assessment = RiskAssessment(self.ASSESSMENT)
+        scenario = _scenario("A", "IT", 2, seed=1, samples=1000)
+        assessment.add_scenario(scenario)
+        assessment.add_scenario(RiskScenario.from_dict(scenario.to_dict()))
+        portfolio = assessment.portfolio
+        a = loss_samples(scenario, portfolio.samples, 0)
+        b = loss_samples(scenario, portfolio.samples, 1)
+        self.assertLess(abs(numpy.corrcoef(a, b)[0, 1]), 0.1)
+        numpy.testing.assert_allclose(portfolio.total, a + b)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,3 +1,4 @@
+import pickle
 import unittest
 from otyg_risk_base.montecarlo import MonteCarloRange
 from riskcalculator.questionaire import (
@@ -156,6 +157,134 @@ class TestQuestionaires(unittest.TestCase):
             questionaires == Questionaires.from_dict(questionaires.to_dict())
         )
 
+    def test_factors_cached_until_mutation(self):
+        question = Question(
+            text="Test 1",
+            alternatives=[
+                Alternative(
+                    text="Ja", weight=MonteCarloRange(min=1, probable=2, max=3)
+                ),
+                Alternative(
+                    text="Nej", weight=MonteCarloRange(min=2, probable=4, max=6)
+                ),
+            ],
+        )
+        questionaire = Questionaire(questions=[question])
+        question.set_answer(0)
+        factor_sum = questionaire.factor_sum
+        self.assertIs(factor_sum, questionaire.sum_factor())
+        self.assertIs(factor_sum, questionaire.to_dict() and questionaire.factor_sum)
+
+        question.set_answer(question.get(0))
+        self.assertIs(factor_sum, questionaire.factor_sum)
+
+        question.set_answer(1)
+        self.assertEqual(questionaire.factor_sum.max, 6)
+
+        questionaire.append_question(
+            Question(
+                text="Test 2",
+                alternatives=[Alternative(text="Ja", weight=MonteCarloRange())],
+            )
+        )
+        questionaire.questions[1].set_answer(0)
+        self.assertEqual(questionaire.factor_sum.max, 6)
+        self.assertEqual(questionaire.factor_mean.max, 6)
+
+        question.set_answer(0)
+        self.assertEqual(questionaire.factor_sum.max, 3)
+
+    def test_digest_cached_until_mutation(self):
+        def build():
+            question = Question(
+                text="Test 1",
+                alternatives=[
+                    Alternative(
+                        text="Ja", weight=MonteCarloRange(min=1, probable=2, max=3)
+                    ),
+                    Alternative(
+                        text="Nej", weight=MonteCarloRange(min=2, probable=4, max=6)
+                    ),
+                ],
+            )
+            question.set_answer(0)
+            return Questionaire(factor="tef", questions=[question])
+
+        questionaire = build()
+        digest = questionaire.digest()
+        self.assertIs(digest, questionaire.digest())
+        self.assertEqual(digest, build().digest())
+        self.assertEqual(len({questionaire, build()}), 1)
+
+        questionaire.questions[0].set_answer(1)
+        self.assertNotEqual(digest, questionaire.digest())
+        questionaire.questions[0].set_answer(0)
+        self.assertEqual(digest, questionaire.digest())
+
+        questionaire.questions[0].text = "Test 2"
+        self.assertNotEqual(digest, questionaire.digest())
+        questionaire.questions[0].text = "Test 1"
+        questionaire.calculation = "sum"
+        self.assertNotEqual(digest, questionaire.digest())
+
+    def test_reassigned_questions_invalidate_caches(self):
+        def question():
+            return Question(
+                text="Test",
+                alternatives=[
+                    Alternative(
+                        text="Ja", weight=MonteCarloRange(min=1, probable=2, max=3)
+                    ),
+                    Alternative(
+                        text="Nej", weight=MonteCarloRange(min=2, probable=4, max=6)
+                    ),
+                ],
+            )
+
+        questionaire = Questionaire()
+        replacement = question()
+        replacement.set_answer(0)
+        questionaire.questions = [replacement]
+        digest = questionaire.digest()
+        self.assertEqual(questionaire.factor_sum.max, 3)
+
+        replacement.set_answer(1)
+        self.assertEqual(questionaire.factor_sum.max, 6)
+        self.assertNotEqual(digest, questionaire.digest())
+
+    def test_changed_alternatives_invalidate_factors(self):
+        alternatives = [
+            Alternative(text="Ja", weight=MonteCarloRange(min=1, probable=2, max=3)),
+            Alternative(text="Nej", weight=MonteCarloRange(min=2, probable=4, max=6)),
+        ]
+        question = Question(text="Test", alternatives=alternatives)
+        question.set_answer(0)
+        questionaire = Questionaire(questions=[question])
+        self.assertEqual(questionaire.factor_sum.max, 3)
+
+        alternatives[0].weight = MonteCarloRange(min=1, probable=2, max=5)
+        self.assertEqual(questionaire.factor_sum.max, 5)
+
+        question.alternatives[0] = alternatives[1]
+        question.set_answer(0)
+        self.assertEqual(questionaire.factor_sum.max, 6)
+        alternatives[1].weight = MonteCarloRange(min=2, probable=4, max=7)
+        self.assertEqual(questionaire.factor_sum.max, 7)
+
+        questionaire.questions.append(Question("Test 2", alternatives=[]))
+        questionaire.questions[1].answer = Alternative(
+            text="Kanske", weight=MonteCarloRange(min=1, probable=2, max=3)
+        )
+        self.assertEqual(questionaire.factor_sum.max, 10)
+        del questionaire.questions[0]
+        self.assertEqual(questionaire.factor_sum.max, 3)
+
+        copy = pickle.loads(pickle.dumps(questionaire))
+        self.assertEqual(copy.factor_sum.max, 3)
+        copy.questions[0].answer.weight = MonteCarloRange(min=1, probable=2, max=4)
+        self.assertEqual(copy.factor_sum.max, 4)
+        self.assertEqual(questionaire.factor_sum.max, 3)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,74 @@
+import os
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+from filesystem.reportcache import TMP_MAX_AGE, ReportCache, digest
+
+
+class TestReportCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = ReportCache(Path(self.tmp.name) / "reports", max_bytes=250)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _build(self, key, size=100, age=0):
+        tmp = self.cache.reserve(key)
+        tmp.write_bytes(b"x" * size)
+        path = self.cache.commit(key, tmp)
+        if age:
+            t = time.time() - age
+            os.utime(path, (t, t))
+        return path
+
+    def test_digest_follows_rendered_content(self):
+        data = {"analysis_object": "A", "scenarios": [{"name": "S"}]}
+        self.assertEqual(digest(data, "a"), digest(dict(data), "a"))
+        self.assertNotEqual(digest(data, "a"), digest(data, "b"))
+        self.assertNotEqual(digest(data), digest({**data, "analysis_object": "B"}))
+        # Keys that are not rendered do not change the report
+        self.assertEqual(digest(data), digest({**data, "__samples": {"x": 1}}))
+
+    def test_open_counts_hits_and_misses(self):
+        self.assertIsNone(self.cache.open("a"))
+        self._build("a")
+        with self.cache.open("a") as f:
+            self.assertEqual(f.read(), b"x" * 100)
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+    def test_least_recently_used_is_evicted(self):
+        self._build("a", age=30)
+        self._build("b", age=20)
+        # Reading a marks it as recently used
+        self.cache.open("a").close()
+        self._build("c")
+        self.assertTrue(self.cache.path("a").exists())
+        self.assertFalse(self.cache.path("b").exists())
+        self.assertTrue(self.cache.path("c").exists())
+
+    def test_open_report_survives_eviction(self):
+        self._build("a", age=30)
+        f = self.cache.open("a")
+        self.cache.clear()
+        try:
+            self.assertEqual(len(f.read()), 100)
+        finally:
+            f.close()
+
+    def test_stale_builds_are_removed(self):
+        stale = self.cache.reserve("a")
+        t = time.time() - TMP_MAX_AGE - 1
+        os.utime(stale, (t, t))
+        fresh = self.cache.reserve("b")
+        self._build("c")
+        self.assertFalse(stale.exists())
+        self.assertTrue(fresh.exists())
+        self.cache.discard(fresh)
+        self.assertFalse(fresh.exists())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,116 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy
+
+from filesystem.repo import DraftRepository, JsonAnalysisRepository
+from filesystem.samples import SampleStore, refs
+from riskcalculator.scenario import RiskScenario
+from riskregister.assessment import RiskAssessment
+
+
+class TestSampleStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.store = SampleStore(self.root / "samples")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_round_trip(self):
+        samples = numpy.random.default_rng(1).random(1000)
+        data = {"a": {"__samples": samples, "p90": 1.0}, "b": [{"__samples": [1.0]}]}
+        stored = self.store.externalize(data)
+        ref = stored["a"]["__samples"]
+        self.assertEqual(ref["length"], 1000)
+        self.assertEqual(stored["b"], [{"__samples": [1.0]}])
+        self.assertEqual(refs(stored), {ref["npy"]})
+        # Same content, same file
+        self.assertEqual(self.store.put(samples.tolist()), ref)
+
+        loaded = self.store.resolve(json.loads(json.dumps(stored)))
+        array = loaded["a"]["__samples"]
+        self.assertIsInstance(array, numpy.memmap)
+        numpy.testing.assert_array_equal(array, samples)
+        # Not written again
+        self.assertEqual(self.store.externalize(loaded), stored)
+
+    def test_missing_file(self):
+        ref = self.store.put(numpy.arange(100.0))
+        self.assertEqual(self.store.prune(set()), 1)
+        self.assertEqual(len(self.store.load(ref)), 0)
+
+
+class TestSidecars(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        scenario = RiskScenario(
+            {
+                "name": "Vatten",
+                "threat_event_frequency": {"min": 1, "probable": 2, "max": 4},
+                "vulnerability": {"min": 0.1, "probable": 0.2, "max": 0.4},
+                "loss_magnitude": {"min": 0.01, "probable": 0.02, "max": 0.05},
+                "budget": 10000,
+                "currency": "SEK",
+            }
+        )
+        self.scenario = scenario.to_dict()
+        ale = scenario.risk.quantitative.annual_loss_expectancy
+        self.samples = ale._MonteCarloSimulation__samples
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_analysis(self):
+        repo = JsonAnalysisRepository(self.root / "analyses")
+        analysis_id = repo.save_new(
+            {"analysis_object": "A", "owner": "", "scenarios": [self.scenario]}
+        )
+        text = (repo.folder / f"{analysis_id}.json").read_text("utf-8")
+        self.assertLess(len(text), len(self.samples) * 2)
+
+        assessment = RiskAssessment(
+            {
+                "analysis_object": "A",
+                "version": "",
+                "date": "",
+                "scope": "",
+                "owner": "",
+                **repo.get_dict(analysis_id),
+            }
+        )
+        ale = assessment.scenarios[0].risk.quantitative.annual_loss_expectancy
+        kept = ale._MonteCarloSimulation__samples
+        self.assertIsInstance(kept, numpy.memmap)
+        numpy.testing.assert_array_equal(kept, self.samples)
+
+    def test_draft(self):
+        repo = DraftRepository(self.root / "drafts")
+        draft_id = repo.create()
+        repo.add_scenario(draft_id, self.scenario)
+        repo.add_scenario(draft_id, self.scenario)
+        folder = repo.samples(draft_id).folder
+        files = set(folder.iterdir())
+        self.assertTrue(files)
+        draft = repo.load(draft_id)
+        numpy.testing.assert_array_equal(
+            draft["scenarios"][1]["risk"]["quantitative"]["annual_loss_expectancy"][
+                "__samples"
+            ],
+            self.samples,
+        )
+
+        repo.delete_scenario(draft_id, 0)
+        repo.delete_scenario(draft_id, 0)
+        repo.compact(draft_id)
+        self.assertEqual(list(folder.iterdir()), [])
+        repo.delete(draft_id)
+        self.assertFalse(folder.exists())
+
+
+if __name__ == "__main__":
+    unittest.main()
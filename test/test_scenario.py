@@ -80,6 +80,16 @@ class TestScenario(unittest.TestCase):
         scenario2 = RiskScenario(parameters=self.SECOND_PARAMETER_SET)
         self.assertFalse(scenario == scenario2)
 
+    def test_digest_follows_mutation(self):
+        scenario = RiskScenario(parameters=self.DEFAULT_PARAMETERS)
+        copy = RiskScenario.from_dict(scenario.to_dict())
+        self.assertEqual({scenario, copy}, {scenario})
+
+        copy.name = "Annat namn"
+        self.assertNotEqual(scenario.digest(), copy.digest())
+        copy.name = scenario.name
+        self.assertEqual(scenario.digest(), copy.digest())
+
 
 if __name__ == "__main__":
     unittest.main()
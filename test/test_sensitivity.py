@@ -0,0 +1,58 @@
+import json
+import unittest
+from pathlib import Path
+
+import numpy
+
+from riskcalculator import sensitivity
+from riskcalculator.template import QuestionairesTemplate
+
+QUESTIONAIRES_DIR = Path(__file__).parent.parent / "data" / "questionaires"
+
+
+class TestSensitivity(unittest.TestCase):
+    def setUp(self):
+        raw = json.loads((QUESTIONAIRES_DIR / "default.json").read_text("utf-8"))
+        self.template = QuestionairesTemplate.from_dict("default", raw)
+        answers = {
+            dim: numpy.minimum(1, self.template.get(dim).alternative_counts - 1)
+            for dim in ("tef", "vuln", "lm")
+        }
+        self.scenario = {
+            "questionaires": self.template.questionaires(answers).to_dict(),
+            "risk": {"quantitative": {"budget": 1000000.0, "currency": "SEK"}},
+        }
+
+    def test_one_variant_per_other_alternative(self):
+        result = sensitivity.analyze(self.scenario, samples=2000, workers=2)
+        expected = sum(
+            int((self.template.get(dim).alternative_counts - 1).sum())
+            for dim in ("tef", "vuln", "lm")
+        )
+        self.assertEqual(len(result.variants), expected)
+        self.assertEqual(
+            len(result.questions),
+            sum(len(self.template.get(dim).questions) for dim in ("tef", "vuln", "lm")),
+        )
+
+    def test_ranked_and_reproducible(self):
+        a = sensitivity.analyze(self.scenario, samples=2000, workers=1)
+        b = sensitivity.analyze(self.scenario, samples=2000, workers=3)
+        self.assertEqual(a.to_dict(), b.to_dict())
+        deltas = [abs(v.delta_p90) for v in a.variants]
+        self.assertEqual(deltas, sorted(deltas, reverse=True))
+        swings = [q.swing for q in a.questions]
+        self.assertEqual(swings, sorted(swings, reverse=True))
+        for q in a.questions:
+            self.assertLessEqual(q.low_p90, a.baseline.ale_p90)
+            self.assertGreaterEqual(q.high_p90, a.baseline.ale_p90)
+
+    def test_result_is_json_serializable(self):
+        result = sensitivity.analyze(self.scenario, samples=1000)
+        values = json.loads(json.dumps(result.to_dict()))
+        self.assertIn("ale_p90", values["baseline"])
+        self.assertIn("overall_risk", values["variants"][0]["outcome"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+import unittest
+
+import numpy
+
+from riskcalculator import simulation
+
+TEF = [(1.0, 2.0, 4.0)]
+VULN = [(0.1, 0.2, 0.3)]
+LM = [(0.01, 0.02, 0.05)]
+
+
+class TestAdaptiveSimulation(unittest.TestCase):
+    def test_stops_when_converged(self):
+        result = simulation.simulate_adaptive(
+            TEF, VULN, LM, 100000.0, tolerance=0.02, seed=1
+        )
+        convergence = result.convergence
+        self.assertTrue(convergence.converged)
+        self.assertLess(convergence.samples, simulation.MAX_SAMPLES)
+        self.assertEqual(
+            set(convergence.error),
+            {"loss_event_frequency.p90", "annual_loss_expectancy.p90"},
+        )
+        for error in convergence.error.values():
+            self.assertLessEqual(error, 0.02)
+        self.assertIsNone(result.samples)
+
+    def test_tighter_tolerance_draws_more(self):
+        loose = simulation.simulate_adaptive(
+            TEF, VULN, LM, 100000.0, tolerance=0.02, seed=1
+        )
+        tight = simulation.simulate_adaptive(
+            TEF, VULN, LM, 100000.0, tolerance=0.002, seed=1
+        )
+        self.assertGreater(tight.convergence.samples, loose.convergence.samples)
+
+    def test_hard_cap(self):
+        result = simulation.simulate_adaptive(
+            TEF, VULN, LM, 100000.0, tolerance=1e-6, max_samples=30000, seed=1
+        )
+        self.assertEqual(result.convergence.samples, 30000)
+        self.assertFalse(result.convergence.converged)
+
+    def test_reproducible_with_seed(self):
+        a = simulation.simulate_adaptive(TEF, VULN, LM, 1000.0, seed=5)
+        b = simulation.simulate_adaptive(TEF, VULN, LM, 1000.0, seed=5)
+        for name in simulation.SIMULATED:
+            numpy.testing.assert_array_equal(a.stats[name], b.stats[name])
+
+    def test_sampling_error_shrinks(self):
+        rng = numpy.random.default_rng(0)
+        small = simulation.sampling_error(rng.lognormal(size=(1, 1000)), "p90")
+        large = simulation.sampling_error(rng.lognormal(size=(1, 100000)), "p90")
+        self.assertLess(large[0], small[0])
+
+    def test_evaluate_risk_reports_convergence(self):
+        values = {
+            "threat_event_frequency": {"min": 1, "probable": 2, "max": 4},
+            "vulnerability": {"min": 0.1, "probable": 0.2, "max": 0.3},
+            "loss_magnitude": {"min": 0.01, "probable": 0.02, "max": 0.05},
+            "budget": 1000,
+            "currency": "SEK",
+        }
+        risk = simulation.evaluate_risk(values, seed=2, tolerance=0.02)
+        self.assertLessEqual(risk.convergence.samples, simulation.DEFAULT_SAMPLES)
+        self.assertIsNone(simulation.evaluate_risk(values, samples=1000).convergence)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,183 @@
+import json
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from filesystem.sqlite_repo import (
+    SqliteAnalysisRepository,
+    SqliteDatabase,
+    SqliteDraftRepository,
+    migrate_json,
+)
+
+
+def _analysis(title, owner="Anna", date="2026-01-01", scenarios=0):
+    return {
+        "analysis_object": title,
+        "version": "1",
+        "date": date,
+        "scope": "",
+        "owner": owner,
+        "scenarios": [{} for _ in range(scenarios)],
+        "summary": {},
+    }
+
+
+class TestSqliteRepositories(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self._tmp.name)
+        self.db = SqliteDatabase(self.root / "test.db")
+
+    def tearDown(self):
+        self.db.close()
+        self._tmp.cleanup()
+
+    def test_analyses(self):
+        repo = SqliteAnalysisRepository(self.db)
+        analysis_id = repo.save_new(_analysis("Objekt", scenarios=2))
+        self.assertEqual(repo.get_dict(analysis_id)["analysis_object"], "Objekt")
+        items = repo.list()
+        self.assertEqual(len(items), 1)
+        self.assertEqual(items[0].scenario_count, 2)
+        with self.assertRaises(FileNotFoundError):
+            repo.get_dict("missing")
+
+    def test_query(self):
+        repo = SqliteAnalysisRepository(self.db)
+        for i in range(7):
+            owner = "Anna" if i % 2 else "Bo"
+            repo.put(f"a{i}", _analysis(f"T{i}", owner, f"2026-01-0{i + 1}"))
+        page = repo.query(page=2, per_page=3)
+        self.assertEqual((page.total, page.pages), (7, 3))
+        self.assertEqual([i.analysis_id for i in page.items], ["a3", "a2", "a1"])
+        page = repo.query(owner="anna", sort="title", descending=False)
+        self.assertEqual([i.title for i in page.items], ["T1", "T3", "T5"])
+        page = repo.query(date_from="2026-01-03", date_to="2026-01-05")
+        self.assertEqual(page.total, 3)
+
+    def test_signatures(self):
+        repo = SqliteAnalysisRepository(self.db)
+        empty = repo.listing_signature()
+        repo.put("a", _analysis("A"))
+        listing, a = repo.listing_signature(), repo.signature("a")
+        self.assertNotEqual(listing, empty)
+        self.assertEqual(repo.signature("a"), a)
+
+        # Rewriting a row changes both, adding a row only the listing
+        repo.put("a", _analysis("A2"))
+        self.assertNotEqual(repo.signature("a"), a)
+        self.assertNotEqual(repo.listing_signature(), listing)
+        a, listing = repo.signature("a"), repo.listing_signature()
+        repo.put("b", _analysis("B"))
+        self.assertEqual(repo.signature("a"), a)
+        self.assertNotEqual(repo.listing_signature(), listing)
+        with self.assertRaises(FileNotFoundError):
+            repo.signature("missing")
+
+    def test_drafts(self):
+        repo = SqliteDraftRepository(self.db)
+        draft_id = repo.create()
+        self.assertEqual(repo.load(draft_id)["scenarios"], [])
+        repo.save(draft_id, {"analysis_object": "X", "scenarios": [1]})
+        self.assertEqual(repo.load(draft_id)["analysis_object"], "X")
+        other = repo.create_from({"analysis_object": "Y"})
+        self.assertNotEqual(other, draft_id)
+        repo.delete(draft_id)
+        with self.assertRaises(FileNotFoundError):
+            repo.load(draft_id)
+
+    def test_draft_journal(self):
+        repo = SqliteDraftRepository(self.db, compact_after=3)
+        draft_id = repo.create()
+        repo.set_metadata(draft_id, {"owner": "Anna"})
+        repo.add_scenario(draft_id, {"i": 0})
+        repo.add_scenario(draft_id, {"i": 1})
+        repo.update_scenario(draft_id, 1, {"i": 2})
+        with self.assertRaises(IndexError):
+            repo.delete_scenario(draft_id, 2)
+        draft = repo.load(draft_id)
+        self.assertEqual(draft["owner"], "Anna")
+        self.assertEqual(draft["scenarios"], [{"i": 0}, {"i": 2}])
+        ops = (
+            self.db.connection()
+            .execute("SELECT COUNT(*) FROM draft_ops WHERE draft_id = ?", (draft_id,))
+            .fetchone()[0]
+        )
+        self.assertEqual(ops, 1)
+
+    def test_concurrent_writers(self):
+        repo = SqliteDraftRepository(self.db)
+        errors = []
+
+        def work(n):
+            try:
+                for i in range(20):
+                    repo.save(f"d{n}_{i}", {"n": n, "i": i})
+                    repo.load(f"d{n}_{i}")
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=work, args=(n,)) for n in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(repo.load("d3_19"), {"n": 3, "i": 19})
+
+    def test_concurrent_saves_with_the_same_id(self):
+        repo = SqliteAnalysisRepository(self.db)
+        ids, errors = [], []
+
+        def work(n):
+            try:
+                ids.append(repo.save_new(_analysis(f"T{n}")))
+            except Exception as e:
+                errors.append(e)
+
+        # Same slug within the same second
+        with patch("filesystem.sqlite_repo.new_analysis_id", return_value="same"):
+            threads = [threading.Thread(target=work, args=(n,)) for n in range(8)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(len(set(ids)), 8)
+        titles = {repo.get_dict(i)["analysis_object"] for i in ids}
+        self.assertEqual(titles, {f"T{n}" for n in range(8)})
+
+    def test_put_invalidates_versions(self):
+        repo = SqliteAnalysisRepository(self.db)
+        scenarios = [{"name": f"s{i}", "text": "x" * 500} for i in range(3)]
+        base = dict(_analysis("A"), scenarios=scenarios)
+        repo.put("base", base)
+        version = dict(_analysis("A"), scenarios=scenarios, previous_analysis_id="base")
+        version_id = repo.save_new(version)
+        self.assertEqual(repo.get_dict(version_id)["scenarios"][0]["name"], "s0")
+
+        changed = [dict(scenarios[0], name="ändrad")] + scenarios[1:]
+        repo.put("base", dict(base, scenarios=changed))
+        # The version is a delta against the base, the cached base is dropped
+        self.assertEqual(repo.get_dict(version_id)["scenarios"][0]["name"], "ändrad")
+
+    def test_migration_runs_once(self):
+        analyses = self.root / "analyses"
+        drafts = self.root / "drafts"
+        analyses.mkdir()
+        drafts.mkdir()
+        (analyses / "a1.json").write_text(json.dumps(_analysis("A")), "utf-8")
+        (drafts / "d1.json").write_text(json.dumps({"scenarios": []}), "utf-8")
+        self.assertEqual(migrate_json(self.db, analyses, drafts), 2)
+        self.assertEqual(migrate_json(self.db, analyses, drafts), 0)
+        self.assertEqual(
+            SqliteAnalysisRepository(self.db).get_dict("a1")["analysis_object"], "A"
+        )
+        self.assertEqual(SqliteDraftRepository(self.db).load("d1"), {"scenarios": []})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+import json
+import unittest
+from pathlib import Path
+
+import numpy
+
+from riskcalculator.questionaire import Questionaire, Questionaires
+from riskcalculator.template import UNANSWERED, QuestionairesTemplate
+
+QUESTIONAIRES_DIR = Path(__file__).parent.parent / "data" / "questionaires"
+
+
+class TestTemplate(unittest.TestCase):
+    def setUp(self):
+        self.raw = json.loads(
+            (QUESTIONAIRES_DIR / "owasp-risk-rating.json").read_text("utf-8")
+        )
+        self.template = QuestionairesTemplate.from_dict("owasp", self.raw)
+
+    def _answers(self, seed: int) -> dict:
+        rng = numpy.random.default_rng(seed)
+        answers = {}
+        for dim in ("tef", "vuln", "lm"):
+            counts = self.template.get(dim).alternative_counts
+            answers[dim] = rng.integers(UNANSWERED, counts)
+        return answers
+
+    def test_values_match_questionaires(self):
+        for seed in range(10):
+            answers = self._answers(seed)
+            objects = {}
+            for dim in ("tef", "vuln", "lm"):
+                questionaire = Questionaire.from_dict(self.raw[dim])
+                for question, index in zip(questionaire.questions, answers[dim]):
+                    if index != UNANSWERED:
+                        question.set_answer(int(index))
+                objects[dim] = questionaire
+            expected = Questionaires(**objects).calculate_questionairy_values()
+            self.assertEqual(self.template.calculate_values(answers), expected)
+
+    def test_instantiate_round_trip(self):
+        answers = self._answers(1)
+        questionaires = self.template.questionaires(answers)
+        for dim in ("tef", "vuln", "lm"):
+            template = self.template.get(dim)
+            questionaire = questionaires.questionaires[dim]
+            numpy.testing.assert_array_equal(
+                template.answers_from(questionaire), answers[dim]
+            )
+        self.assertEqual(
+            questionaires.calculate_questionairy_values(),
+            self.template.calculate_values(answers),
+        )
+
+    def test_selected_answers_show_defaults(self):
+        tef = self.template.tef
+        numpy.testing.assert_array_equal(tef.selected_answers(), tef.default_answers)
+        answers = self._answers(2)["tef"]
+        selected = tef.selected_answers(answers)
+        answered = answers != UNANSWERED
+        numpy.testing.assert_array_equal(selected[answered], answers[answered])
+        numpy.testing.assert_array_equal(
+            selected[~answered], tef.default_answers[~answered]
+        )
+
+    def test_template_is_read_only(self):
+        with self.assertRaises(ValueError):
+            self.template.tef.weights[0, 0, 0] = 1.0
+        with self.assertRaises(IndexError):
+            self.template.tef.value(self.template.tef.alternative_counts)
+        self.assertEqual(self.template.get("qset"), "owasp")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,134 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from filesystem.repo import JsonAnalysisRepository
+from filesystem.report import generate_markdown_report, load_json, sanitize
+from filesystem.sqlite_repo import SqliteAnalysisRepository, SqliteDatabase
+from filesystem.versions import SNAPSHOT_EVERY, apply_delta, make_delta
+
+
+def _scenario(name, size=50):
+    return {"name": name, "description": "x" * size, "risk": {"p90": 1.5}}
+
+
+def _analysis(version, scenarios, previous=None):
+    analysis = {
+        "analysis_object": "Objekt",
+        "version": str(version),
+        "date": f"2026-01-{version:02d}",
+        "owner": "Anna",
+        "scenarios": scenarios,
+    }
+    if previous:
+        analysis["previous_analysis_id"] = previous
+    return analysis
+
+
+class TestDelta(unittest.TestCase):
+    def test_round_trip(self):
+        base = _analysis(1, [_scenario("a"), _scenario("b"), _scenario("c")])
+        base["scope"] = "Hela"
+        doc = _analysis(2, [_scenario("c"), _scenario("d"), _scenario("a")], "v1")
+        delta = make_delta("v1", base, doc, 1)
+        self.assertEqual(
+            delta["scenarios"], [{"__parent": 2}, _scenario("d"), {"__parent": 0}]
+        )
+        self.assertEqual(delta["__removed"], ["scope"])
+        self.assertNotIn("owner", delta)
+        self.assertEqual(apply_delta(base, delta), doc)
+
+
+class VersionsMixin:
+    def test_new_versions_are_deltas(self):
+        scenarios = [_scenario(f"s{i}", size=2000) for i in range(5)]
+        expected = [_analysis(1, scenarios)]
+        ids = [self.repo.save_new(expected[0])]
+        for version in range(2, 2 + SNAPSHOT_EVERY):
+            scenarios = list(scenarios)
+            scenarios[version % 5] = _scenario(f"v{version}", size=2000)
+            expected.append(_analysis(version, scenarios, ids[-1]))
+            ids.append(self.repo.save_new(expected[-1]))
+        self.assertEqual(len(set(ids)), len(ids))
+
+        stored = [self.stored(i) for i in ids]
+        self.assertNotIn("__base", stored[0])
+        for i in range(1, SNAPSHOT_EVERY):
+            self.assertEqual(stored[i]["__base"], ids[i - 1])
+            self.assertLess(len(json.dumps(stored[i])), len(json.dumps(stored[0])) / 2)
+        # Chain length is bounded by a full snapshot
+        self.assertNotIn("__base", stored[SNAPSHOT_EVERY])
+
+        for analysis_id, analysis in zip(ids, expected):
+            self.assertEqual(self.repo.get_dict(analysis_id), analysis)
+        # Reads return copies, the cached base is not changed
+        self.repo.get_dict(ids[-2])["scenarios"][0]["name"] = "ändrad"
+        self.assertEqual(self.repo.get_dict(ids[-2]), expected[-2])
+
+        items = {i.analysis_id: i for i in self.repo.list()}
+        self.assertEqual(items[ids[3]].version, "4")
+        self.assertEqual(items[ids[3]].scenario_count, 5)
+
+    def test_missing_previous_is_stored_in_full(self):
+        analysis_id = self.repo.save_new(_analysis(2, [_scenario("a")], "saknas"))
+        self.assertNotIn("__base", self.stored(analysis_id))
+        self.assertEqual(
+            self.repo.get_dict(analysis_id)["previous_analysis_id"], "saknas"
+        )
+
+
+class TestJsonVersions(VersionsMixin, unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.repo = JsonAnalysisRepository(self.root / "analyses")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def stored(self, analysis_id):
+        return json.loads((self.root / "analyses" / f"{analysis_id}.json").read_text())
+
+    def test_report_from_delta_version(self):
+        samples = {"__samples": [float(i) for i in range(2000)]}
+        scenarios = [_scenario("Första"), dict(_scenario("Andra"), risk=samples)]
+        base_id = self.repo.save_new(_analysis(1, scenarios))
+        scenarios = scenarios + [_scenario("Tredje")]
+        version_id = self.repo.save_new(_analysis(2, scenarios, base_id))
+        self.assertIn("__base", self.stored(version_id))
+
+        # The report CLI reads the file the way the repository does
+        data = load_json(str(self.root / "analyses" / f"{version_id}.json"))
+        self.assertNotIn("__base", data)
+        self.assertEqual(
+            [s["name"] for s in data["scenarios"]], ["Första", "Andra", "Tredje"]
+        )
+        self.assertEqual(len(data["scenarios"][1]["risk"]["__samples"]), 2000)
+        md = generate_markdown_report(sanitize(data))
+        for name in ("Första", "Andra", "Tredje"):
+            self.assertIn(name, md)
+
+
+class TestSqliteVersions(VersionsMixin, unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.db = SqliteDatabase(self.root / "test.db")
+        self.repo = SqliteAnalysisRepository(self.db)
+
+    def tearDown(self):
+        self.db.close()
+        self.tmp.cleanup()
+
+    def stored(self, analysis_id):
+        row = (
+            self.db.connection()
+            .execute("SELECT body FROM analyses WHERE analysis_id = ?", (analysis_id,))
+            .fetchone()
+        )
+        return json.loads(row[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
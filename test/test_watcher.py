@@ -0,0 +1,78 @@
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+
+from filesystem.filecache import FileCache
+from filesystem.questionaires_repo import JsonQuestionairesRepository
+from filesystem.watcher import Watcher
+
+DEFAULT_SET = (
+    Path(__file__).parent.parent / "data" / "questionaires" / "default.json"
+).read_text("utf-8")
+
+
+def _wait(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+class TestWatcher(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name).resolve()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _changes(self, use_inotify):
+        seen = set()
+        lock = threading.Lock()
+
+        def on_change(paths):
+            with lock:
+                seen.update(paths)
+
+        watcher = Watcher(
+            [self.root], on_change, interval=0.05, use_inotify=use_inotify
+        ).start()
+        try:
+            path = self.root / "a.json"
+            path.write_text("{}", "utf-8")
+            self.assertTrue(_wait(lambda: path in seen and self.root in seen))
+        finally:
+            watcher.stop()
+        self.assertFalse(watcher.running)
+        return watcher.backend
+
+    def test_polling(self):
+        self.assertEqual(self._changes(use_inotify=False), "polling")
+
+    def test_inotify_or_fallback(self):
+        self.assertIn(self._changes(use_inotify=True), ("inotify", "polling"))
+
+    def test_hot_rebuild(self):
+        cache = FileCache()
+        repo = JsonQuestionairesRepository(self.root, cache=cache)
+        (self.root / "a.json").write_text(DEFAULT_SET, "utf-8")
+        cache.watch([self.root], interval=0.05)
+        try:
+            self.assertEqual(repo.list_sets(), ["a"])
+            template = repo.load_template("a")
+            self.assertIs(repo.load_template("a"), template)
+
+            (self.root / "b.json").write_text(DEFAULT_SET, "utf-8")
+            self.assertTrue(_wait(lambda: repo.list_sets() == ["a", "b"]))
+            (self.root / "a.json").write_text(DEFAULT_SET + "\n", "utf-8")
+            self.assertTrue(_wait(lambda: repo.load_template("a") is not template))
+        finally:
+            cache.unwatch()
+
+
+if __name__ == "__main__":
+    unittest.main()